@@ -1,13 +1,39 @@
 # main.py - Pico W Security System with Enhanced Entry Point Protection
-import network
-import time
-import machine
-from machine import RTC, Pin, I2C
-from pico_i2c_lcd import I2cLcd
-import ubinascii
-import ntptime
-import socket
+# Only what monitoring needs is imported at boot. The web stack (web.py),
+# the NTP client (timesync.py) and the optional MQTT client (mqtt.py) are
+# imported once the WiFi link is first up, so a Pico without network
+# never compiles or holds them.
+import metrics
+
+# Start-up stage timings (sensors, armable, wifi, web, time) and import
+# costs, measured from here
+boot_times = metrics.BootTimes()
+_begun = boot_times.begin_import()
+
+import hal
+if hal.SIMULATED:
+    # sim.py has just moved the clock to virtual time, where imports take
+    # no time: restart the stage clock on it and leave import timings out
+    boot_times = metrics.BootTimes(time_imports=False)
 import random
+import time
+import json
+from hal import Pin, I2C
+from scheduler import Scheduler
+from buzzer import ToneSequencer
+from edges import EdgeRing
+from gpio import InputSampler
+from keypad import KeypadScanner
+from clock import Deadline, ticks_ms, ticks_us, elapsed_ms
+from display import ShadowLcd
+import journal as jr
+from eventlog import EventLog
+from memory import MemoryManager, BufferPool
+import memory
+import wifi
+import zones
+
+boot_times.imported("core", _begun)
 
 # LCD Configuration
 I2C_ADDR = 0x27  # Change to 0x3F if needed
@@ -16,33 +42,78 @@ I2C_NUM_COLS = 16
 
 # Initialize I2C and LCD
 i2c = I2C(0, sda=Pin(0), scl=Pin(1), freq=400000)
-lcd = I2cLcd(i2c, I2C_ADDR, I2C_NUM_ROWS, I2C_NUM_COLS)
+lcd = hal.make_lcd(i2c, I2C_ADDR, I2C_NUM_ROWS, I2C_NUM_COLS)
+
+# All drawing goes through the shadow buffer so only changed cells hit the I2C bus
+display = ShadowLcd(lcd, I2C_NUM_ROWS, I2C_NUM_COLS)
 
 # WiFi Configuration
 WIFI_SSID = "your_wifi_SSID"
 WIFI_PASSWORD = "your_wifi_password"
+WIFI_CONNECT_TIMEOUT = 20  # Seconds to wait for an IP
+WIFI_RETRY_MIN = 2  # First reconnect delay, doubling (with jitter) after each failure...
+WIFI_RETRY_MAX = 120  # ...up to 2 minutes
 
-# Timezone offset in hours
+# Timezone offset in hours - applied when time is shown, the RTC stays on UTC
 TIMEZONE_OFFSET = 1  # Change this to your timezone
 
+# NTP configuration
+NTP_HOST = "pool.ntp.org"  # An IP address here (e.g. your router) skips DNS
+NTP_PORT = 123
+NTP_SYNC_INTERVAL = 3600  # Sync every hour
+NTP_RETRY_MIN = 15  # First retry after a failed sync, doubling each time...
+NTP_RETRY_MAX = 600  # ...up to 10 minutes
+
+# MQTT telemetry (optional) - set MQTT_BROKER to a host name or IP to enable.
+# Zone states and a status summary are published retained under
+# <MQTT_TOPIC>/<MAC>/, transitions go to .../event. With MQTT_CONTROL,
+# "arm"/"disarm" are taken on .../control; anyone who can publish there can
+# disarm, so only enable it behind broker credentials and ACLs
+MQTT_BROKER = None
+MQTT_PORT = 1883
+MQTT_USER = None
+MQTT_PASSWORD = None
+MQTT_TOPIC = "seckeja"
+MQTT_CONTROL = False  # True accepts arm/disarm on .../control (never clears an alarm)
+
 # Web server configuration
 WEB_PORT = 80
-
-# Door Sensor Configuration - MC-38
-DOOR_SENSOR_PIN = 2  # GP2 - Physical Pin 4
-door_sensor = Pin(DOOR_SENSOR_PIN, Pin.IN, Pin.PULL_UP)
-
-# Window Sensor Configuration - MC-38
-WINDOW_SENSOR_PIN = 3  # GP3 - Physical Pin 5
-window_sensor = Pin(WINDOW_SENSOR_PIN, Pin.IN, Pin.PULL_UP)
-
-# PIR Motion Sensor Configuration - MH-SR602
-PIR_SENSOR_PIN = 4  # GP4 - Physical Pin 6
-pir_sensor = Pin(PIR_SENSOR_PIN, Pin.IN)
+WEB_CLIENTS = 4  # Open connections, each holding one buffer pair
+WEB_IN_BUFFER = 3072  # httpserver MAX_HEADER + MAX_BODY
+WEB_OUT_BUFFER = 1024  # httpserver SEND_SIZE
+
+# Sensor pins
+DOOR_SENSOR_PIN = 2  # GP2 - Physical Pin 4, MC-38 reed switch
+WINDOW_SENSOR_PIN = 3  # GP3 - Physical Pin 5, MC-38 reed switch
+PIR_SENSOR_PIN = 4  # GP4 - Physical Pin 6, MH-SR602 PIR
+
+# Zone table - one row per sensor, no other code changes needed to add one:
+# (name, label, pin, kind, level when active, pull, settle ms)
+ZONE_CONFIG = (
+    ("door", "Front Door", DOOR_SENSOR_PIN, zones.ENTRY, 1, Pin.PULL_UP, 20),
+    ("window", "Window", WINDOW_SENSOR_PIN, zones.ENTRY, 1, Pin.PULL_UP, 20),
+    ("motion", "Motion Sensor", PIR_SENSOR_PIN, zones.MOTION, 1, None, 10),
+)
+ZONE_NONE = 0  # Journal zone id for system events
+
+# Capture every sensor edge in an IRQ so short opens and PIR pulses are not missed
+sensor_edges = EdgeRing(32)
+
+# Every zone and keypad input is read in one snapshot (one SIO register
+# read on the RP2040, per-pin reads elsewhere)
+inputs = InputSampler(hal.mem32)
+
+zone_table = zones.ZoneTable()
+for name, label, pin_id, kind, active_level, pull, settle_ms in ZONE_CONFIG:
+    pin = Pin(pin_id, Pin.IN, pull) if pull is not None else Pin(pin_id, Pin.IN)
+    zone_table.add(name, label, pin, pin_id, kind, active_level, settle_ms)
+    sensor_edges.attach(pin, pin_id)
+    inputs.add(pin_id, pin)
 
 # Buzzer Configuration
 BUZZER_PIN = 5  # GP5 - Physical Pin 7
-buzzer = machine.PWM(machine.Pin(BUZZER_PIN))
+buzzer = hal.PWM(Pin(BUZZER_PIN))
+tones = ToneSequencer(buzzer)
 
 # Arm Button Configuration
 ARM_BUTTON_PIN = 13  # GP13 - Physical Pin 17
@@ -63,242 +134,262 @@ KEYPAD_MAP = [
 # Initialize keypad rows as outputs, cols as inputs with pull-down
 row_pins = [Pin(pin, Pin.OUT) for pin in ROWS]
 col_pins = [Pin(pin, Pin.IN, Pin.PULL_DOWN) for pin in COLS]
+col_bits = [inputs.add(pin, col_pin) for pin, col_pin in zip(COLS, col_pins)]
+
+# One row per keypad task tick; debounced key events wait in its queue
+keypad = KeypadScanner(row_pins, col_bits, KEYPAD_MAP, inputs.sample)
 
 # Security system variables
-door_status = "UNKNOWN"
-window_status = "UNKNOWN"
-motion_status = "NO MOTION"
-door_last_state = None
-window_last_state = None
-motion_last_state = None
-door_change_count = 0
-window_change_count = 0
-motion_detection_count = 0
-last_motion_time = 0
 buzzer_active = False
 alarm_triggered = False
-alarm_start_time = 0
+alarm_start_time = 0  # ticks_ms when the alarm was triggered
+alarm_edge_us = 0  # ticks_us of the sensor edge that triggered the alarm
 
 # System arming variables
 system_armed = False
 arming_in_progress = False
-arm_countdown_start = 0
+arming_deadline = Deadline()
 ARMING_DELAY = 30  # 30 seconds arming delay
-last_button_press = 0
-button_debounce_delay = 0.5  # 500ms debounce
+button_debounce = Deadline()
+BUTTON_DEBOUNCE_MS = 500  # 500ms debounce
 
 # Keypad and security code variables
 security_code = ""
 entered_code = ""
-code_generation_time = 0
+code_expiry = Deadline()
 CODE_VALIDITY_TIME = 300  # 5 minutes in seconds
 MAX_ATTEMPTS = 3
 failed_attempts = 0
-last_keypress_time = 0
 keypad_enabled = False
 
+# LCD message hold - the display task leaves a message up until this expires
+message_deadline = Deadline()
+
+# Every periodic job; main() registers the tasks
+scheduler = Scheduler()
+
+# Heap usage and inferred GC runs for /metrics
+heap_watch = metrics.HeapWatch()
+
+# Garbage collection at idle points and low-memory admission control
+memory_manager = MemoryManager(heap_watch)
+
+# Web request/response buffers, allocated now while the heap is unfragmented
+http_buffers = BufferPool(WEB_CLIENTS, WEB_IN_BUFFER, WEB_OUT_BUFFER)
+
+# In-RAM history of security events, tailed via /api/events?since=N
+journal = jr.Journal(256)
+
+# Persistent audit trail on flash; survives machine.reset()
+try:
+    event_log = EventLog("log")
+    print(f"Event log: next seq {event_log.seq}, {len(event_log.segments)} segments, "
+          f"{event_log.skipped} torn records skipped")
+except OSError as e:
+    print(f"Event log unavailable: {e}")
+    event_log = None
+
 # Get Pico W MAC Address for identification only
-wlan = network.WLAN(network.STA_IF)
+wlan = hal.make_wlan()
 wlan.active(True)
-pico_mac_address = ubinascii.hexlify(wlan.config('mac')).decode()
+pico_mac_address = hal.mac_address(wlan)
 print(f"Pico W MAC: {pico_mac_address}")
 
-def connect_wifi():
-    """Connect to WiFi with status display"""
-    lcd.clear()
-    lcd.putstr("Connecting...")
-    
-    if not wlan.isconnected():
-        wlan.connect(WIFI_SSID, WIFI_PASSWORD)
-        
-        # Wait for connection with timeout
-        max_wait = 20
-        while max_wait > 0:
-            if wlan.isconnected():
-                break
-            max_wait -= 1
-            lcd.move_to(0, 1)
-            lcd.putstr(" " * 16)  # Clear second line
-            lcd.move_to(0, 1)
-            lcd.putstr(f"Wait:{max_wait}")
-            time.sleep(1)
-    
-    if wlan.isconnected():
-        lcd.clear()
-        lcd.putstr("WiFi Connected!")
-        lcd.move_to(0, 1)
-        lcd.putstr(f"IP:{wlan.ifconfig()[0]}")
-        print(f"Connected to {WIFI_SSID}")
-        print(f"IP Address: {wlan.ifconfig()[0]}")
-        time.sleep(2)
-        return True
-    else:
-        lcd.clear()
-        lcd.putstr("WiFi Failed!")
-        print("Failed to connect to WiFi")
-        return False
-
-def sync_time_ntp():
-    """Synchronize time using NTP with timezone adjustment"""
-    try:
-        lcd.clear()
-        lcd.putstr("Syncing NTP...")
-        
-        # Set NTP server
-        ntptime.host = "pool.ntp.org"
-        
-        # Synchronize time with NTP server (this sets UTC time)
-        ntptime.settime()
-        
-        # Apply timezone offset
-        if TIMEZONE_OFFSET != 0:
-            rtc = machine.RTC()
-            current_time = rtc.datetime()
-            year, month, day, weekday, hour, minute, second, subsecond = current_time
-            
-            # Adjust hour for timezone
-            hour = (hour + 3) % 24
-            
-            # Update RTC with timezone-adjusted time
-            rtc.datetime((year, month, day, weekday, hour, minute, second, subsecond))
-        
-        lcd.clear()
-        lcd.putstr("NTP Sync OK!")
-        print("Time successfully synchronized via NTP")
-        time.sleep(1)
-        return True
-        
-    except Exception as e:
-        lcd.clear()
-        lcd.putstr("NTP Sync Failed")
-        lcd.move_to(0, 1)
-        error_msg = str(e)
-        if "ETIMEDOUT" in error_msg:
-            lcd.putstr("Timeout")
-        else:
-            lcd.putstr(error_msg[:16])
-        print(f"NTP Error: {e}")
-        time.sleep(2)
-        return False
+# The network task keeps the link up and starts the web server and NTP
+# once it is; monitoring never waits on either
+link = wifi.WifiSupervisor(wlan, WIFI_SSID, WIFI_PASSWORD, WIFI_CONNECT_TIMEOUT * 1000,
+                           WIFI_RETRY_MIN * 1000, WIFI_RETRY_MAX * 1000)
+web = None  # The web module, imported by make_web_service()
+web_service = None
+web_retry = Deadline()
+WEB_RETRY_INTERVAL = 30  # Seconds between web server start attempts
+
+# Background NTP client, created on the first link up; the ntp task polls
+# it without ever blocking
+time_service = None
+
+# MQTT telemetry client, created on the first link up if MQTT_BROKER is set
+mqtt = None  # The mqtt module, imported by start_telemetry()
+telemetry = None
+mqtt_base = ""  # Topic prefix, <MQTT_TOPIC>/<MAC>
+
+def run_network():
+    """Supervise the WiFi link; start NTP and the web server once it is up"""
+    global web_service
+    was_up = link.is_up()
+    state = link.tick()
+    if state == wifi.UP:
+        boot_times.mark("wifi")
+        ip = wlan.ifconfig()[0]
+        print(f"Connected to {WIFI_SSID}, IP Address: {ip}, RSSI {link.rssi} dBm")
+        show_message("WiFi Connected!", f"IP:{ip}", 2)
+    elif state == wifi.DOWN:
+        print(f"WiFi {link.last_error}, retry in {link.backoff.wait_ms / 1000:.1f}s")
+        if was_up:
+            show_message("WiFi Lost", "Reconnecting...", 2)
+            if web_service is not None:
+                web_service.close_streams()  # Dashboards reconnect their streams when the link is back
+            if telemetry is not None:
+                telemetry.close()  # Reconnects as soon as the link is back
+    
+    if not link.is_up():
+        return
+    if time_service is None:
+        start_time_service()
+    if MQTT_BROKER and telemetry is None:
+        start_telemetry()
+    if web_service is None and not web_retry.pending():
+        web_service = start_web_server()
+        if web_service is None:
+            web_retry.start(WEB_RETRY_INTERVAL * 1000)
+
+def serve_web():
+    """Poll the web server while the link is up"""
+    if web_service is not None and link.is_up():
+        web_service.poll()
+
+def tick_events():
+    """Heartbeat open /events streams"""
+    if web_service is not None:
+        web_service.events.tick()
+
+def show_message(line1, line2="", duration=2):
+    """Show a two-line LCD message and hold it for duration seconds without blocking"""
+    display.show(line1, line2)
+    message_deadline.start(duration * 1000)
+
+def message_active():
+    """Check if a held LCD message is still on screen"""
+    return message_deadline.pending()
+
+def notify(event, data):
+    """Push a transition to open /events dashboards and MQTT, once they are up"""
+    if web_service is not None:
+        web_service.notify(event, data)
+    if telemetry is not None:
+        publish_telemetry(event, data)
+
+def log_event(event, zone=ZONE_NONE):
+    """Record a security event in the journal with the current armed/alarm flags"""
+    flags = (jr.FLAG_ARMED if system_armed else 0) | (jr.FLAG_ALARM if alarm_triggered else 0)
+    stamp = int(hal.wall_time())
+    journal.record(event, zone, flags, stamp)
+    if event_log is not None:
+        # Alarms and disarms reach flash on the next log tick, not inline
+        urgent = event in (jr.EVENT_ALARM, jr.EVENT_DISARM, jr.EVENT_LOCKOUT)
+        event_log.append(event, zone, flags, stamp, urgent)
+
+def flush_event_log():
+    """Write buffered log records to flash (one bounded batch per call)"""
+    if event_log is not None:
+        event_log.tick()
 
 def check_arm_button():
     """Check arm button with debounce"""
-    global last_button_press, arming_in_progress, system_armed, arm_countdown_start
     
-    current_time = time.time()
+    boot_times.mark("armable")
     
     # Check if button is pressed (LOW when pressed with pull-up)
-    if arm_button.value() == 0 and (current_time - last_button_press) > button_debounce_delay:
-        last_button_press = current_time
+    if arm_button.value() == 0 and not button_debounce.pending():
+        button_debounce.start(BUTTON_DEBOUNCE_MS)
         print("Arm button pressed")
         
+        # Only the keypad code ends an alarm - the button is within an intruder's reach
+        if alarm_triggered:
+            print("Arm button ignored - alarm active")
+            return
+        
         # If system is not armed and not already arming, start arming process
         if not system_armed and not arming_in_progress:
-            # Check if entry points are closed and no motion detected
-            if (door_status == "CLOSED" and window_status == "CLOSED" and 
-                motion_status == "NO MOTION"):
-                
-                arming_in_progress = True
-                arm_countdown_start = current_time
-                print("Arming sequence started - 30 second countdown")
-                
-                # Beep to acknowledge arming start
-                for _ in range(2):
-                    buzzer.freq(1000)
-                    buzzer.duty_u16(20000)
-                    time.sleep(0.1)
-                    buzzer.duty_u16(0)
-                    time.sleep(0.1)
-                    
-            else:
-                # Cannot arm - conditions not met
-                print("Cannot arm system - check entry points and motion")
-                lcd.clear()
-                lcd.putstr("Cannot Arm!")
-                if door_status != "CLOSED":
-                    lcd.move_to(0, 1)
-                    lcd.putstr("Close Door")
-                elif window_status != "CLOSED":
-                    lcd.move_to(0, 1)
-                    lcd.putstr("Close Window")
-                elif motion_status != "NO MOTION":
-                    lcd.move_to(0, 1)
-                    lcd.putstr("Motion Detected")
-                time.sleep(2)
+            start_arming()
         
         # If system is armed, disarm it
         elif system_armed and not arming_in_progress:
-            system_armed = False
-            alarm_triggered = False
-            buzzer_active = False
-            buzzer.duty_u16(0)
-            print("System disarmed by button")
-            lcd.clear()
-            lcd.putstr("System")
-            lcd.move_to(0, 1)
-            lcd.putstr("DISARMED")
-            time.sleep(2)
+            disarm("button")
+
+def start_arming():
+    """Start the exit countdown if every entry point is closed and no motion is seen"""
+    global arming_in_progress
+    
+    # Check if entry points are closed and no motion detected
+    if zone_table.ready():
+        arming_in_progress = True
+        arming_deadline.start(ARMING_DELAY * 1000)
+        print("Arming sequence started - 30 second countdown")
+        notify("arming", {"state": "started", "countdown": ARMING_DELAY})
+        log_event(jr.EVENT_ARM_START)
+        
+        # Beep to acknowledge arming start
+        tones.play("arm_ack")
+        return True
+    
+    # Cannot arm - conditions not met
+    print("Cannot arm system - check entry points and motion")
+    zone = zone_table.first_active()
+    if zone is None or zone.kind == zones.MOTION:
+        reason = "Motion Detected"
+    else:
+        reason = "Close " + zone.label
+    show_message("Cannot Arm!", reason, 2)
+    return False
+
+def cancel_arming(reason):
+    """Stop the exit countdown"""
+    global arming_in_progress
+    arming_in_progress = False
+    print(f"Arming cancelled - {reason}")
+    notify("arming", {"state": "cancelled"})
+    log_event(jr.EVENT_ARM_CANCEL)
+    
+    # Beep pattern for cancellation
+    tones.play("arm_cancel")
+    show_message("Arming", "CANCELLED", 2)
+
+def disarm(by):
+    """Disarm an armed system that is not in alarm (the alarm needs the keypad code)"""
+    global system_armed
+    system_armed = False
+    tones.stop()
+    print(f"System disarmed by {by}")
+    notify("alarm", {"state": "disarmed", "by": by})
+    log_event(jr.EVENT_DISARM)
+    show_message("System", "DISARMED", 2)
 
 def update_arming_status():
     """Update arming countdown and check if arming is complete"""
     global arming_in_progress, system_armed
     
     if arming_in_progress:
-        current_time = time.time()
-        time_remaining = ARMING_DELAY - (current_time - arm_countdown_start)
+        time_remaining = arming_deadline.remaining_s()
         
         if time_remaining > 0:
             # Still in countdown - display remaining time
-            lcd.clear()
-            lcd.putstr("Arming System...")
-            lcd.move_to(0, 1)
-            lcd.putstr(f"Exit in: {int(time_remaining)}s")
+            if not message_active():
+                display.show("Arming System...", f"Exit in: {time_remaining}s")
             
             # Check if conditions are still valid during countdown
-            if (door_status != "CLOSED" or window_status != "CLOSED" or 
-                motion_status != "NO MOTION"):
+            if not zone_table.ready():
                 # Conditions violated - cancel arming
-                arming_in_progress = False
-                print("Arming cancelled - conditions violated")
-                lcd.clear()
-                lcd.putstr("Arming")
-                lcd.move_to(0, 1)
-                lcd.putstr("CANCELLED")
-                
-                # Beep pattern for cancellation
-                for _ in range(3):
-                    buzzer.freq(800)
-                    buzzer.duty_u16(25000)
-                    time.sleep(0.2)
-                    buzzer.duty_u16(0)
-                    time.sleep(0.1)
-                time.sleep(2)
+                cancel_arming("conditions violated")
                 
         else:
             # Countdown complete - system is now armed
             arming_in_progress = False
             system_armed = True
             print("System ARMED and ready")
+            notify("arming", {"state": "armed"})
+            log_event(jr.EVENT_ARMED)
             
             # Beep pattern for armed confirmation
-            for _ in range(3):
-                buzzer.freq(1500)
-                buzzer.duty_u16(20000)
-                time.sleep(0.1)
-                buzzer.duty_u16(0)
-                time.sleep(0.05)
+            tones.play("armed")
             
-            lcd.clear()
-            lcd.putstr("SYSTEM ARMED")
-            lcd.move_to(0, 1)
-            lcd.putstr("Monitoring...")
-            time.sleep(2)
+            show_message("SYSTEM ARMED", "Monitoring...", 2)
 
 def generate_security_code():
     """Generate a new 5-digit security code"""
-    global security_code, code_generation_time
+    global security_code
     security_code = ''.join(str(random.randint(0, 9)) for _ in range(5))
-    code_generation_time = time.time()
+    code_expiry.start(CODE_VALIDITY_TIME * 1000)
     print(f"New security code generated: {security_code}")
     return security_code
 
@@ -306,213 +397,133 @@ def is_security_code_valid():
     """Check if the current security code is still valid"""
     if not security_code:
         return False
-    return (time.time() - code_generation_time) < CODE_VALIDITY_TIME
-
-def read_keypad():
-    """Read keypad input and return pressed key"""
-    global last_keypress_time
-    
-    for row_idx, row_pin in enumerate(row_pins):
-        # Set current row high
-        for rp in row_pins:
-            rp.value(0)
-        row_pin.value(1)
-        
-        # Check each column
-        for col_idx, col_pin in enumerate(col_pins):
-            if col_pin.value() == 1:
-                # Debounce
-                current_time = time.time()
-                if current_time - last_keypress_time > 0.3:  # 300ms debounce
-                    last_keypress_time = current_time
-                    # Return the corresponding key
-                    return KEYPAD_MAP[row_idx][col_idx]
-                time.sleep(0.1)  # Additional debounce delay
-    
-    return None
+    return code_expiry.pending()
 
 def handle_keypad_input():
-    """Handle keypad input for security code entry"""
+    """Scan one keypad row, then apply every queued key press to code entry"""
+    keypad.tick()
+    while True:
+        event = keypad.get()
+        if event is None:
+            break
+        key, pressed = event
+        # Presses made while the keypad is disabled are discarded
+        if pressed and keypad_enabled:
+            handle_key(key)
+
+def handle_key(key):
+    """Apply one key press to security code entry"""
     global entered_code, failed_attempts, alarm_triggered, buzzer_active, keypad_enabled, system_armed
     
-    if not keypad_enabled:
-        return
+    print(f"Key pressed: {key}")
     
-    key = read_keypad()
-    
-    if key:
-        print(f"Key pressed: {key}")
-        
-        if key == '#':
-            # Submit code
-            if entered_code == security_code and is_security_code_valid():
-                # Correct code - disarm alarm
-                alarm_triggered = False
-                system_armed = False
-                buzzer_active = False
-                buzzer.duty_u16(0)
-                failed_attempts = 0
-                entered_code = ""
-                keypad_enabled = False
-                print("Alarm disarmed with correct code!")
-                lcd.clear()
-                lcd.putstr("Alarm DISARMED")
-                lcd.move_to(0, 1)
-                lcd.putstr("System Secure")
-                time.sleep(3)
-            else:
-                # Incorrect code
-                failed_attempts += 1
-                entered_code = ""
-                print(f"Invalid code! Attempt {failed_attempts}/{MAX_ATTEMPTS}")
-                lcd.clear()
-                lcd.putstr("INVALID CODE!")
-                lcd.move_to(0, 1)
-                lcd.putstr(f"Try {failed_attempts}/{MAX_ATTEMPTS}")
-                time.sleep(2)
-                
-                if failed_attempts >= MAX_ATTEMPTS:
-                    # Too many failed attempts - lockout
-                    lcd.clear()
-                    lcd.putstr("TOO MANY TRIES")
-                    lcd.move_to(0, 1)
-                    lcd.putstr("SYSTEM LOCKED")
-                    print("System locked due to too many failed attempts")
-                    time.sleep(5)
-                    keypad_enabled = False
-                    
-        elif key == '*':
-            # Clear entered code
+    if key == '#':
+        # Submit code
+        if entered_code == security_code and is_security_code_valid():
+            # Correct code - disarm alarm
+            alarm_triggered = False
+            system_armed = False
+            buzzer_active = False
+            tones.stop()
+            failed_attempts = 0
             entered_code = ""
-            print("Code entry cleared")
-            lcd.clear()
-            lcd.putstr("Code Cleared")
-            time.sleep(1)
+            keypad_enabled = False
+            print("Alarm disarmed with correct code!")
+            notify("alarm", {"state": "disarmed", "by": "keypad"})
+            log_event(jr.EVENT_DISARM)
+            show_message("Alarm DISARMED", "System Secure", 3)
+        else:
+            # Incorrect code
+            failed_attempts += 1
+            entered_code = ""
+            log_event(jr.EVENT_CODE_FAIL)
+            print(f"Invalid code! Attempt {failed_attempts}/{MAX_ATTEMPTS}")
+            show_message("INVALID CODE!", f"Try {failed_attempts}/{MAX_ATTEMPTS}", 2)
             
-        elif key in '0123456789':
-            # Digit pressed
-            if len(entered_code) < 5:
-                entered_code += key
-                print(f"Code entered: {entered_code} (Displaying: {'*' * len(entered_code)})")
-                
-                # Show asterisks on LCD as user types
-                lcd.clear()
-                lcd.putstr("Enter Code:")
-                lcd.move_to(0, 1)
-                
-                # Show asterisks for entered digits
-                display_code = '*' * len(entered_code)
-                lcd.putstr(display_code)
-                
-                # Add a blinking cursor if not all digits entered
-                if len(entered_code) < 5:
-                    lcd.putstr('_')
+            if failed_attempts >= MAX_ATTEMPTS:
+                # Too many failed attempts - lockout
+                show_message("TOO MANY TRIES", "SYSTEM LOCKED", 5)
+                print("System locked due to too many failed attempts")
+                log_event(jr.EVENT_LOCKOUT)
+                keypad_enabled = False
                 
-                # Brief display to show the update
-                time.sleep(0.3)
-
-def read_door_sensor():
-    """Read the door sensor and return status"""
-    global door_status, door_last_state, door_change_count, alarm_triggered, keypad_enabled
-    
-    current_state = door_sensor.value()
-    
-    if current_state == 0:
-        new_status = "CLOSED"
-        status_emoji = ""
-    else:
-        new_status = "OPEN"
-        status_emoji = ""
-    
-    # Detect state change
-    if new_status != door_last_state:
-        door_change_count += 1
-        door_last_state = new_status
-        print(f"Door status changed to: {new_status}")
-        
-        # Trigger alarm if system is armed and door is opened
-        if system_armed and new_status == "OPEN" and not alarm_triggered:
-            alarm_triggered = True
-            alarm_start_time = time.time()
-            keypad_enabled = True
-            generate_security_code()  # Generate new code for disarm
-            print("ALARM TRIGGERED! Door opened while armed.")
-    
-    door_status = new_status
-    return new_status, status_emoji
-
-def read_window_sensor():
-    """Read the window sensor and return status"""
-    global window_status, window_last_state, window_change_count, alarm_triggered, keypad_enabled
-    
-    current_state = window_sensor.value()
-    
-    if current_state == 0:
-        new_status = "CLOSED"
-        status_emoji = ""
-    else:
-        new_status = "OPEN"
-        status_emoji = ""
-    
-    # Detect state change
-    if new_status != window_last_state:
-        window_change_count += 1
-        window_last_state = new_status
-        print(f"Window status changed to: {new_status}")
-        
-        # Trigger alarm if system is armed and window is opened
-        if system_armed and new_status == "OPEN" and not alarm_triggered:
-            alarm_triggered = True
-            alarm_start_time = time.time()
-            keypad_enabled = True
-            generate_security_code()  # Generate new code for disarm
-            print("ALARM TRIGGERED! Window opened while armed.")
-    
-    window_status = new_status
-    return new_status, status_emoji
-
-def read_motion_sensor():
-    """Read the PIR motion sensor and return status"""
-    global motion_status, motion_last_state, motion_detection_count, last_motion_time, alarm_triggered, keypad_enabled
-    
-    current_state = pir_sensor.value()
-    
-    if current_state == 1:
-        new_status = "MOTION DETECTED"
-        status_emoji = ""
-        
-        # Only count new motion events (not continuous detection)
-        if new_status != motion_last_state:
-            motion_detection_count += 1
-            last_motion_time = time.time()
-            print("Motion detected!")
+    elif key == '*':
+        # Clear entered code
+        entered_code = ""
+        print("Code entry cleared")
+        show_message("Code Cleared", "", 1)
+        
+    elif key in '0123456789':
+        # Digit pressed
+        if len(entered_code) < 5:
+            entered_code += key
+            print(f"Code entered: {entered_code} (Displaying: {'*' * len(entered_code)})")
             
-            # Trigger alarm if system is armed and all entry points are closed
-            if system_armed and door_status == "CLOSED" and window_status == "CLOSED" and not alarm_triggered:
-                alarm_triggered = True
-                alarm_start_time = time.time()
-                keypad_enabled = True
-                generate_security_code()  # Generate new code for disarm
-                print("ALARM TRIGGERED! Motion detected while armed.")
-                
-    else:
-        new_status = "NO MOTION"
-        status_emoji = ""
-    
-    # Detect state change
-    if new_status != motion_last_state:
-        motion_last_state = new_status
-        print(f"Motion status: {new_status}")
-    
-    motion_status = new_status
-    return new_status, status_emoji
+            # Show asterisks on LCD as user types, with a cursor if not all digits entered
+            display_code = '*' * len(entered_code)
+            if len(entered_code) < 5:
+                display_code += '_'
+            show_message("Enter Code:", display_code, 0.3)
+
+def trigger_alarm(zone, stamp=None):
+    """Raise the alarm for a zone; stamp is the ticks_us of the causing edge"""
+    global alarm_triggered, alarm_start_time, alarm_edge_us, keypad_enabled
+    alarm_triggered = True
+    alarm_start_time = ticks_ms()
+    alarm_edge_us = ticks_us() if stamp is None else stamp
+    keypad_enabled = True
+    generate_security_code()  # Generate new code for disarm
+    print(f"ALARM TRIGGERED! {zone.label} while armed.")
+    notify("alarm", {"state": "triggered", "zone": zone.name})
+    log_event(jr.EVENT_ALARM, zone.id)
+
+def update_zone(zone, level=None, stamp=None):
+    """Read a zone (or apply a captured edge level) and act on any change"""
+    if level is None:
+        level = zone.pin.value()
+    was_known = zone_table.known & zone.bit
+    if not zone_table.update(zone, level, ticks_ms()):
+        return
+    active = zone_table.state & zone.bit
+    status = zone_table.status(zone)
+    print(f"{zone.label} status: {status}")
+    
+    if zone.kind == zones.ENTRY:
+        log_event(jr.EVENT_ZONE_OPEN if active else jr.EVENT_ZONE_CLOSE, zone.id)
+    elif active:
+        log_event(jr.EVENT_MOTION, zone.id)
+    elif was_known:
+        log_event(jr.EVENT_MOTION_CLEAR, zone.id)
+    notify("sensor", {"zone": zone.name, "status": status, "count": zone.changes})
+    
+    # Entry zones alarm when opened while armed; motion only counts while
+    # every entry zone is closed
+    if active and system_armed and not alarm_triggered:
+        if zone.kind == zones.ENTRY or zone_table.entries_closed():
+            trigger_alarm(zone, stamp)
+
+def apply_sensor_edge(pin_id, level, stamp):
+    """Feed one captured IRQ edge to its zone's settle filter"""
+    zone = zone_table.by_pin.get(pin_id)
+    if zone is not None:
+        zone_table.observe(zone, level, stamp)
 
 def read_all_sensors():
     """Read all sensors"""
-    door_status, door_emoji = read_door_sensor()
-    window_status, window_emoji = read_window_sensor()
-    motion_status, motion_emoji = read_motion_sensor()
-    return door_status, door_emoji, window_status, window_emoji, motion_status, motion_emoji
+    # Captured edges restart each zone's settle time; the live levels catch
+    # any edge the ring dropped. A level counts once it has held long enough,
+    # so a bouncing contact makes one change, stamped with its first edge.
+    sensor_edges.drain(apply_sensor_edge)
+    snapshot = inputs.sample()
+    now = ticks_us()
+    for zone in zone_table.zones:
+        level = (snapshot >> zone.pin_id) & 1
+        if level != zone.seen:
+            zone_table.observe(zone, level, now)
+        level = zone_table.settled(zone, now)
+        if level is not None:
+            update_zone(zone, level, zone.burst_us)
+    return zone_table.state
 
 def control_buzzer():
     """Control buzzer based on alarm state"""
@@ -521,26 +532,21 @@ def control_buzzer():
     if alarm_triggered and not buzzer_active:
         # Activate buzzer - alternating tones for alarm effect
         buzzer_active = True
+        tones.play("alarm")
         print("Alarm buzzer activated!")
         
-    elif alarm_triggered and buzzer_active:
-        # Continue alarm sound
-        for freq in [1000, 1500]:
-            buzzer.freq(freq)
-            buzzer.duty_u16(30000)  # 50% volume
-            time.sleep(0.3)
-            buzzer.duty_u16(0)  # Brief pause
-            time.sleep(0.1)
-            
     elif buzzer_active and not alarm_triggered:
         # Stop buzzer
-        buzzer.duty_u16(0)
+        tones.stop()
         buzzer_active = False
         print("Alarm buzzer deactivated")
+    
+    # Advance whichever pattern is playing to its next step when due
+    tones.tick()
 
 def get_security_status():
     """Get overall security status"""
-    door_status, _, window_status, _, motion_status, _ = read_all_sensors()
+    read_all_sensors()
     
     # Determine security level
     if alarm_triggered:
@@ -549,9 +555,9 @@ def get_security_status():
         return "SYSTEM ARMED", "", "#ff9500"  # Orange - armed and ready
     elif arming_in_progress:
         return "ARMING...", "", "#4a86e8"  # Blue - arming in progress
-    elif door_status == "OPEN" or window_status == "OPEN":
+    elif zone_table.entry_open():
         return "UNSECURE", "", "#ff9500"  # Orange - unsecured
-    elif motion_status == "MOTION DETECTED":
+    elif zone_table.motion():
         return "ACTIVE", "", "#4a86e8"  # Blue - motion but open entry
     else:
         return "READY TO ARM", "", "#51cf66"  # Green - ready to arm
@@ -575,9 +581,9 @@ def get_day_name(weekday):
 
 def get_current_datetime():
     """Get current date and time as formatted strings"""
-    rtc = machine.RTC()
-    current_time = rtc.datetime()
-    year, month, day, weekday, hour, minute, second, subsecond = current_time
+    # The RTC keeps UTC; the timezone is only applied here
+    local = time.gmtime(int(hal.wall_time()) + int(TIMEZONE_OFFSET * 3600))
+    year, month, day, hour, minute, second, weekday = local[:7]
     
     time_str = format_time(hour, minute, second)
     date_str = format_date(year, month, day)
@@ -589,634 +595,355 @@ def display_current_time():
     """Display current time and date on LCD"""
     time_str, date_str, day_str = get_current_datetime()
     
-    lcd.clear()
-    lcd.putstr(time_str.center(16))
-    lcd.move_to(0, 1)
     display_line = f"{date_str} {day_str[:3]}"
-    lcd.putstr(display_line.center(16))
+    display.show(time_str.center(16), display_line.center(16))
 
 def display_alarm_status():
     """Display alarm status on LCD"""
+    # Code entry shows asterisks, plus a cursor if not all digits entered
+    code_line = '*' * len(entered_code)
+    if len(entered_code) < 5:
+        code_line += '_'
+    
     if alarm_triggered:
-        lcd.clear()
-        lcd.putstr("ALARM TRIGGERED!")
-        lcd.move_to(0, 1)
         if keypad_enabled:
-            # Show code entry status with asterisks
-            lcd.putstr("Code:" + '*' * len(entered_code))
-            # Add cursor if not all digits entered
-            if len(entered_code) < 5:
-                lcd.putstr('_')
+            display.show("ALARM TRIGGERED!", "Code:" + code_line)
         else:
-            lcd.putstr("System Locked")
+            display.show("ALARM TRIGGERED!", "System Locked")
     elif arming_in_progress:
         # Handled in update_arming_status()
         pass
     elif keypad_enabled and not alarm_triggered:
-        lcd.clear()
-        lcd.putstr("Enter Code:")
-        lcd.move_to(0, 1)
-        lcd.putstr('*' * len(entered_code))
-        # Add cursor if not all digits entered
-        if len(entered_code) < 5:
-            lcd.putstr('_')
+        display.show("Enter Code:", code_line)
     elif system_armed:
-        lcd.clear()
-        lcd.putstr("SYSTEM ARMED")
-        lcd.move_to(0, 1)
-        lcd.putstr("Monitoring...")
+        display.show("SYSTEM ARMED", "Monitoring...")
 
-def create_web_page():
-    """Create the HTML web page with all sensors and status"""
-    time_str, date_str, day_str = get_current_datetime()
-    random_digits = generate_random_digits()
-    door_status, door_emoji = read_door_sensor()
-    window_status, window_emoji = read_window_sensor()
-    motion_status, motion_emoji = read_motion_sensor()
-    security_status, security_emoji, security_color = get_security_status()
-    
-    # Calculate time since last motion and code expiry
-    time_since_motion = int(time.time() - last_motion_time) if last_motion_time > 0 else "N/A"
-    code_expiry = int(CODE_VALIDITY_TIME - (time.time() - code_generation_time)) if security_code and is_security_code_valid() else 0
-    
-    # Calculate arming countdown if in progress
-    arming_countdown = 0
+def update_display():
+    """Refresh the LCD for the current system state"""
     if arming_in_progress:
-        arming_countdown = max(0, ARMING_DELAY - (time.time() - arm_countdown_start))
-    
-    # Determine status colors
-    door_color = "#ff6b6b" if door_status == "OPEN" else "#51cf66"
-    window_color = "#ff6b6b" if window_status == "OPEN" else "#51cf66"
-    motion_color = "#ff6b6b" if motion_status == "MOTION DETECTED" else "#51cf66"
-    
-    html = """<!DOCTYPE html>
-<html>
-<head>
-    <title>Pico W Security System</title>
-    <meta name="viewport" content="width=device-width, initial-scale=1">
-    <style>
-        body { 
-            font-family: Arial, sans-serif; 
-            text-align: center; 
-            margin: 20px; 
-            background: linear-gradient(135deg, #353638 0%, #292929 100%);
-            color: white;
-            min-height: 100vh;
-        }
-        .container {
-            background: rgba(255,255,255,0.1);
-            padding: 25px;
-            border-radius: 15px;
-            backdrop-filter: blur(10px);
-            box-shadow: 0 8px 32px rgba(0,0,0,0.1);
-            max-width: 800px;
-            margin: 0 auto;
-        }
-        .security-status {
-            font-size: 1.8em;
-            margin: 15px 0;
-            padding: 15px;
-            border-radius: 10px;
-            background: rgba(255,255,255,0.2);
-            border: 3px solid """ + security_color + """;
-            font-weight: bold;
-        }
-        .arming-section {
-            margin: 20px 0;
-            padding: 20px;
-            background: rgba(255,255,255,0.15);
-            border-radius: 10px;
-            border: 2px solid #4a86e8;
-        }
-        .arming-timer {
-            font-size: 2.5em;
-            font-weight: bold;
-            color: #4a86e8;
-            margin: 10px 0;
-            text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
-        }
-        .disarm-section {
-            margin: 20px 0;
-            padding: 20px;
-            background: rgba(255,255,255,0.15);
-            border-radius: 10px;
-            border: 2px solid #ffeb3b;
-        }
-        .security-code {
-            font-size: 3em;
-            font-weight: bold;
-            color: #ffeb3b;
-            margin: 10px 0;
-            text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
-            letter-spacing: 5px;
-        }
-        .code-info {
-            font-size: 1em;
-            margin: 10px 0;
-            color: #a8e6cf;
-        }
-        .keypad-display {
-            margin: 15px 0;
-            padding: 15px;
-            background: rgba(0,0,0,0.3);
-            border-radius: 10px;
-            font-family: monospace;
-        }
-        .entered-code {
-            font-size: 2em;
-            letter-spacing: 10px;
-            margin: 10px 0;
-        }
-        .sensors-grid {
-            display: grid;
-            grid-template-columns: 1fr 1fr 1fr;
-            gap: 15px;
-            margin: 20px 0;
-        }
-        .sensor-card {
-            padding: 20px;
-            border-radius: 10px;
-            background: rgba(255,255,255,0.15);
-            transition: all 0.3s ease;
-            min-height: 120px;
-        }
-        .sensor-alert {
-            background: rgba(255,107,107,0.3);
-            border: 2px solid #ff6b6b;
-            animation: pulse 1s infinite;
-        }
-        .sensor-normal {
-            background: rgba(81,207,102,0.3);
-            border: 2px solid #51cf66;
-        }
-        .sensor-warning {
-            background: rgba(255,149,0,0.3);
-            border: 2px solid #ff9500;
-        }
-        .sensor-emoji {
-            font-size: 2.5em;
-            margin-bottom: 10px;
-        }
-        .sensor-name {
-            font-size: 1.1em;
-            font-weight: bold;
-            margin: 5px 0;
-        }
-        .sensor-status {
-            font-size: 1em;
-            margin: 5px 0;
-            font-weight: bold;
-        }
-        .sensor-counter {
-            font-size: 0.8em;
-            color: #ddd;
-            margin-top: 8px;
-        }
-        .buzzer-status {
-            margin: 15px 0;
-            padding: 10px;
-            border-radius: 8px;
-            background: rgba(255,255,255,0.2);
-            font-weight: bold;
-        }
-        .buzzer-active {
-            background: rgba(255,0,0,0.3);
-            color: #ff6b6b;
-        }
-        .buzzer-inactive {
-            background: rgba(81,207,102,0.3);
-        }
-        .keypad-status {
-            margin: 15px 0;
-            padding: 10px;
-            border-radius: 8px;
-            background: rgba(255,255,255,0.2);
-        }
-        .attempts-warning {
-            color: #ff6b6b;
-            font-weight: bold;
-        }
-        .arm-button-info {
-            margin: 15px 0;
-            padding: 10px;
-            border-radius: 8px;
-            background: rgba(255,255,255,0.2);
-            font-size: 0.9em;
-        }
-        .time {
-            font-size: 2em;
-            margin: 10px 0;
-        }
-        .date {
-            font-size: 1.5em;
-            margin: 10px 0;
-        }
-        .day {
-            font-size: 1.2em;
-            margin: 10px 0;
-            color: #a8e6cf;
-        }
-        .info {
-            margin-top: 20px;
-            font-size: 0.9em;
-            color: #ccc;
-            border-top: 1px solid rgba(255,255,255,0.2);
-            padding-top: 15px;
-        }
-        .refresh-btn {
-            background: #4ecdc4;
-            color: white;
-            border: none;
-            padding: 12px 25px;
-            border-radius: 25px;
-            cursor: pointer;
-            font-size: 1em;
-            margin: 10px 5px;
-            transition: background 0.3s;
-        }
-        .refresh-btn:hover {
-            background: #45b7af;
-        }
-        @keyframes pulse {
-            0% { opacity: 1; }
-            50% { opacity: 0.7; }
-            100% { opacity: 1; }
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>Home Security System</h1>
-        
-        <!-- Security Status -->
-        <div class="security-status">
-            <div style="font-size: 1.2em;">System Status</div>
-            <div style="font-size: 1.5em; color: """ + security_color + """;">
-                """ + security_emoji + """ """ + security_status + """
-            </div>
-        </div>
-        
-        <!-- Arming Section -->
-        """ + ("""
-        <div class="arming-section">
-            <h2>⏱️ ARMING IN PROGRESS</h2>
-            <div class="arming-timer" id="armingTimer">
-                """ + str(int(arming_countdown)) + """s
-            </div>
-            <div class="code-info">
-                Exit the premises now!<br>
-                System will arm in <span id="armingSeconds">""" + str(int(arming_countdown)) + """</span> seconds
-            </div>
-        </div>
-        """ if arming_in_progress else "") + """
-        
-        <!-- Disarm Section -->
-        """ + ("""
-        <div class="disarm-section">
-            <h2> ALARM ACTIVE - DISARM REQUIRED</h2>
-            <div class="security-code" id="securityCode">
-                """ + (security_code if is_security_code_valid() else "EXPIRED") + """
-            </div>
-            <div class="code-info">
-                """ + ("Enter this code on keypad to disarm" if is_security_code_valid() else "Code expired - new motion required") + """
-                <br>Expires in: """ + str(code_expiry) + """ seconds
-                <br>Failed attempts: """ + str(failed_attempts) + """ / """ + str(MAX_ATTEMPTS) + """
-            </div>
-            
-            <!-- Keypad Entry Display -->
-            <div class="keypad-display">
-                <h3> Keypad Entry</h3>
-                <div class="entered-code">
-                    """ + ('*' * len(entered_code)) + (('_' * (5 - len(entered_code))) if len(entered_code) < 5 else "") + """
-                </div>
-                <div class="code-info">
-                    Digits entered: """ + str(len(entered_code)) + """ / 5<br>
-                    Press # to submit | Press * to clear
-                </div>
-            </div>
-        </div>
-        """ if alarm_triggered else "") + """
-        
-        <!-- Buzzer Status -->
-        <div class="buzzer-status """ + ('buzzer-active' if buzzer_active else 'buzzer-inactive') + """">
-             Buzzer: """ + ('ACTIVE' if buzzer_active else 'INACTIVE') + """
-        </div>
-        
-        <!-- Keypad Status -->
-        <div class="keypad-status">
-            Keypad: """ + ('ENABLED - Enter code #' if keypad_enabled else 'DISABLED') + """
-            """ + ("""<br><span class="attempts-warning">Failed attempts: """ + str(failed_attempts) + """</span>""" if failed_attempts > 0 else "") + """
-        </div>
-        
-        <!-- Arm Button Info -->
-        <div class="arm-button-info">
-             Arm Button: GP""" + str(ARM_BUTTON_PIN) + """ | """ + ("ENTER PASSWORD TO DISARM" if system_armed else "PRESS BUTTON TO ARM") + """
-            <br>Arming requires: All entry points CLOSED + NO MOTION
-        </div>
-        
-        <!-- Sensors Grid -->
-        <div class="sensors-grid">
-            <!-- Door Sensor -->
-            <div class="sensor-card """ + ('sensor-alert' if door_status == 'OPEN' else 'sensor-normal') + """">
-                <div class="sensor-emoji">""" + door_emoji + """</div>
-                <div class="sensor-name">Front Door</div>
-                <div class="sensor-status" style="color: """ + door_color + """;">
-                    """ + door_status + """
-                </div>
-                <div class="sensor-counter">Changes: """ + str(door_change_count) + """</div>
-            </div>
-            
-            <!-- Window Sensor -->
-            <div class="sensor-card """ + ('sensor-alert' if window_status == 'OPEN' else 'sensor-normal') + """">
-                <div class="sensor-emoji">""" + window_emoji + """</div>
-                <div class="sensor-name">Window</div>
-                <div class="sensor-status" style="color: """ + window_color + """;">
-                    """ + window_status + """
-                </div>
-                <div class="sensor-counter">Changes: """ + str(window_change_count) + """</div>
-            </div>
-            
-            <!-- Motion Sensor -->
-            <div class="sensor-card """ + ('sensor-warning' if motion_status == 'MOTION DETECTED' else 'sensor-normal') + """">
-                <div class="sensor-emoji">""" + motion_emoji + """</div>
-                <div class="sensor-name">Motion Sensor</div>
-                <div class="sensor-status" style="color: """ + motion_color + """;">
-                    """ + motion_status + """
-                </div>
-                <div class="sensor-counter">
-                    Detections: """ + str(motion_detection_count) + """<br>
-                    Last: """ + str(time_since_motion) + """s ago
-                </div>
-            </div>
-        </div>
-        
-        <!-- Random Digits Section -->
-        <div class="security-code" id="randomDigits">
-            """ + random_digits + """
-        </div>
-        
-        <!-- Time Information -->
-        <div class="time" id="currentTime">
-             """ + time_str + """
-        </div>
-        
-        <div class="date" id="currentDate">
-            """ + date_str + """
-        </div>
-        
-        <div class="day" id="currentDay">
-            """ + day_str + """
-        </div>
-        
-        <!-- Refresh Button -->
-        <button class="refresh-btn" onclick="location.reload()">
-             Refresh Status
-        </button>
-        
-        <!-- System Information -->
-        <div class="info">
-            <p> Door: GP""" + str(DOOR_SENSOR_PIN) + """ | 🪟 Window: GP""" + str(WINDOW_SENSOR_PIN) + """ | ️ Motion: GP""" + str(PIR_SENSOR_PIN) + """ |  Buzzer: GP""" + str(BUZZER_PIN) + """ |  Arm Button: GP""" + str(ARM_BUTTON_PIN) + """</p>
-            <p> Keypad: Rows[GP""" + str(ROWS[0]) + """,GP""" + str(ROWS[1]) + """,GP""" + str(ROWS[2]) + """,GP""" + str(ROWS[3]) + """] Cols[GP""" + str(COLS[0]) + """,GP""" + str(COLS[1]) + """,GP""" + str(COLS[2]) + """]</p>
-            <p>️ Server: Raspberry Pi Pico W |  MAC: """ + pico_mac_address + """</p>
-            <p> IP: """ + wlan.ifconfig()[0] + """ |  Auto-refresh every 30 seconds</p>
-        </div>
-    </div>
-    
-    <script>
-        // Auto-refresh page every 30 seconds
-        setTimeout(function() {
-            location.reload();
-        }, 30000);
-        
-        // Add urgency effect for alert sensors
-        document.querySelectorAll('.sensor-alert, .sensor-warning').forEach(sensor => {
-            setInterval(() => {
-                sensor.style.transform = sensor.style.transform ? '' : 'scale(1.02)';
-            }, 800);
-        });
-        
-        // Update arming timer every second
-        """ + ("""
-        setInterval(function() {
-            const timerElement = document.getElementById('armingTimer');
-            const secondsElement = document.getElementById('armingSeconds');
-            let remainingTime = """ + str(int(arming_countdown)) + """ - 1;
-            if (remainingTime <= 0) {
-                location.reload(); // Refresh when countdown completes
-            } else {
-                timerElement.textContent = remainingTime + 's';
-                secondsElement.textContent = remainingTime;
-            }
-        }, 1000);
-        """ if arming_in_progress else "") + """
-        
-        // Update code expiry timer every second
-        """ + ("""
-        setInterval(function() {
-            const codeElement = document.getElementById('securityCode');
-            const codeInfo = document.querySelector('.code-info');
-            let expiryTime = """ + str(code_expiry) + """ - 1;
-            if (expiryTime <= 0) {
-                codeElement.textContent = 'EXPIRED';
-                codeInfo.innerHTML = 'Code expired - new motion required<br>Failed attempts: """ + str(failed_attempts) + """ / """ + str(MAX_ATTEMPTS) + """';
-            } else {
-                codeInfo.innerHTML = 'Enter this code on keypad to disarm<br>Expires in: ' + expiryTime + ' seconds<br>Failed attempts: """ + str(failed_attempts) + """ / """ + str(MAX_ATTEMPTS) + """';
-            }
-        }, 1000);
-        """ if alarm_triggered else "") + """
-    </script>
-</body>
-</html>"""
-    return html
+        update_arming_status()
+    elif message_active():
+        # Leave the held message on screen until it expires
+        pass
+    elif alarm_triggered or keypad_enabled or system_armed:
+        display_alarm_status()
+    else:
+        display_current_time()
+
+def get_status():
+    """Collect every value the dashboard shows, for the page and /api/status"""
+    time_str, date_str, day_str = get_current_datetime()
+    security_status, _, security_color = get_security_status()  # Reads every zone
+    code_valid = is_security_code_valid()
+    
+    return {
+        "security": security_status,
+        "color": security_color,
+        "armed": system_armed,
+        "arming": arming_in_progress,
+        "alarm": alarm_triggered,
+        "arming_countdown": arming_deadline.remaining_s() if arming_in_progress else 0,
+        "code": (security_code if code_valid else "EXPIRED") if alarm_triggered else "",
+        "code_valid": code_valid,
+        "code_expiry": code_expiry.remaining_s() if security_code else 0,
+        "failed_attempts": failed_attempts,
+        "max_attempts": MAX_ATTEMPTS,
+        "digits": len(entered_code),
+        "keypad": keypad_enabled,
+        "buzzer": buzzer_active,
+        "buzzer_pattern": tones.pattern,
+        "zones": [get_zone_status(zone) for zone in zone_table.zones],
+        "random": generate_random_digits(),
+        "time": time_str,
+        "date": date_str,
+        "day": day_str,
+        "time_synced": time_service is not None and time_service.synced,
+        "edges": sensor_edges.captured,
+        "edges_dropped": sensor_edges.overflows,
+        "lcd_bps": display.bytes_per_second,
+        "boot_ms": dict(boot_times.values()),
+        "memory": memory.LEVEL_NAMES[memory_manager.level],
+        "mqtt": mqtt.STATE_NAMES[telemetry.state] if telemetry is not None else "off",
+        "wifi": {
+            "state": wifi.STATE_NAMES[link.state],
+            "uptime": link.uptime_s(),
+            "rssi": link.rssi,
+            "reconnects": link.reconnects,
+            "drops": link.drops,
+            "failures": link.failures,
+        },
+    }
+
+def get_zone_status(zone):
+    """One zone's entry in /api/status"""
+    last = zone.last_active_ms
+    return {
+        "name": zone.name,
+        "label": zone.label,
+        "pin": zone.pin_id,
+        "motion": zone.kind == zones.MOTION,
+        "active": zone_table.is_active(zone),
+        "status": zone_table.status(zone),
+        "changes": zone.changes,
+        "ago": elapsed_ms(last) // 1000 if last is not None else None,
+    }
+
+def get_events_page(since, limit):
+    """Journal entries from cursor `since` for /api/events, plus the next cursor"""
+    start = max(since, journal.oldest)
+    entries = []
+    for seq, stamp, event, zone, flags in journal.since(start, limit):
+        entries.append([seq, stamp, jr.EVENT_NAMES[event], zone_table.name(zone), flags])
+    return {
+        "next": start + len(entries),
+        "oldest": journal.oldest,
+        "missed": max(0, journal.oldest - since),  # Entries overwritten before the client read them
+        "events": entries,
+    }
+
+def get_metric_counters():
+    """Counter and gauge values for /metrics besides task timings, heap and the web server"""
+    ts = time_service  # Created before the web server, so never None here
+    counters = (
+        ("sensor_edges_total", "counter", "Sensor edges captured by IRQ", sensor_edges.captured),
+        ("sensor_edges_dropped_total", "counter", "Edges lost to ring overflow", sensor_edges.overflows),
+        ("lcd_i2c_bytes_total", "counter", "Bytes sent to the LCD", display.bytes_total),
+        ("journal_events_total", "counter", "Security events recorded", journal.seq),
+        ("eventlog_dropped_total", "counter", "Events not persisted (buffer full)",
+         event_log.dropped if event_log is not None else 0),
+        ("eventlog_max_flush_us", "gauge", "Longest flash flush",
+         event_log.max_flush_us if event_log is not None else 0),
+        ("boot_stage_ms", "gauge", "Milliseconds from start-up to each boot stage",
+         [('stage="' + stage + '"', ms) for stage, ms in boot_times.values()]),
+        ("import_us", "gauge", "Time taken by each import step",
+         [('module="' + name + '"', us) for name, us, _ in boot_times.imports]),
+        ("import_heap_bytes", "gauge", "Heap left allocated by each import step (incl. compiler garbage)",
+         [('module="' + name + '"', used or 0) for name, _, used in boot_times.imports]),
+        ("memory_level", "gauge", "0 normal, 1 low (heavy pages refused), 2 critical", memory_manager.level),
+        ("gc_scheduled_total", "counter", "Collections run by the memory task", memory_manager.collections),
+        ("gc_forced_total", "counter", "Collections that could not wait for idle time", memory_manager.forced),
+        ("gc_max_pause_us", "gauge", "Longest scheduled collection", memory_manager.max_collect_us),
+        ("heap_free_after_gc_bytes", "gauge", "Free heap after the last collection",
+         memory_manager.free_after or 0),
+        ("heap_largest_free_bytes", "gauge", "Largest allocatable block (probed)",
+         memory_manager.largest_free or 0),
+        ("http_refused_low_memory_total", "counter", "Requests refused for low memory", memory_manager.refused),
+        ("wifi_up", "gauge", "1 while the WiFi link is up", int(link.is_up())),
+        ("wifi_uptime_seconds", "gauge", "Time since the link last came up", link.uptime_s()),
+        ("wifi_rssi_dbm", "gauge", "Signal strength, sampled every 5 s", link.rssi or 0),
+        ("wifi_attempts_total", "counter", "Connection attempts", link.attempts),
+        ("wifi_failures_total", "counter", "Connection attempts that failed", link.failures),
+        ("wifi_drops_total", "counter", "Times an up link was lost", link.drops),
+        ("wifi_reconnects_total", "counter", "Times the link came back after a drop", link.reconnects),
+        ("ntp_syncs_total", "counter", "Successful NTP syncs", ts.syncs),
+        ("ntp_failures_total", "counter", "Failed NTP syncs", ts.failures),
+        ("ntp_rtt_ms", "gauge", "Round trip of the last NTP sync", ts.rtt_ms),
+        ("ntp_last_step_ms", "gauge", "RTC error corrected by the last NTP sync", ts.last_step_ms),
+        ("ntp_drift_ppm", "gauge", "Estimated local clock drift (positive: slow)", ts.drift_ppm or 0),
+        ("system_armed", "gauge", "1 while armed", int(system_armed)),
+        ("alarm_active", "gauge", "1 while the alarm is triggered", int(alarm_triggered)),
+        ("failed_attempts", "gauge", "Wrong codes since the last disarm", failed_attempts),
+    )
+    if telemetry is not None:
+        counters += (
+            ("mqtt_up", "gauge", "1 while connected to the MQTT broker", int(telemetry.is_up())),
+            ("mqtt_published_total", "counter", "MQTT messages sent", telemetry.published),
+            ("mqtt_dropped_total", "counter", "MQTT events lost to a full queue", telemetry.dropped),
+            ("mqtt_failures_total", "counter", "MQTT connection attempts that failed", telemetry.failures),
+            ("mqtt_drops_total", "counter", "Times an MQTT connection was lost", telemetry.drops),
+            ("mqtt_commands_total", "counter", "Messages received on the control topic", telemetry.received),
+        )
+    return counters
+
+def get_page_info():
+    """Wiring and network slots of the dashboard page"""
+    return {
+        "buzzer_pin": BUZZER_PIN,
+        "arm_pin": ARM_BUTTON_PIN,
+        "keypad_rows": ",".join("GP" + str(pin) for pin in ROWS),
+        "keypad_cols": ",".join("GP" + str(pin) for pin in COLS),
+        "mac": pico_mac_address,
+        "ip": wlan.ifconfig()[0],
+    }
+
+def make_web_service():
+    """Import the web stack on first use and build the service, not yet listening"""
+    global web
+    if web is None:
+        begun = boot_times.begin_import()
+        import web
+        boot_times.imported("web", begun)
+    return web.WebService(WEB_PORT, http_buffers, memory_manager, scheduler, heap_watch,
+                          get_status, get_events_page, get_metric_counters, get_page_info)
 
 def start_web_server():
     """Start the web server"""
     try:
-        # Create socket
-        addr = socket.getaddrinfo('0.0.0.0', WEB_PORT)[0][-1]
-        server_socket = socket.socket()
-        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        server_socket.bind(addr)
-        server_socket.listen(1)
+        service = make_web_service()
+        service.start()
         
+        boot_times.mark("web")
         print(f"Web server started on http://{wlan.ifconfig()[0]}:{WEB_PORT}")
         
         # Display server info on LCD
-        lcd.clear()
-        lcd.putstr("Web Server ON")
-        lcd.move_to(0, 1)
-        lcd.putstr(f"Port:{WEB_PORT}")
-        time.sleep(2)
+        show_message("Web Server ON", f"Port:{WEB_PORT}", 2)
         
-        return server_socket
+        return service
         
     except Exception as e:
         print(f"Failed to start web server: {e}")
-        lcd.clear()
-        lcd.putstr("Server Error")
-        lcd.move_to(0, 1)
-        lcd.putstr(str(e)[:16])
+        show_message("Server Error", str(e)[:16], 2)
         return None
 
-def handle_web_requests(server_socket):
-    """Handle incoming web requests"""
-    try:
-        while True:
-            # Check for client connection with timeout
-            try:
-                server_socket.settimeout(1.0)  # 1 second timeout
-                client, addr = server_socket.accept()
-            except OSError:
-                # Timeout occurred, continue to check display and sensors
-                return True  # Continue running
-            
-            print(f"Client connected from: {addr}")
-            
-            # Receive request
-            request = client.recv(1024)
-            request_str = request.decode('utf-8')
-            print(f"Request: {request_str.split('\\r\\n')[0]}")
-            
-            # Generate and send response
-            response = create_web_page()
-            client.send('HTTP/1.0 200 OK\r\nContent-type: text/html\r\n\r\n')
-            client.send(response)
-            client.close()
-            
-            print("Response sent to client")
-            
-    except Exception as e:
-        print(f"Error handling web request: {e}")
-        return True  # Continue running
+def start_time_service():
+    """Import the NTP client and start syncing in the background"""
+    global time_service
+    begun = boot_times.begin_import()
+    from timesync import TimeService
+    boot_times.imported("timesync", begun)
+    time_service = TimeService(NTP_HOST, NTP_PORT, wall_time=hal.wall_time,
+                               set_utc=hal.set_utc, online=link.is_up,
+                               interval_ms=NTP_SYNC_INTERVAL * 1000, retry_min_ms=NTP_RETRY_MIN * 1000,
+                               retry_max_ms=NTP_RETRY_MAX * 1000)
+
+def run_time_service():
+    """Advance the NTP exchange and report finished syncs"""
+    if time_service is None:
+        return
+    result = time_service.tick()
+    if result:
+        boot_times.mark("time")
+        drift = time_service.drift_ppm
+        drift = "n/a" if drift is None else f"{drift:.1f} ppm"
+        print(f"NTP sync OK: corrected {time_service.last_step_ms} ms, "
+              f"rtt {time_service.rtt_ms} ms, drift {drift}")
+    elif result is False:
+        print(f"NTP Error: {time_service.last_error}, retry in {time_service.backoff.wait_ms / 1000:.1f}s")
+
+def start_telemetry():
+    """Import the MQTT client and start publishing in the background"""
+    global mqtt, telemetry, mqtt_base
+    begun = boot_times.begin_import()
+    import mqtt
+    boot_times.imported("mqtt", begun)
+    mqtt_base = MQTT_TOPIC + "/" + pico_mac_address
+    telemetry = mqtt.MqttClient(MQTT_BROKER, "seckeja-" + pico_mac_address, MQTT_PORT,
+                                MQTT_USER, MQTT_PASSWORD, will=(mqtt_base + "/availability", "offline"),
+                                on_message=handle_mqtt_command, online=link.is_up)
+    telemetry.set_state(mqtt_base + "/availability", "online")
+    for zone in zone_table.zones:
+        telemetry.set_state(mqtt_base + "/zone/" + zone.name, zone_table.status(zone))
+    telemetry.set_state(mqtt_base + "/status", json.dumps(get_telemetry_status()))
+    if MQTT_CONTROL:
+        telemetry.subscribe(mqtt_base + "/control")
+
+def get_telemetry_status():
+    """Summary kept retained on <topic>/status"""
+    return {
+        "armed": system_armed,
+        "arming": arming_in_progress,
+        "alarm": alarm_triggered,
+        "keypad": keypad_enabled,
+        "failed_attempts": failed_attempts,
+        "zones": zone_table.state,
+    }
+
+def publish_telemetry(event, data):
+    """Queue one transition as an MQTT event and refresh the retained states"""
+    message = {"event": event, "time": int(hal.wall_time())}
+    message.update(data)
+    telemetry.publish(mqtt_base + "/event", json.dumps(message))
+    if event == "sensor":
+        telemetry.set_state(mqtt_base + "/zone/" + data["zone"], data["status"])
+    telemetry.set_state(mqtt_base + "/status", json.dumps(get_telemetry_status()))
+
+def handle_mqtt_command(topic, payload):
+    """Apply "arm" or "disarm" from the control topic, like the arm button"""
+    command = payload.decode().strip().lower()
+    print(f"MQTT command: {command}")
+    if alarm_triggered:
+        # Only the keypad code ends an alarm
+        print("MQTT command ignored - alarm active")
+    elif command == "arm":
+        if not system_armed and not arming_in_progress:
+            start_arming()
+    elif command == "disarm":
+        if arming_in_progress:
+            cancel_arming("disarmed over MQTT")
+        elif system_armed:
+            disarm("mqtt")
+
+def run_telemetry():
+    """Advance the MQTT connection and its batched publishes"""
+    if telemetry is None:
+        return
+    state = telemetry.tick()
+    if state == mqtt.UP:
+        boot_times.mark("mqtt")
+        print(f"MQTT connected to {MQTT_BROKER}, publishing under {mqtt_base}")
+    elif state == mqtt.DOWN:
+        print(f"MQTT {telemetry.last_error}, retry in {telemetry.backoff.wait_ms / 1000:.1f}s")
 
-def display_welcome():
-    """Display welcome message"""
-    lcd.clear()
-    lcd.putstr("Security System")
-    lcd.move_to(0, 1)
-    lcd.putstr("Arm Button Ready")
-    time.sleep(2)
+def manage_memory():
+    """Collect garbage when the gap before the next task leaves room for it"""
+    memory_manager.tick(scheduler.idle_ms())
 
 def test_sensors():
-    """Test all sensors during startup"""
-    lcd.clear()
-    lcd.putstr("Testing Sensors")
-    door_status, door_emoji = read_door_sensor()
-    window_status, window_emoji = read_window_sensor()
-    motion_status, motion_emoji = read_motion_sensor()
-    lcd.move_to(0, 1)
-    lcd.putstr(f"D:{door_status[0]} W:{window_status[0]} M:{motion_status[0]}")
-    print(f"Initial test - Door: {door_status}, Window: {window_status}, Motion: {motion_status}")
-    time.sleep(2)
+    """Read every zone at start-up and show the result"""
+    read_all_sensors()
+    boot_times.mark("sensors")
+    summary = " ".join(zone.name[0].upper() + ":" + zone_table.status(zone)[0] for zone in zone_table.zones)
+    show_message("Security System", summary, 2)
+    print("Initial test - " + ", ".join(zone.label + ": " + zone_table.status(zone) for zone in zone_table.zones))
 
 def main():
-    """Main program loop"""
-    # Display welcome message
-    display_welcome()
-    
-    # Test all sensors
+    """Start monitoring at once; WiFi, the web server and NTP follow as background tasks"""
+    log_event(jr.EVENT_BOOT)  # Stamped by the unsynced RTC until NTP has run
     test_sensors()
     
-    # Connect to WiFi
-    if not connect_wifi():
-        # If WiFi fails, show error and retry every 30 seconds
-        while True:
-            lcd.clear()
-            lcd.putstr("WiFi Failed")
-            lcd.move_to(0, 1)
-            lcd.putstr("Retry in 30s")
-            time.sleep(30)
-            if connect_wifi():
-                break
-    
-    # Synchronize time with NTP
-    if not sync_time_ntp():
-        # If NTP sync fails, retry every 2 minutes
-        while True:
-            lcd.clear()
-            lcd.putstr("NTP Sync Fail")
-            lcd.move_to(0, 1)
-            lcd.putstr("Retry in 2m")
-            time.sleep(120)
-            if sync_time_ntp():
-                break
-    
-    # Start web server
-    server_socket = start_web_server()
-    if not server_socket:
-        print("Failed to start web server")
-        return
-    
-    # Main security loop
-    last_sync = time.time()
-    last_display_update = time.time()
-    last_motion_check = time.time()
-    last_keypad_check = time.time()
-    last_button_check = time.time()
-    sync_interval = 3600  # Sync every hour
-    display_interval = 0.5  # Update display every 0.5 seconds
-    motion_check_interval = 0.1  # Check motion every 100ms
-    keypad_check_interval = 0.05  # Check keypad every 50ms
-    button_check_interval = 0.1  # Check button every 100ms
-    
-    while True:
-        current_time = time.time()
-        
-        # Update display at regular intervals
-        if current_time - last_display_update >= display_interval:
-            if arming_in_progress:
-                update_arming_status()
-            elif alarm_triggered or keypad_enabled or system_armed:
-                display_alarm_status()
-            else:
-                display_current_time()
-            last_display_update = current_time
-        
-        # Check arm button
-        if current_time - last_button_check >= button_check_interval:
-            check_arm_button()
-            last_button_check = current_time
-        
-        # Check motion sensor frequently
-        if current_time - last_motion_check >= motion_check_interval:
-            read_all_sensors()
-            control_buzzer()
-            last_motion_check = current_time
-        
-        # Check keypad input frequently
-        if current_time - last_keypad_check >= keypad_check_interval:
-            handle_keypad_input()
-            last_keypad_check = current_time
-        
-        # Handle web requests (non-blocking)
-        if not handle_web_requests(server_socket):
-            break
-        
-        # Check if it's time to resync time
-        if current_time - last_sync >= sync_interval:
-            lcd.clear()
-            lcd.putstr("Resyncing NTP...")
-            if sync_time_ntp():
-                last_sync = current_time
-            else:
-                last_sync = current_time - sync_interval + 600
-
-# Run the program
-try:
-    main()
-except KeyboardInterrupt:
-    # Stop buzzer and cleanup
-    buzzer.duty_u16(0)
-    lcd.clear()
-    lcd.putstr("System stopped")
-    print("Security system stopped by user")
-except Exception as e:
-    # Stop buzzer and cleanup
-    buzzer.duty_u16(0)
-    lcd.clear()
-    lcd.putstr("Fatal Error")
-    lcd.move_to(0, 1)
-    lcd.putstr("Reset...")
-    print(f"Fatal error: {e}")
-    time.sleep(5)
-    machine.reset()
+    # Security tasks - live from the first scheduler pass
+    scheduler.add("display", 500, update_display)
+    scheduler.add("button", 100, check_arm_button)
+    scheduler.add("sensors", 100, read_all_sensors)
+    scheduler.add("buzzer", 10, control_buzzer)
+    scheduler.add("keypad", 10, handle_keypad_input)  # Full 4-row scan every 40 ms
+    scheduler.add("eventlog", 250, flush_event_log)
+    # Optional services - each does nothing until the network is up
+    scheduler.add("network", 500, run_network)
+    scheduler.add("web", 20, serve_web)
+    scheduler.add("events", 1000, tick_events)
+    scheduler.add("ntp", 100, run_time_service)
+    scheduler.add("mqtt", 50, run_telemetry)
+    scheduler.add("memory", 20, manage_memory)
+    scheduler.run_forever()
+
+def run():
+    """Run the system until interrupted; reset after a fatal error"""
+    try:
+        main()
+    except KeyboardInterrupt:
+        # Stop buzzer and cleanup
+        buzzer.duty_u16(0)
+        if web_service is not None:
+            web_service.close_streams()
+        if event_log is not None:
+            event_log.flush()
+        display.show("System stopped")
+        print("Security system stopped by user")
+    except Exception as e:
+        # Stop buzzer and cleanup
+        buzzer.duty_u16(0)
+        display.show("Fatal Error", "Reset...")
+        print(f"Fatal error: {e}")
+        if event_log is not None:
+            try:
+                event_log.flush()  # Keep the audit trail across the reset
+            except OSError:
+                pass
+        hal.sleep(5)
+        hal.reset()
+
+# Run the program (importing Main, e.g. from the host simulator or the
+# main.py stub that loads a precompiled Main.mpy, does not)
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,327 @@
+# bench.py - Hot path benchmarks for the Pico W Security System
+# Host:    python bench.py [iterations] [--json results.json]
+# Device:  mpremote run bench.py   (or import bench; bench.main() at the REPL)
+# Imports Main without starting it (hal picks simulated hardware on CPython)
+# and times one pass of the periodic tasks, the sensor edge to alarm path,
+# the page and /api/status renders, an idle keypad scan and the bulk vs
+# per-pin GPIO snapshot. Prints one JSON document so runs can be compared
+# over time.
+import gc
+import json
+import sys
+
+try:
+    from time import ticks_us, ticks_diff
+
+    def now_us():
+        return ticks_us()
+except ImportError:
+    from time import perf_counter_ns
+
+    def now_us():
+        return perf_counter_ns() // 1000
+
+    def ticks_diff(a, b):
+        return a - b
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+ITERATIONS = 200
+
+
+class _Mute:
+    """Swallow the system's own prints while timing (host only)"""
+
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0
+    i = min(len(sorted_values) - 1, (len(sorted_values) * pct) // 100)
+    return sorted_values[i]
+
+
+def summarize(samples, alloc_bytes=None, **extra):
+    samples = sorted(samples)
+    result = {
+        "n": len(samples),
+        "p50_us": percentile(samples, 50),
+        "p99_us": percentile(samples, 99),
+        "max_us": samples[-1] if samples else 0,
+        "mean_us": sum(samples) // len(samples) if samples else 0,
+    }
+    if alloc_bytes is not None:
+        result["alloc_bytes"] = alloc_bytes
+    result.update(extra)
+    return result
+
+
+def measure_alloc(func, iterations):
+    """Average bytes allocated per call of func"""
+    gc.collect()
+    if hasattr(gc, "mem_alloc"):
+        # MicroPython: with the collector off every allocation shows up in mem_alloc
+        gc.disable()
+        before = gc.mem_alloc()
+        for _ in range(iterations):
+            func()
+        used = gc.mem_alloc() - before
+        gc.enable()
+        return used // iterations
+    if tracemalloc is None:
+        return None
+    # CPython: peak transient heap above the starting point, per call
+    tracemalloc.start()
+    total = 0
+    for _ in range(iterations):
+        start, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        total += peak - start
+    tracemalloc.stop()
+    return total // iterations
+
+
+def time_calls(func, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = now_us()
+        func()
+        samples.append(ticks_diff(now_us(), start))
+    return samples
+
+
+def reset_alarm(main):
+    """Put the system back to armed, quiet and the door closed"""
+    main.system_armed = False
+    main.update_zone(main.zone_table.by_pin[main.DOOR_SENSOR_PIN], 0)
+    main.system_armed = True
+    main.arming_in_progress = False
+    main.alarm_triggered = False
+    main.keypad_enabled = False
+    main.tones.stop()
+    main.buzzer_active = False
+
+
+def bench_loop(main, iterations):
+    """One pass of every periodic task except the web server and NTP"""
+    def one_pass():
+        main.update_display()
+        main.check_arm_button()
+        main.read_all_sensors()
+        main.control_buzzer()
+        main.handle_keypad_input()
+        main.tick_events()
+        if main.event_log is not None:
+            main.event_log.tick()
+    one_pass()
+    samples = time_calls(one_pass, iterations)
+    return summarize(samples, measure_alloc(one_pass, iterations))
+
+
+def bench_edge_to_alarm(main, iterations):
+    """Settled IRQ edge -> sensors task -> alarm_triggered (processing time)"""
+    from clock import ticks_add
+    samples = []
+    door = main.DOOR_SENSOR_PIN
+    zone = main.zone_table.by_pin[door]
+    live = zone.pin
+    simulated = hasattr(live, "drive")
+    if not simulated:
+        # A real door stays shut: push edges that held for the settle time
+        # and have the snapshot agree with them
+        sample = main.inputs.sample
+        main.inputs.sample = lambda: sample() | (1 << door)
+    for _ in range(iterations):
+        reset_alarm(main)
+        if simulated:
+            import sim
+            live.drive(1)  # Simulated pin: the IRQ handler pushes the edge
+            sim.vclock.advance(zone.settle_ms * 1000000)
+        else:
+            main.sensor_edges.push(door, 1, ticks_add(main.ticks_us(), -zone.settle_ms * 1000))
+        start = now_us()
+        main.read_all_sensors()
+        samples.append(ticks_diff(now_us(), start))
+        if not main.alarm_triggered:
+            raise RuntimeError("edge did not trigger the alarm")
+        if simulated:
+            live.drive(0)
+    if not simulated:
+        del main.inputs.sample
+    reset_alarm(main)
+    main.system_armed = False
+    return summarize(samples)
+
+
+def bench_edge_to_alarm_scheduled(main, trials):
+    """Edge to alarm in virtual time through the real scheduler (host only)"""
+    import sim
+    import clock
+    from scheduler import Scheduler
+    try:
+        import uasyncio as asyncio
+    except ImportError:
+        import asyncio
+
+    sched = Scheduler()
+    sched.add("sensors", 100, main.read_all_sensors)
+    sched.add("buzzer", 10, main.control_buzzer)
+    door = sim.pin(main.DOOR_SENSOR_PIN)
+    edges = []
+    latencies = []
+    base = sim.vclock.ms()
+
+    def collect():
+        if edges and main.alarm_triggered:
+            latencies.append(clock.ticks_diff(main.alarm_start_time, edges[-1]) * 1000)
+
+    def arm():
+        collect()
+        door.drive(0)
+        reset_alarm(main)
+
+    def intrude():
+        edges.append(clock.ticks_ms())
+        door.drive(1)
+
+    for i in range(trials):
+        t = base + 1000 * i
+        sim.at(t + 10, arm)
+        sim.at(t + 500 + (i * 37) % 100, intrude)  # Spread edges over the poll period
+    sim.at(base + 1000 * trials + 10, collect)
+    asyncio.run(sched.run(1000 * trials + 20))
+    reset_alarm(main)
+    main.system_armed = False
+    door.drive(0)
+    main.read_all_sensors()
+    return summarize(latencies, virtual=True)
+
+
+def bench_render(main, iterations):
+    """Dashboard page: build the values and stream every chunk"""
+    sizes = []
+
+    def render():
+        chunks, length = main.web_service.render_page()
+        total = 0
+        for chunk in chunks:
+            total += len(chunk)
+        sizes.append(total)
+    samples = time_calls(render, iterations)
+    return summarize(samples, measure_alloc(render, max(1, iterations // 10)),
+                     bytes=sizes[0])
+
+
+def bench_status(main, iterations):
+    """/api/status JSON body"""
+    sizes = []
+
+    def status():
+        sizes.append(len(json.dumps(main.get_status())))
+    samples = time_calls(status, iterations)
+    return summarize(samples, measure_alloc(status, max(1, iterations // 10)),
+                     bytes=sizes[0])
+
+
+def bench_keypad(main, iterations):
+    """One keypad scanner tick (one row) with no key pressed - the keypad task every 10 ms"""
+    samples = time_calls(main.keypad.tick, iterations)
+    return summarize(samples, measure_alloc(main.keypad.tick, iterations))
+
+
+def bench_gpio(main, iterations):
+    """One snapshot of every zone and keypad input: SIO register vs per-pin reads"""
+    from gpio import InputSampler
+    import hal
+    results = {}
+    paths = (("per_pin", None), ("bulk", hal.mem32))
+    for label, mem32 in paths:
+        if label == "bulk" and mem32 is None:
+            continue  # Not an RP2040
+        sampler = InputSampler(mem32)
+        for zone in main.zone_table.zones:
+            sampler.add(zone.pin_id, zone.pin)
+        for pin_id, pin in zip(main.COLS, main.col_pins):
+            sampler.add(pin_id, pin)
+        sampler.sample()
+        results[label] = summarize(time_calls(sampler.sample, iterations),
+                                   measure_alloc(sampler.sample, iterations),
+                                   pins=len(sampler.pins))
+    return results
+
+
+def run(iterations=ITERATIONS):
+    """Run every benchmark and return the results as a dict"""
+    import Main as main
+    import hal
+    if hal.SIMULATED:
+        # Zones closed and still, as on a quiet armed site
+        for pin_id in (main.DOOR_SENSOR_PIN, main.WINDOW_SENSOR_PIN, main.PIR_SENSOR_PIN):
+            hal.Pin(pin_id).drive(0)
+        main.read_all_sensors()
+    if main.web_service is None:
+        # The web stack is normally imported when WiFi comes up; build it (not listening) to render pages
+        main.web_service = main.make_web_service()
+    results = {}
+    results["loop"] = bench_loop(main, iterations)
+    results["edge_to_alarm"] = bench_edge_to_alarm(main, iterations)
+    if hal.SIMULATED:
+        results["edge_to_alarm_scheduled"] = bench_edge_to_alarm_scheduled(main, min(iterations, 100))
+    results["render_page"] = bench_render(main, iterations)
+    results["render_status"] = bench_status(main, iterations)
+    results["keypad_scan"] = bench_keypad(main, iterations)
+    results["gpio_snapshot"] = bench_gpio(main, iterations)
+    if main.boot_times.time_imports:
+        # Device only: simulated imports run on the virtual clock
+        results["imports"] = {name: {"us": us, "heap_bytes": used} for name, us, used in main.boot_times.imports}
+    return {
+        "platform": sys.platform,
+        "implementation": sys.implementation.name,
+        "simulated": hal.SIMULATED,
+        "iterations": iterations,
+        "results": results,
+    }
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    iterations = ITERATIONS
+    out_path = None
+    i = 0
+    while i < len(argv):
+        if argv[i] == "--json" and i + 1 < len(argv):
+            out_path = argv[i + 1]
+            i += 1
+        else:
+            iterations = int(argv[i])
+        i += 1
+
+    stdout = sys.stdout
+    muted = hasattr(sys, "stdout") and sys.implementation.name != "micropython"
+    if muted:
+        sys.stdout = _Mute()
+    try:
+        report = run(iterations)
+    finally:
+        if muted:
+            sys.stdout = stdout
+    text = json.dumps(report)
+    if out_path:
+        with open(out_path, "w") as f:
+            f.write(text)
+    print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# buzzer.py - Non-blocking tone sequencer for the PWM buzzer
+# Patterns are lists of (freq, duty, duration_ms) steps that are advanced
+# from the scheduler tick using deadlines, so nothing ever sleeps.
+from clock import ticks_ms, ticks_diff, ticks_add
+
+# Named buzzer patterns: name -> (steps, repeat)
+# A step with duty 0 is a silent gap.
+PATTERNS = {
+    # Alternating two-tone siren while the alarm is triggered
+    "alarm": ([(1000, 30000, 300), (1000, 0, 100),
+               (1500, 30000, 300), (1500, 0, 100)], True),
+    # Two short beeps when the arming countdown starts
+    "arm_ack": ([(1000, 20000, 100), (1000, 0, 100)] * 2, False),
+    # Three longer low beeps when arming is cancelled
+    "arm_cancel": ([(800, 25000, 200), (800, 0, 100)] * 3, False),
+    # Three quick high beeps once the system is armed
+    "armed": ([(1500, 20000, 100), (1500, 0, 50)] * 3, False),
+}
+
+
+class ToneSequencer:
+    """Plays named buzzer patterns step by step without blocking"""
+
+    def __init__(self, pwm, patterns=PATTERNS):
+        self.pwm = pwm
+        self.patterns = patterns
+        self.pattern = None  # Name of the pattern playing, or None
+        self.step = 0
+        self._steps = ()
+        self._repeat = False
+        self._deadline = 0
+
+    def play(self, name):
+        """Start a pattern from its first step, replacing whatever is playing"""
+        steps, repeat = self.patterns[name]
+        self.pattern = name
+        self._steps = steps
+        self._repeat = repeat
+        self.step = 0
+        self._deadline = ticks_ms()
+        self._apply()
+
+    def stop(self):
+        """Silence the buzzer and drop the current pattern"""
+        self.pattern = None
+        self.step = 0
+        self._steps = ()
+        self.pwm.duty_u16(0)
+
+    def is_playing(self, name=None):
+        """Check if any pattern, or the named one, is playing"""
+        if name is None:
+            return self.pattern is not None
+        return self.pattern == name
+
+    @property
+    def current_step(self):
+        """The (freq, duty, duration_ms) step playing now, or None"""
+        if self.pattern is None:
+            return None
+        return self._steps[self.step]
+
+    def tick(self):
+        """Advance to the next step once the current one has run its time"""
+        if self.pattern is None:
+            return
+        now = ticks_ms()
+        if ticks_diff(now, self._deadline) < 0:
+            return
+
+        self.step += 1
+        if self.step >= len(self._steps):
+            if not self._repeat:
+                self.stop()
+                return
+            self.step = 0
+
+        # If we were called late, restart the step timing from now
+        # rather than trying to catch up with a burst of short steps
+        if ticks_diff(now, self._deadline) > self._steps[self.step][2]:
+            self._deadline = now
+        self._apply()
+
+    def _apply(self):
+        """Drive the PWM for the current step and set its deadline"""
+        freq, duty, duration = self._steps[self.step]
+        if duty:
+            self.pwm.freq(freq)
+        self.pwm.duty_u16(duty)
+        self._deadline = ticks_add(self._deadline, duration)
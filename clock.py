@@ -0,0 +1,118 @@
+# clock.py - Monotonic millisecond timebase for the Pico W Security System
+# All debounce, countdown and expiry logic runs on ticks_ms/ticks_diff so it
+# has millisecond resolution and never jumps when NTP rewrites the RTC.
+# On CPython the same wrap-around arithmetic runs on time.monotonic_ns so the
+# timing paths behave identically off-device.
+import time
+
+# MicroPython ticks wrap at 2**30; half the period is the largest valid diff
+TICKS_PERIOD = 1 << 30
+TICKS_MASK = TICKS_PERIOD - 1
+TICKS_HALF = TICKS_PERIOD >> 1
+
+if hasattr(time, "ticks_ms"):
+    ticks_ms = time.ticks_ms
+    ticks_us = time.ticks_us
+    ticks_diff = time.ticks_diff
+    ticks_add = time.ticks_add
+else:
+    _time_source = time.monotonic_ns
+
+    def set_time_source(source_ns):
+        """Replace the nanosecond time source (e.g. with a virtual clock)"""
+        global _time_source, _era_mark
+        _time_source = source_ns
+        _era_mark = ticks_ms()  # The old mark means nothing on the new clock
+
+    def ticks_ms():
+        return (_time_source() // 1000000) & TICKS_MASK
+
+    def ticks_us():
+        return (_time_source() // 1000) & TICKS_MASK
+
+    def ticks_diff(a, b):
+        """Signed difference a - b, correct across a single wrap"""
+        return ((a - b + TICKS_HALF) & TICKS_MASK) - TICKS_HALF
+
+    def ticks_add(a, b):
+        return (a + b) & TICKS_MASK
+
+
+def elapsed_ms(since):
+    """Milliseconds since a ticks_ms() reading"""
+    return ticks_diff(ticks_ms(), since)
+
+
+# A ticks_diff only orders two readings less than half a period (~6.2 days)
+# apart. Deadlines can sit unchecked for longer than that (a debounce the
+# button never asks about again), so each one also notes the era it was
+# started in: a count of ERA_MS steps of ticks_ms, advanced by every era()
+# call. Any Deadline check calls it, and the scheduler's tasks check some
+# every few milliseconds, so no step is ever missed.
+ERA_SHIFT = 27
+ERA_MS = 1 << ERA_SHIFT  # ~1.55 days; deadlines are never set this far ahead
+_era = 0
+_era_mark = ticks_ms()  # ticks_ms at the start of the current era
+
+
+def era():
+    """Number of ERA_MS steps since import; needs a call at least every ~6 days"""
+    global _era, _era_mark
+    gone = ticks_diff(ticks_ms(), _era_mark)
+    if gone >= ERA_MS:
+        steps = gone >> ERA_SHIFT
+        _era += steps
+        _era_mark = ticks_add(_era_mark, steps << ERA_SHIFT)
+    return _era
+
+
+class Deadline:
+    """A ticks_ms point in time that can be armed, checked and cleared"""
+
+    __slots__ = ("at", "era", "active", "done")
+
+    def __init__(self, ms=None):
+        self.at = 0
+        self.era = 0  # era() when started
+        self.active = False  # Armed and not yet seen reached
+        self.done = False  # Seen reached since the last start()
+        if ms is not None:
+            self.start(ms)
+
+    def start(self, ms):
+        """Arm the deadline ms milliseconds from now"""
+        self.at = ticks_add(ticks_ms(), int(ms))
+        self.era = era()
+        self.active = True
+        self.done = False
+
+    def clear(self):
+        """Disarm the deadline"""
+        self.active = False
+        self.done = False
+
+    def _reached(self):
+        # Two eras on, more than ERA_MS has passed: reached, whatever
+        # ticks_diff says. Once reached the deadline stays expired.
+        if self.active and (era() - self.era >= 2 or ticks_diff(ticks_ms(), self.at) >= 0):
+            self.active = False
+            self.done = True
+        return self.done
+
+    def expired(self):
+        """True once an armed deadline has been reached"""
+        return self._reached()
+
+    def pending(self):
+        """True while an armed deadline has not yet been reached"""
+        return not self._reached() and self.active
+
+    def remaining_ms(self):
+        """Milliseconds left before the deadline, 0 if expired or disarmed"""
+        if self._reached() or not self.active:
+            return 0
+        return max(0, ticks_diff(self.at, ticks_ms()))
+
+    def remaining_s(self):
+        """Whole seconds left, rounded up so a countdown never shows 0 early"""
+        return (self.remaining_ms() + 999) // 1000
@@ -0,0 +1,91 @@
+# dashboard.py - Dashboard page template
+# Compiled once at import into constant segments; web.WebService.render_page()
+# fills the {{slots}} from Main's get_status() and streams the result. Sensor
+# cards come from the zone table, one ZONE_CARD per zone.
+from template import Template
+
+PAGE = Template("""<!DOCTYPE html>
+<html>
+<head>
+<title>Pico W Security System</title>
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<link rel="stylesheet" href="{{css_url}}">
+</head>
+<body>
+<div class="container">
+<h1>Home Security System</h1>
+<div class="security-status" id="secBox" style="border-color: {{color}};">
+<div style="font-size: 1.2em;">System Status</div>
+<div style="font-size: 1.5em; color: {{color}};" id="secStatus">{{security}}</div>
+</div>
+<div class="arming-section" id="armingSection"{{arming_hidden}}>
+<h2>⏱️ ARMING IN PROGRESS</h2>
+<div class="arming-timer" id="armingTimer">{{arming_countdown}}s</div>
+<div class="code-info">Exit the premises now!<br>System will arm in <span id="armingSeconds">{{arming_countdown}}</span> seconds</div>
+</div>
+<div class="disarm-section" id="disarmSection"{{alarm_hidden}}>
+<h2> ALARM ACTIVE - DISARM REQUIRED</h2>
+<div class="security-code" id="securityCode">{{code}}</div>
+<div class="code-info" id="codeInfo">{{code_info}}<br>Expires in: {{code_expiry}} seconds<br>Failed attempts: {{failed_attempts}} / {{max_attempts}}</div>
+<div class="keypad-display">
+<h3> Keypad Entry</h3>
+<div class="entered-code" id="enteredCode">{{entered_code}}</div>
+<div class="code-info">Digits entered: <span id="digitsEntered">{{digits}}</span> / 5<br>Press # to submit | Press * to clear</div>
+</div>
+</div>
+<div class="buzzer-status {{buzzer_class}}" id="buzzerStatus"> Buzzer: {{buzzer_text}}</div>
+<div class="keypad-status">Keypad: <span id="keypadStatus">{{keypad_text}}</span><br><span class="attempts-warning" id="failedWarn"{{failed_hidden}}>Failed attempts: {{failed_attempts}}</span></div>
+<div class="arm-button-info"> Arm Button: GP{{arm_pin}} | <span id="armInfo">{{arm_info}}</span><br>Arming requires: All entry points CLOSED + NO MOTION</div>
+<div class="sensors-grid">
+{{zone_cards}}
+</div>
+<div class="security-code" id="randomDigits">{{random}}</div>
+<div class="time" id="currentTime">{{time}}</div>
+<div class="date" id="currentDate">{{date}}</div>
+<div class="day" id="currentDay">{{day}}</div>
+<button class="refresh-btn" id="refreshBtn"> Refresh Status</button>
+<div class="info">
+<p> {{zone_pins}} |  Buzzer: GP{{buzzer_pin}} |  Arm Button: GP{{arm_pin}}</p>
+<p> Keypad: Rows[{{keypad_rows}}] Cols[{{keypad_cols}}]</p>
+<p>️ Server: Raspberry Pi Pico W |  MAC: {{mac}}</p>
+<p> Sensor edges: <span id="edges">{{edges}}</span> captured | <span id="edgesDropped">{{edges_dropped}}</span> dropped | LCD I2C: <span id="lcdBps">{{lcd_bps}}</span> B/s</p>
+<p> IP: {{ip}} |  Live updates every <span id="pollSeconds">1</span>s</p>
+</div>
+</div>
+<script src="{{js_url}}" defer></script>
+</body>
+</html>""")
+
+ZONE_CARD = Template("""<div class="sensor-card {{card_class}}" id="zone-{{name}}">
+<div class="sensor-emoji"></div>
+<div class="sensor-name">{{label}}</div>
+<div class="sensor-status" style="color: {{color}};" id="zone-{{name}}-status">{{status}}</div>
+<div class="sensor-counter">{{counter}}: <span id="zone-{{name}}-count">{{changes}}</span>{{ago}}</div>
+</div>
+""")
+
+
+def zone_cards(zones):
+    """Rendered cards for the zone entries of get_status(), as a tuple of bytes"""
+    cards = []
+    for z in zones:
+        if z["motion"]:
+            alert = "sensor-warning"
+            counter = "Detections"
+            ago = ('<br>Last: <span id="zone-' + z["name"] + '-ago">' +
+                   ("N/A" if z["ago"] is None else str(z["ago"])) + '</span>s ago')
+        else:
+            alert = "sensor-alert"
+            counter = "Changes"
+            ago = ""
+        cards.append(ZONE_CARD.render_bytes({
+            "card_class": alert if z["active"] else "sensor-normal",
+            "name": z["name"],
+            "label": z["label"],
+            "color": "#ff6b6b" if z["active"] else "#51cf66",
+            "status": z["status"],
+            "counter": counter,
+            "changes": z["changes"],
+            "ago": ago,
+        }))
+    return tuple(cards)
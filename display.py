@@ -0,0 +1,117 @@
+# display.py - Shadow framebuffer for the 16x2 I2C LCD
+# Callers write whole lines into a shadow buffer; flush() sends only the
+# character runs that differ from what is already on the glass, so the
+# display never needs lcd.clear() and does not flicker.
+from clock import ticks_ms, ticks_diff
+
+# The PCF8574 backpack drives the HD44780 in 4-bit mode: every command or
+# character is two nibbles, each strobed with E high then low = 4 I2C bytes
+I2C_BYTES_PER_OP = 4
+
+# A cursor move is one command, so rewriting a gap of this many unchanged
+# cells costs no more than jumping over it
+MERGE_GAP = 1
+
+
+class ShadowLcd:
+    """Line-oriented LCD writer that only flushes changed cells"""
+
+    def __init__(self, lcd, rows=2, cols=16):
+        self.lcd = lcd
+        self.rows = rows
+        self.cols = cols
+        self.wanted = bytearray(b' ' * (rows * cols))  # What callers asked for
+        self.shown = bytearray(b' ' * (rows * cols))  # What the LCD shows
+        self._cursor = -1  # Cell index the LCD cursor is at, -1 if unknown
+        self.ops_total = 0
+        self.bytes_total = 0
+        self.bytes_per_second = 0
+        self._window_bytes = 0
+        self._window_start = ticks_ms()
+        self.invalidate()
+
+    def invalidate(self):
+        """Clear the glass and resync the shadow after raw LCD access"""
+        self.lcd.clear()
+        self._count(1)
+        for i in range(len(self.shown)):
+            self.shown[i] = 32
+        self._cursor = 0
+
+    def write_line(self, row, text):
+        """Set a whole row of the shadow buffer, padded or cut to fit"""
+        base = row * self.cols
+        buf = self.wanted
+        n = min(len(text), self.cols)
+        for i in range(n):
+            c = ord(text[i])
+            buf[base + i] = c if 32 <= c < 127 else 63  # '?' for non-ASCII
+        for i in range(n, self.cols):
+            buf[base + i] = 32
+
+    def show(self, line1, line2=""):
+        """Write both lines and flush the changes to the LCD"""
+        self.write_line(0, line1)
+        if self.rows > 1:
+            self.write_line(1, line2)
+        self.flush()
+
+    def text(self, row):
+        """Return the row as currently held in the shadow buffer"""
+        base = row * self.cols
+        return bytes(self.wanted[base:base + self.cols]).decode()
+
+    def flush(self):
+        """Send only the changed character runs with the fewest cursor moves"""
+        wanted = self.wanted
+        shown = self.shown
+        cols = self.cols
+        ops = 0
+        for row in range(self.rows):
+            base = row * cols
+            col = 0
+            while col < cols:
+                if wanted[base + col] == shown[base + col]:
+                    col += 1
+                    continue
+                # Extend the run, absorbing short unchanged gaps
+                start = col
+                end = col + 1
+                gap = 0
+                col += 1
+                while col < cols:
+                    if wanted[base + col] != shown[base + col]:
+                        end = col + 1
+                        gap = 0
+                    else:
+                        gap += 1
+                        if gap > MERGE_GAP:
+                            break
+                    col += 1
+
+                if self._cursor != base + start:
+                    self.lcd.move_to(start, row)
+                    ops += 1
+                run = wanted[base + start:base + end]
+                self.lcd.putstr(bytes(run).decode())
+                ops += end - start
+                shown[base + start:base + end] = run
+                self._cursor = base + end
+                if end == cols:
+                    # lcd_api wraps the cursor to the next row with its own move
+                    ops += 1
+                    self._cursor %= len(wanted)
+        self._count(ops)
+
+    def _count(self, ops):
+        """Account I2C traffic and roll the bytes-per-second window"""
+        self.ops_total += ops
+        sent = ops * I2C_BYTES_PER_OP
+        self.bytes_total += sent
+        self._window_bytes += sent
+        now = ticks_ms()
+        elapsed = ticks_diff(now, self._window_start)
+        if elapsed >= 1000:
+            self.bytes_per_second = self._window_bytes * 1000 // elapsed
+            self._window_bytes = 0
+            self._window_start = now
@@ -0,0 +1,63 @@
+# edges.py - IRQ-driven edge capture for the security sensors
+# Pin interrupts push (pin, level, ticks_us) into a preallocated ring buffer
+# without allocating; the main loop drains it so no short pulse is lost.
+from array import array
+from clock import ticks_us
+
+
+class EdgeRing:
+    """Fixed-size single-producer/single-consumer ring of pin edges"""
+
+    def __init__(self, size=32):
+        # Power-of-two size so the index wrap is a mask, not a modulo
+        if size & (size - 1):
+            raise ValueError("EdgeRing size must be a power of two")
+        self.size = size
+        self._mask = size - 1
+        self.pins = array('B', [0] * size)
+        self.levels = array('B', [0] * size)
+        self.stamps = array('L', [0] * size)
+        self.head = 0  # Next slot the IRQ writes
+        self.tail = 0  # Next slot the main loop reads
+        self.overflows = 0  # Edges dropped because the ring was full
+        self.captured = 0  # Edges stored since boot
+
+    def push(self, pin_id, level, stamp):
+        """Store one edge - safe to call from a hard IRQ"""
+        head = self.head
+        nxt = (head + 1) & self._mask
+        if nxt == self.tail:
+            self.overflows += 1
+            return
+        self.pins[head] = pin_id
+        self.levels[head] = level
+        self.stamps[head] = stamp
+        self.captured += 1
+        self.head = nxt
+
+    def __len__(self):
+        return (self.head - self.tail) & self._mask
+
+    def drain(self, callback):
+        """Call callback(pin_id, level, stamp) for each edge, oldest first"""
+        count = 0
+        while self.tail != self.head:
+            tail = self.tail
+            callback(self.pins[tail], self.levels[tail], self.stamps[tail])
+            self.tail = (tail + 1) & self._mask
+            count += 1
+        return count
+
+    def attach(self, pin, pin_id):
+        """Capture both edges of pin into this ring as pin_id"""
+        push = self.push
+
+        def handler(p):
+            push(pin_id, p.value(), ticks_us())
+
+        trigger = pin.IRQ_RISING | pin.IRQ_FALLING
+        try:
+            pin.irq(handler=handler, trigger=trigger, hard=True)
+        except TypeError:
+            # Ports without hard IRQ support fall back to scheduled handlers
+            pin.irq(handler=handler, trigger=trigger)
@@ -0,0 +1,214 @@
+# eventlog.py - Append-only event log on the Pico's flash filesystem
+# Records are fixed 16-byte entries (magic, type, zone, flags, seq, stamp,
+# crc32) buffered in RAM and written a batch at a time into numbered
+# segment files of one flash block each. Full segments are never rewritten;
+# the oldest is deleted once MAX_SEGMENTS exist, spreading erases over the
+# whole filesystem. On boot the segments are scanned and any record with a
+# bad magic or CRC (a torn write from a reset mid-flush) is skipped.
+# Runs on CPython against a plain directory.
+import os
+import struct
+
+try:
+    from binascii import crc32
+except ImportError:
+    from ubinascii import crc32
+
+from clock import Deadline, ticks_us, ticks_diff
+
+LOG_DIR = "log"
+RECORD_SIZE = 16
+RECORD_MAGIC = 0xA5
+SEGMENT_RECORDS = 256  # 4 KB per segment - one littlefs block on the Pico
+MAX_SEGMENTS = 8  # Oldest segment is deleted when a new one would exceed this
+BATCH_RECORDS = 16  # Flush once this many records are waiting
+BUFFER_RECORDS = 32  # RAM buffer; records beyond this are dropped, never block
+FLUSH_INTERVAL_MS = 5000  # Flush whatever is waiting at least this often
+
+_FORMAT = "<BBBBIII"  # magic, type, zone, flags, seq, stamp, crc
+_BODY = RECORD_SIZE - 4  # Bytes covered by the CRC
+
+
+def _join(*parts):
+    return "/".join(parts)
+
+
+def _segment_name(number):
+    return "seg%05d.bin" % number
+
+
+def _exists(path):
+    try:
+        os.stat(path)
+        return True
+    except OSError:
+        return False
+
+
+def decode(buf, offset=0):
+    """Return (seq, stamp, type, zone, flags) for a valid record, else None"""
+    magic, event, zone, flags, seq, stamp, crc = struct.unpack_from(_FORMAT, buf, offset)
+    if magic != RECORD_MAGIC:
+        return None
+    if crc32(bytes(buf[offset:offset + _BODY])) & 0xFFFFFFFF != crc:
+        return None
+    return seq, stamp, event, zone, flags
+
+
+class EventLog:
+    """Segmented, CRC-checked append-only log with batched flushes"""
+
+    def __init__(self, path=LOG_DIR, segment_records=SEGMENT_RECORDS,
+                 max_segments=MAX_SEGMENTS, batch_records=BATCH_RECORDS,
+                 buffer_records=BUFFER_RECORDS, flush_interval_ms=FLUSH_INTERVAL_MS):
+        self.path = path
+        self.segment_records = segment_records
+        self.max_segments = max_segments
+        self.batch_records = batch_records
+        self.flush_interval_ms = flush_interval_ms
+        self.buffer = bytearray(buffer_records * RECORD_SIZE)
+        self.buffered = 0
+        self.urgent = False
+        self.due = Deadline()
+        self.segments = []  # Segment numbers on disk, oldest first
+        self.segment_fill = 0  # Records already in the newest segment
+        self.seq = 0  # Sequence number the next record will get
+        self.written = 0
+        self.flushes = 0
+        self.dropped = 0
+        self.skipped = 0  # Invalid records found by recover()
+        self.last_flush_us = 0
+        self.max_flush_us = 0
+        if not _exists(path):
+            os.mkdir(path)
+        self.recover()
+
+    # Recovery
+
+    def _segment_path(self, number):
+        return _join(self.path, _segment_name(number))
+
+    def recover(self):
+        """Scan the segments on disk, restore the sequence number and count torn records"""
+        numbers = []
+        for name in os.listdir(self.path):
+            if name.startswith("seg") and name.endswith(".bin"):
+                try:
+                    numbers.append(int(name[3:-4]))
+                except ValueError:
+                    pass
+        numbers.sort()
+        self.segments = numbers
+        self.skipped = 0
+        last_seq = -1
+        fill = 0
+        for number in numbers:
+            count = valid = 0
+            for record in self._read_segment(number):
+                count += 1
+                if record is None:
+                    self.skipped += 1
+                    continue
+                valid += 1
+                if record[0] > last_seq:
+                    last_seq = record[0]
+            fill = count
+            if valid < count or os.stat(self._segment_path(number))[6] % RECORD_SIZE:
+                fill = self.segment_records  # Damaged tail: never append after it
+        self.seq = last_seq + 1
+        self.segment_fill = fill if numbers else self.segment_records
+        return self.seq
+
+    def _read_segment(self, number):
+        """Yield decoded records (None for invalid ones) from one segment"""
+        chunk = bytearray(RECORD_SIZE * 16)
+        with open(self._segment_path(number), "rb") as f:
+            while True:
+                n = f.readinto(chunk)
+                if not n:
+                    break
+                for offset in range(0, n - n % RECORD_SIZE, RECORD_SIZE):
+                    yield decode(chunk, offset)
+                if n % RECORD_SIZE:
+                    yield None  # Partial record at the end of the file
+                    break
+
+    def records(self, since=0):
+        """Yield valid (seq, stamp, type, zone, flags) with seq >= since, oldest first"""
+        self.flush()
+        for number in list(self.segments):
+            for record in self._read_segment(number):
+                if record is not None and record[0] >= since:
+                    yield record
+
+    # Writing
+
+    def append(self, event, zone=0, flags=0, stamp=0, urgent=False):
+        """Buffer one record; no filesystem access. Returns its seq or -1 if dropped"""
+        if self.buffered * RECORD_SIZE >= len(self.buffer):
+            self.dropped += 1
+            return -1
+        offset = self.buffered * RECORD_SIZE
+        seq = self.seq
+        struct.pack_into(_FORMAT, self.buffer, offset, RECORD_MAGIC, event, zone, flags,
+                         seq, stamp & 0xFFFFFFFF, 0)
+        crc = crc32(bytes(self.buffer[offset:offset + _BODY])) & 0xFFFFFFFF
+        struct.pack_into("<I", self.buffer, offset + _BODY, crc)
+        self.seq += 1
+        if not self.buffered:
+            self.due.start(self.flush_interval_ms)
+        self.buffered += 1
+        if urgent:
+            self.urgent = True
+        return seq
+
+    def tick(self):
+        """Flush when a batch is ready, the interval passed, or an urgent record waits"""
+        if not self.buffered:
+            return
+        if self.urgent or self.buffered >= self.batch_records or self.due.expired():
+            self.flush(self.batch_records)
+
+    def flush(self, limit=None):
+        """Write up to `limit` buffered records (all if None) into the current segment(s)"""
+        start = ticks_us()
+        done = 0
+        view = memoryview(self.buffer)
+        while self.buffered and (limit is None or done < limit):
+            if self.segment_fill >= self.segment_records:
+                self._rotate()
+            take = min(self.buffered, self.segment_records - self.segment_fill)
+            if limit is not None:
+                take = min(take, limit - done)
+            with open(self._segment_path(self.segments[-1]), "ab") as f:
+                f.write(view[:take * RECORD_SIZE])
+            # Shift any remaining records to the front of the buffer
+            remaining = (self.buffered - take) * RECORD_SIZE
+            if remaining:
+                tail = take * RECORD_SIZE
+                self.buffer[:remaining] = bytes(view[tail:tail + remaining])
+            self.buffered -= take
+            self.segment_fill += take
+            self.written += take
+            done += take
+        if not self.buffered:
+            self.urgent = False
+            self.due.clear()
+        if done:
+            self.flushes += 1
+            self.last_flush_us = ticks_diff(ticks_us(), start)
+            if self.last_flush_us > self.max_flush_us:
+                self.max_flush_us = self.last_flush_us
+        return done
+
+    def _rotate(self):
+        """Start a new segment, deleting the oldest if over the limit"""
+        number = self.segments[-1] + 1 if self.segments else 0
+        self.segments.append(number)
+        self.segment_fill = 0
+        while len(self.segments) > self.max_segments:
+            old = self.segments.pop(0)
+            try:
+                os.remove(self._segment_path(old))
+            except OSError:
+                pass
@@ -0,0 +1,42 @@
+# gpio.py - One-read snapshot of every sensor and keypad input
+# On the RP2040 all 30 GPIO input levels live in one SIO register,
+# GPIO_IN, so a single machine.mem32 read gives a coherent snapshot of
+# every zone and keypad column. Callers pick their bits out with masks
+# computed once at start-up. Ports without mem32 (or not an RP2040) fall
+# back to reading each registered pin and packing the levels into the
+# same bit layout.
+SIO_BASE = 0xD0000000
+GPIO_IN = SIO_BASE + 0x004  # Input levels of GPIO0..29, bit n = GPn
+
+
+class InputSampler:
+    """Reads every registered input pin at once into a bitmask (bit n = GPn)"""
+
+    def __init__(self, mem32=None):
+        self.mem32 = mem32  # None forces the per-pin path
+        self.pins = []  # (bit, Pin) for the fallback
+        self.mask = 0
+        self.samples = 0
+
+    @property
+    def bulk(self):
+        return self.mem32 is not None
+
+    def add(self, pin_id, pin):
+        """Register an input; returns its bit mask"""
+        bit = 1 << pin_id
+        if not self.mask & bit:
+            self.pins.append((bit, pin))
+            self.mask |= bit
+        return bit
+
+    def sample(self):
+        """Current level of every registered input as one int"""
+        self.samples += 1
+        if self.mem32 is not None:
+            return self.mem32[GPIO_IN] & self.mask
+        value = 0
+        for bit, pin in self.pins:
+            if pin.value():
+                value |= bit
+        return value
@@ -0,0 +1,56 @@
+# hal.py - Hardware abstraction layer for the Pico W Security System
+# Main.py takes every hardware object and blocking time call from here.
+# On the Pico these are the real machine/network/pico_i2c_lcd objects;
+# on CPython they come from sim.py, where pins are scriptable, the buzzer
+# PWM is recorded, the LCD renders to text and all time runs on a
+# virtual clock.
+import sys
+import time
+
+try:
+    import machine
+    SIMULATED = False
+except ImportError:
+    SIMULATED = True
+
+try:
+    from ubinascii import hexlify
+except ImportError:
+    from binascii import hexlify
+
+if not SIMULATED:
+    import network
+    from machine import Pin, PWM, I2C, RTC
+
+    def make_lcd(i2c, addr, rows, cols):
+        from pico_i2c_lcd import I2cLcd
+        return I2cLcd(i2c, addr, rows, cols)
+
+    def make_wlan():
+        return network.WLAN(network.STA_IF)
+
+    def set_utc(seconds):
+        """Set the RTC to UTC seconds since the time.time() epoch"""
+        tm = time.gmtime(seconds)
+        RTC().datetime((tm[0], tm[1], tm[2], tm[6] + 1, tm[3], tm[4], tm[5], 0))
+
+    sleep = time.sleep
+    sleep_ms = time.sleep_ms
+    wall_time = time.time
+    reset = machine.reset
+    # Direct register access for the bulk GPIO snapshot (RP2040 only)
+    mem32 = machine.mem32 if sys.platform == "rp2" and hasattr(machine, "mem32") else None
+else:
+    import sim
+    from sim import Pin, PWM, I2C, RTC, set_utc, sleep, sleep_ms, wall_time, reset, mem32
+
+    def make_lcd(i2c, addr, rows, cols):
+        return sim.TextLcd(i2c, addr, rows, cols)
+
+    def make_wlan():
+        return sim.WLAN(sim.STA_IF)
+
+
+def mac_address(wlan):
+    """Hex MAC of the WLAN interface"""
+    return hexlify(wlan.config('mac')).decode()
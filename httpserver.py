@@ -0,0 +1,432 @@
+# httpserver.py - Non-blocking HTTP/1.1 server driven by select.poll
+# The listening socket and every client socket are registered with one
+# poller. poll(0) is called from the scheduler tick: it accepts new
+# clients, parses requests incrementally across partial reads, and writes
+# responses a piece at a time, so a slow client never blocks the alarm loop.
+# Each connection reads into and packs response chunks through a pair of
+# fixed buffers taken from a pool allocated once, so serving requests does
+# not grow and fragment the heap.
+# Runs unchanged on CPython against real localhost sockets.
+import socket
+
+try:
+    import select
+except ImportError:
+    import uselect as select
+
+from clock import Deadline
+from memory import BufferPool
+from netutil import would_block
+
+MAX_CLIENTS = 4  # Open connections, not counting detached (SSE) sockets
+MAX_HEADER = 2048  # Largest request head we will buffer
+MAX_BODY = 1024  # Largest request body we will buffer
+IDLE_TIMEOUT_MS = 10000  # Close keep-alive connections idle this long
+SEND_SIZE = 1024  # Response chunks are packed into sends of up to this size
+
+REASONS = {
+    200: "OK",
+    204: "No Content",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+_POLL_ERR = select.POLLHUP | select.POLLERR
+
+
+class Request:
+    """A parsed HTTP request"""
+
+    def __init__(self, conn, method, path, query, version, headers, body):
+        self.conn = conn
+        self.method = method
+        self.path = path
+        self.query = query
+        self.version = version
+        self.headers = headers  # Lower-case names
+        self.body = body
+
+    @property
+    def addr(self):
+        return self.conn.addr
+
+    def arg(self, name, default=None):
+        """Value of a query string parameter"""
+        for pair in self.query.split('&'):
+            key, _, value = pair.partition('=')
+            if key == name:
+                return value
+        return default
+
+    def detach(self):
+        """Take the socket away from the server (e.g. for a long-lived stream)"""
+        return self.conn.server._detach(self.conn)
+
+
+class Response:
+    """Status, headers and a body that is bytes, str or an iterable of chunks"""
+
+    def __init__(self, status=200, body=b"", content_type="text/html",
+                 headers=None, length=None):
+        self.status = status
+        self.content_type = content_type
+        self.headers = headers or []
+        if isinstance(body, str):
+            body = body.encode()
+        if isinstance(body, (bytes, bytearray, memoryview)):
+            length = len(body)
+            body = (body,) if length else ()
+        self.body = body
+        self.length = length  # None means unknown - close after sending
+
+
+class Connection:
+    """One client socket with its input buffer and pending output"""
+
+    def __init__(self, server, sock, addr, buffers):
+        self.server = server
+        self.sock = sock
+        self.addr = addr
+        self.buffers = buffers
+        self.inbuf = memoryview(buffers[0])
+        self.inlen = 0  # Bytes received and not yet consumed
+        self.head_end = -1  # Offset of the blank line ending the head, once seen
+        self.outbuf = memoryview(buffers[1])
+        self.out = b""  # Bytes packed or chunk data not yet sent
+        self.carry = b""  # Rest of a chunk that did not fit the last send
+        self.body = None  # Iterator over remaining response chunks
+        self.keep_alive = True
+        self.idle = Deadline(IDLE_TIMEOUT_MS)
+        # recv_into on CPython; MicroPython sockets offer readinto instead
+        self.recv_into = sock.recv_into if hasattr(sock, "recv_into") else sock.readinto
+
+    @property
+    def writing(self):
+        return bool(self.out) or bool(self.carry) or self.body is not None
+
+    def find_head_end(self, start):
+        """Look for the end of the head in inbuf[start:inlen]"""
+        end = bytes(self.inbuf[start:self.inlen]).find(b"\r\n\r\n")
+        if end >= 0:
+            self.head_end = start + end
+        return self.head_end
+
+    def consume(self, count):
+        """Drop the first count buffered bytes, keeping any pipelined rest"""
+        rest = self.inlen - count
+        if rest > 0:
+            self.inbuf[:rest] = bytes(self.inbuf[count:self.inlen])
+        self.inlen = max(rest, 0)
+        self.head_end = -1
+
+
+def parse_head(head):
+    """Parse a request head; return (method, path, query, version, headers) or None"""
+    lines = head.split('\r\n')
+    parts = lines[0].split(' ')
+    if len(parts) != 3:
+        return None
+    method, target, version = parts
+    path, _, query = target.partition('?')
+    headers = {}
+    for line in lines[1:]:
+        key, sep, value = line.partition(':')
+        if sep:
+            headers[key.strip().lower()] = value.strip()
+    return method, path, query, version, headers
+
+
+def content_length(headers):
+    """The Content-Length header as an int (0 if absent), or None unless it is plain digits"""
+    value = headers.get("content-length", "0")
+    if not value:
+        return None
+    for c in value:
+        if c not in "0123456789":
+            return None
+    return int(value)
+
+
+class HttpServer:
+    """Serves a handler(request) -> Response|None over non-blocking sockets"""
+
+    def __init__(self, handler, port=80, host='0.0.0.0', max_clients=MAX_CLIENTS, buffers=None):
+        self.handler = handler
+        self.port = port
+        self.host = host
+        self.max_clients = max_clients
+        # Pass a pool allocated at boot to keep the buffers out of a fragmented heap
+        self.buffers = buffers or BufferPool(max_clients, MAX_HEADER + MAX_BODY, SEND_SIZE)
+        self.sock = None
+        self.poller = select.poll()
+        self.conns = {}  # Poll key (socket and/or fd) -> Connection
+        self.clients = []
+        self.requests = 0
+        self.responses = {}  # Status code -> count
+        self.rejected = 0
+
+    def start(self):
+        """Bind, listen and register the listening socket"""
+        addr = socket.getaddrinfo(self.host, self.port)[0][-1]
+        sock = socket.socket()
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(addr)
+        sock.listen(self.max_clients)
+        sock.setblocking(False)
+        self.sock = sock
+        self.poller.register(sock, select.POLLIN)
+        if self.port == 0 and hasattr(sock, "getsockname"):
+            self.port = sock.getsockname()[1]
+        return sock
+
+    def stop(self):
+        """Close every client and the listening socket"""
+        for conn in list(self.clients):
+            self._close(conn)
+        if self.sock is not None:
+            self.poller.unregister(self.sock)
+            self.sock.close()
+            self.sock = None
+
+    def poll(self, timeout_ms=0):
+        """Handle whatever socket activity is ready; never blocks with timeout 0"""
+        for event in self.poller.poll(timeout_ms):
+            key, flags = event[0], event[1]
+            if key is self.sock or key == self._fileno(self.sock):
+                self._accept()
+                continue
+            conn = self.conns.get(key)
+            if conn is None:
+                continue
+            if flags & _POLL_ERR:
+                self._close(conn)
+            elif flags & select.POLLOUT:
+                self._write(conn)
+            elif flags & select.POLLIN:
+                self._read(conn)
+
+        for conn in list(self.clients):
+            if conn.idle.expired():
+                self._close(conn)
+
+    # Connection management
+
+    @staticmethod
+    def _fileno(sock):
+        return sock.fileno() if hasattr(sock, "fileno") else sock
+
+    def _accept(self):
+        while True:
+            try:
+                sock, addr = self.sock.accept()
+            except OSError:
+                return
+            sock.setblocking(False)
+            buffers = self.buffers.take() if len(self.clients) < self.max_clients else None
+            if buffers is None:
+                self.rejected += 1
+                try:
+                    sock.send(b"HTTP/1.1 503 Service Unavailable\r\n"
+                              b"Content-Length: 0\r\nConnection: close\r\n\r\n")
+                except OSError:
+                    pass
+                sock.close()
+                continue
+            conn = Connection(self, sock, addr, buffers)
+            self.clients.append(conn)
+            self.conns[sock] = conn
+            self.conns[self._fileno(sock)] = conn
+            self.poller.register(sock, select.POLLIN)
+
+    def _forget(self, conn):
+        if conn in self.clients:
+            self.clients.remove(conn)
+            self.buffers.give(conn.buffers)
+        self.conns.pop(conn.sock, None)
+        self.conns.pop(self._fileno(conn.sock), None)
+        try:
+            self.poller.unregister(conn.sock)
+        except (OSError, KeyError, ValueError):
+            pass
+
+    def _close(self, conn):
+        self._forget(conn)
+        try:
+            conn.sock.close()
+        except OSError:
+            pass
+
+    def _detach(self, conn):
+        self._forget(conn)
+        return conn.sock
+
+    # Reading and parsing
+
+    def _read(self, conn):
+        start = conn.inlen
+        if start == len(conn.inbuf):
+            self._error(conn, 413 if conn.head_end >= 0 else 431)  # Pipelined past the buffer
+            return
+        try:
+            count = conn.recv_into(conn.inbuf[start:])
+        except OSError as e:
+            if would_block(e):
+                return
+            self._close(conn)
+            return
+        if count is None:
+            return  # MicroPython readinto: nothing to read yet
+        if not count:
+            self._close(conn)
+            return
+        conn.idle.start(IDLE_TIMEOUT_MS)
+        conn.inlen += count
+        if conn.head_end < 0:
+            conn.find_head_end(max(0, start - 3))  # The terminator may straddle reads
+        self._process(conn)
+
+    def _process(self, conn):
+        """Handle every complete request in the buffer (pipelining-safe)"""
+        while conn in self.clients and not conn.writing:
+            end = conn.head_end
+            if end < 0:
+                if conn.inlen > MAX_HEADER:
+                    self._error(conn, 431)
+                return
+            if end > MAX_HEADER:
+                self._error(conn, 431)  # A whole oversized head arrived in one read
+                return
+            try:
+                parsed = parse_head(bytes(conn.inbuf[:end]).decode())
+            except UnicodeError:
+                parsed = None
+            if parsed is None:
+                self._error(conn, 400)
+                return
+            method, path, query, version, headers = parsed
+
+            length = content_length(headers)
+            if length is None:
+                self._error(conn, 400)  # The body's framing is unknown: nothing after it can be trusted
+                return
+            if length > MAX_BODY:
+                self._error(conn, 413)
+                return
+            start = end + 4
+            if conn.inlen < start + length:
+                return  # Wait for the rest of the body
+            body = bytes(conn.inbuf[start:start + length])
+            conn.consume(start + length)
+            if conn.inlen:
+                conn.find_head_end(0)  # A pipelined request follows
+
+            connection = headers.get("connection", "").lower()
+            if version == "HTTP/1.1":
+                conn.keep_alive = connection != "close"
+            else:
+                conn.keep_alive = connection == "keep-alive"
+
+            request = Request(conn, method, path, query, version, headers, body)
+            self.requests += 1
+            try:
+                response = self.handler(request)
+            except Exception as e:
+                print(f"HTTP handler error: {e}")
+                response = Response(500, "Internal Server Error", "text/plain")
+            if conn not in self.clients:
+                return  # Handler detached the socket
+            if response is None:
+                response = Response(204)
+            self._respond(conn, response, method == "HEAD")
+
+    # Writing
+
+    def _error(self, conn, status):
+        conn.keep_alive = False
+        conn.consume(conn.inlen)
+        self._respond(conn, Response(status, REASONS.get(status, ""), "text/plain"))
+
+    def _respond(self, conn, response, head_only=False):
+        self.responses[response.status] = self.responses.get(response.status, 0) + 1
+        if response.length is None:
+            conn.keep_alive = False
+        head = ("HTTP/1.1 " + str(response.status) + " " + REASONS.get(response.status, "") +
+                "\r\nContent-Type: " + response.content_type)
+        if response.length is not None:
+            head += "\r\nContent-Length: " + str(response.length)
+        for name, value in response.headers:
+            head += "\r\n" + name + ": " + value
+        head += "\r\nConnection: " + ("keep-alive" if conn.keep_alive else "close") + "\r\n\r\n"
+        conn.carry = head.encode()  # Packed into the first send with the start of the body
+        conn.body = None if head_only else iter(response.body)
+        self._write(conn, False)
+
+    def _pack(self, conn):
+        """Fill the output buffer from pending chunks; returns the bytes to send next"""
+        buf = conn.outbuf
+        size = len(buf)
+        used = 0
+        while used < size:
+            chunk = conn.carry
+            if not chunk:
+                if conn.body is None:
+                    break
+                try:
+                    chunk = next(conn.body)
+                except StopIteration:
+                    conn.body = None
+                    break
+                if isinstance(chunk, str):
+                    chunk = chunk.encode()
+                if not used and len(chunk) >= size:
+                    # No copy: the next chunk is only requested once this one
+                    # is fully sent, so generators may reuse their buffer
+                    return chunk
+            part = len(chunk)
+            if part <= size - used:
+                buf[used:used + part] = chunk
+                conn.carry = b""
+            else:
+                part = size - used
+                chunk = memoryview(chunk)
+                buf[used:size] = chunk[:part]
+                conn.carry = chunk[part:]
+            used += part
+        return buf[:used] if used else b""
+
+    def _write(self, conn, resume=True):
+        """Send as much as the socket takes now; resume on the next POLLOUT"""
+        while True:
+            if not conn.out:
+                conn.out = self._pack(conn)
+                if not conn.out:
+                    break
+            try:
+                sent = conn.sock.send(conn.out)
+            except OSError as e:
+                if would_block(e):
+                    sent = 0
+                else:
+                    self._close(conn)
+                    return
+            conn.idle.start(IDLE_TIMEOUT_MS)
+            if sent < len(conn.out):
+                conn.out = memoryview(conn.out)[sent:]
+                self.poller.modify(conn.sock, select.POLLOUT)
+                return
+            conn.out = b""
+
+        # Response complete
+        if not conn.keep_alive:
+            self._close(conn)
+            return
+        self.poller.modify(conn.sock, select.POLLIN)
+        if resume and conn.inlen:
+            # Pipelined requests waited while this response was going out
+            self._process(conn)
@@ -0,0 +1,69 @@
+# journal.py - Fixed-size in-RAM security event journal
+# Entries live in preallocated arrays (timestamp, event type, zone, flags)
+# indexed by a running sequence number, so recording never allocates and
+# clients can tail the journal with a cursor (/api/events?since=N).
+from array import array
+import time
+
+# Event type codes
+EVENT_BOOT = 0
+EVENT_ZONE_OPEN = 1
+EVENT_ZONE_CLOSE = 2
+EVENT_MOTION = 3
+EVENT_MOTION_CLEAR = 4
+EVENT_ARM_START = 5
+EVENT_ARMED = 6
+EVENT_ARM_CANCEL = 7
+EVENT_DISARM = 8
+EVENT_ALARM = 9
+EVENT_CODE_FAIL = 10
+EVENT_LOCKOUT = 11
+
+EVENT_NAMES = (
+    "boot", "zone_open", "zone_close", "motion", "motion_clear",
+    "arm_start", "armed", "arm_cancel", "disarm", "alarm",
+    "code_fail", "lockout",
+)
+
+# Flag bits stored with every entry
+FLAG_ARMED = 1
+FLAG_ALARM = 2
+
+
+class Journal:
+    """Ring of the last `size` security events, addressed by sequence number"""
+
+    def __init__(self, size=256):
+        self.size = size
+        self.stamps = array('L', [0] * size)  # Wall-clock seconds (time.time())
+        self.types = array('B', [0] * size)
+        self.zones = array('B', [0] * size)
+        self.flags = array('B', [0] * size)
+        self.seq = 0  # Sequence number the next entry will get
+
+    def record(self, event, zone=0, flags=0, stamp=None):
+        """Append one entry, overwriting the oldest once full"""
+        i = self.seq % self.size
+        self.stamps[i] = int(time.time()) if stamp is None else stamp
+        self.types[i] = event
+        self.zones[i] = zone
+        self.flags[i] = flags
+        self.seq += 1
+        return self.seq - 1
+
+    @property
+    def oldest(self):
+        """Sequence number of the oldest entry still held"""
+        return max(0, self.seq - self.size)
+
+    def entry(self, seq):
+        """Return (seq, timestamp, type, zone, flags) for a held entry"""
+        i = seq % self.size
+        return seq, self.stamps[i], self.types[i], self.zones[i], self.flags[i]
+
+    def since(self, cursor, limit=50):
+        """Entries with sequence >= cursor, oldest first, at most limit of them"""
+        start = max(cursor, self.oldest)
+        end = min(self.seq, start + limit)
+        for seq in range(start, end):
+            yield self.entry(seq)
@@ -0,0 +1,102 @@
+# keypad.py - Non-blocking matrix keypad scanner
+# Each tick drives one row, reads every column from one input snapshot and
+# moves on, so a full scan of the 4x3 matrix takes four ticks and never
+# sleeps. Every key is debounced on its own (a change must hold for
+# debounce_ms) and the resulting press/release events go into a small
+# ring queue, so keys typed while the rest of the system is busy wait
+# there instead of being lost. While a key on the current row has an
+# unconfirmed change the scanner stays on that row, so a press is
+# confirmed debounce_ms after it is first seen rather than a whole scan
+# later.
+from array import array
+
+from clock import ticks_ms, ticks_diff
+
+DEBOUNCE_MS = 20  # A key change must hold this long to count
+QUEUE_SIZE = 16  # Events buffered between reads; must be a power of two
+PRESSED = 0x80  # Event flag: set on press, clear on release
+
+
+class KeypadScanner:
+    """Row-at-a-time scanner with per-key debounce and an event queue"""
+
+    def __init__(self, row_pins, col_bits, layout, sample, debounce_ms=DEBOUNCE_MS,
+                 queue_size=QUEUE_SIZE):
+        if queue_size & (queue_size - 1):
+            raise ValueError("queue_size must be a power of two")
+        self.row_pins = row_pins
+        self.col_bits = col_bits  # Snapshot bit of each column input
+        self.keys = [key for row in layout for key in row]
+        self.sample = sample  # Returns the GPIO snapshot (gpio.InputSampler.sample)
+        self.debounce_ms = debounce_ms
+        self.cols = len(col_bits)
+        self.row = 0  # Row the next tick drives
+        self.raw = 0  # Undebounced key state, bit k = key k down
+        self.stable = 0  # Debounced key state
+        self.changed_at = array('L', [0] * len(self.keys))  # ticks_ms of each raw change
+        self.queue = array('B', [0] * queue_size)
+        self.head = 0
+        self.tail = 0
+        self.dropped = 0
+        self.scans = 0
+        for pin in row_pins:
+            pin.value(0)
+
+    def tick(self):
+        """Scan one row and queue any debounced changes on it"""
+        row_pin = self.row_pins[self.row]
+        row_pin.value(1)
+        snapshot = self.sample()
+        row_pin.value(0)
+
+        now = ticks_ms()
+        k = self.row * self.cols
+        pending = False
+        for bit in self.col_bits:
+            key_bit = 1 << k
+            down = key_bit if snapshot & bit else 0
+            if down != self.raw & key_bit:
+                self.raw ^= key_bit
+                self.changed_at[k] = now
+                pending = True
+            elif down != self.stable & key_bit:
+                if ticks_diff(now, self.changed_at[k]) >= self.debounce_ms:
+                    self.stable ^= key_bit
+                    self._push(k | PRESSED if down else k)
+                else:
+                    pending = True
+            k += 1
+
+        if pending:
+            return  # Confirm this row before moving on
+        self.row += 1
+        if self.row == len(self.row_pins):
+            self.row = 0
+            self.scans += 1
+
+    def _push(self, event):
+        size = len(self.queue)
+        if self.head - self.tail >= size:
+            self.dropped += 1
+            return
+        self.queue[self.head & (size - 1)] = event
+        self.head += 1
+
+    def __len__(self):
+        return self.head - self.tail
+
+    def get(self):
+        """Next (key, pressed) event, or None if the queue is empty"""
+        if self.head == self.tail:
+            return None
+        event = self.queue[self.tail & (len(self.queue) - 1)]
+        self.tail += 1
+        return self.keys[event & ~PRESSED], bool(event & PRESSED)
+
+    def clear(self):
+        """Discard queued events"""
+        self.tail = self.head
+
+    def held(self):
+        """Keys currently held down (debounced)"""
+        return [key for k, key in enumerate(self.keys) if self.stable & (1 << k)]
@@ -0,0 +1,140 @@
+# memory.py - Heap budget, scheduled garbage collection and web admission
+# MicroPython collects when an allocation fails, which can land in the
+# middle of an alarm path and, once ~200 KB of heap is fragmented, end in a
+# MemoryError. MemoryManager runs gc.collect() from its own task instead,
+# when the scheduler reports an idle window long enough for it and enough
+# has been allocated since the last collection. Only a critically low heap
+# with fresh garbage forces one without idle time, at most once a second,
+# so live data pinning the heap low cannot start a collection storm. After
+# each collection it knows the free heap, and a one-step-per-tick bisection
+# tracks the largest free block; together they decide whether the web
+# server serves normally, drops its heavy pages or refuses requests. Ports
+# without gc.mem_free (CPython) always report NORMAL. BufferPool holds
+# buffers allocated once at boot, before the heap has a chance to fragment.
+import gc
+
+from clock import Deadline, ticks_us, ticks_diff
+
+NORMAL = 0
+LOW = 1  # Only light responses (status, static files)
+CRITICAL = 2  # Refuse web requests
+LEVEL_NAMES = ("normal", "low", "critical")
+
+COLLECT_AFTER_BYTES = 16384  # Collect once this much was allocated since the last collection...
+COLLECT_INTERVAL_MS = 10000  # ...or this long has passed
+LOW_FREE_BYTES = 32768
+CRITICAL_FREE_BYTES = 12288
+FORCE_AFTER_BYTES = 2048  # Below CRITICAL_FREE_BYTES, collect without waiting once this much was allocated...
+FORCE_INTERVAL_MS = 1000  # ...but at most once this often: live data alone cannot be collected
+LOW_BLOCK_BYTES = 8192  # Largest free block below which pages no longer fit comfortably
+CRITICAL_BLOCK_BYTES = 3072
+PROBE_INTERVAL_MS = 30000  # How often to re-measure the largest free block
+PROBE_RESOLUTION = 256
+
+
+class MemoryManager:
+    """Collects at idle points and grades the heap for admission control"""
+
+    def __init__(self, heap=None):
+        self.heap = heap  # metrics.HeapWatch sampled before each collection, for the peak
+        self.enabled = hasattr(gc, "mem_free")
+        self.level = NORMAL
+        self.collect_due = Deadline(COLLECT_INTERVAL_MS)
+        self.force_hold = Deadline()  # No forced collection until this expires
+        self.probe_due = Deadline(0)
+        self.alloc_after = gc.mem_alloc() if self.enabled else 0  # Heap in use after the last collection
+        self.free_after = gc.mem_free() if self.enabled else None
+        self.largest_free = None  # Bytes, from the last finished probe
+        self.probe_lo = 0
+        self.probe_hi = 0
+        self.probe_garbage = False  # A probe block is waiting to be collected
+        self.collections = 0
+        self.forced = 0  # Collections that could not wait for an idle window
+        self.collect_us = 0  # Duration of the last collection
+        self.max_collect_us = 0
+        self.refused = 0  # Web requests refused or degraded
+
+    def tick(self, idle_ms):
+        """Collect or advance the block probe if idle_ms leaves room for it"""
+        if not self.enabled:
+            return
+        if self.heap is not None:
+            self.heap.sample()
+        free = gc.mem_free()
+        allocated = gc.mem_alloc() - self.alloc_after
+        # Short of heap, collecting cannot wait for idle time - but only when
+        # there is fresh garbage to win, or it would run on every tick
+        urgent = (free < CRITICAL_FREE_BYTES and not self.probe_garbage
+                  and allocated >= FORCE_AFTER_BYTES and not self.force_hold.pending())
+        if urgent or self.probe_garbage or allocated >= COLLECT_AFTER_BYTES or self.collect_due.expired():
+            # A collection takes about as long as the last one did
+            if urgent or idle_ms * 1000 > self.collect_us:
+                if urgent:
+                    self.forced += 1
+                    self.force_hold.start(FORCE_INTERVAL_MS)
+                self.collect()
+            return
+        # A failed probe allocation makes MicroPython collect, so it needs the same room
+        if (self.probe_hi or self.probe_due.expired()) and idle_ms * 1000 > self.collect_us:
+            self._probe_step()
+
+    def collect(self):
+        start = ticks_us()
+        gc.collect()
+        self.collect_us = ticks_diff(ticks_us(), start)
+        if self.collect_us > self.max_collect_us:
+            self.max_collect_us = self.collect_us
+        self.collections += 1
+        self.probe_garbage = False
+        self.alloc_after = gc.mem_alloc()
+        self.free_after = gc.mem_free()
+        self.collect_due.start(COLLECT_INTERVAL_MS)
+        self._grade()
+
+    def _probe_step(self):
+        """One bisection step towards the largest allocatable block"""
+        if not self.probe_hi:
+            self.probe_lo, self.probe_hi = 0, gc.mem_free()
+        mid = (self.probe_lo + self.probe_hi) // 2
+        try:
+            block = bytearray(mid)
+            self.probe_lo = mid
+            self.probe_garbage = True  # Collected on the next idle tick
+            del block
+        except MemoryError:
+            self.probe_hi = mid
+        if self.probe_hi - self.probe_lo <= PROBE_RESOLUTION:
+            self.largest_free = self.probe_lo
+            self.probe_hi = 0
+            self.probe_due.start(PROBE_INTERVAL_MS)
+            self._grade()
+
+    def _grade(self):
+        free = self.free_after
+        block = self.largest_free if self.largest_free is not None else free
+        if free < CRITICAL_FREE_BYTES or block < CRITICAL_BLOCK_BYTES:
+            self.level = CRITICAL
+        elif free < LOW_FREE_BYTES or block < LOW_BLOCK_BYTES:
+            self.level = LOW
+        else:
+            self.level = NORMAL
+
+    def admit(self, heavy):
+        """Whether to serve a request now; heavy ones are the first to go"""
+        if self.level == NORMAL or (self.level == LOW and not heavy):
+            return True
+        self.refused += 1
+        return False
+
+
+class BufferPool:
+    """Preallocated (input, output) buffer pairs, one per open connection"""
+
+    def __init__(self, count, in_size, out_size):
+        self.free = [(bytearray(in_size), bytearray(out_size)) for _ in range(count)]
+
+    def take(self):
+        return self.free.pop() if self.free else None
+
+    def give(self, buffers):
+        self.free.append(buffers)
@@ -0,0 +1,176 @@
+# metrics.py - Task timing histograms and Prometheus text exposition
+# Every scheduler task owns a Histogram of its run times in fixed
+# power-of-two microsecond buckets, so recording is a few integer ops and
+# never allocates. BootTimes records how long start-up took to reach each
+# stage, and how long each import step took and how much heap it left
+# allocated (compiling a .py source leaves far more than loading a .mpy).
+# render() turns the scheduler, heap and counter values into the
+# Prometheus text format served at /metrics.
+from array import array
+import gc
+
+from clock import ticks_ms, ticks_us, ticks_diff
+
+PREFIX = "seckeja_"
+FIRST_BUCKET_US = 32  # Upper bound of the first bucket
+BUCKETS = 12  # 32 us .. 65.5 ms, plus the +Inf overflow slot
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Bucket upper bounds as Prometheus 'le' labels, in seconds
+LE_LABELS = tuple(str((FIRST_BUCKET_US << i) / 1000000) for i in range(BUCKETS)) + ("+Inf",)
+
+
+class Histogram:
+    """Log2-bucketed durations in microseconds"""
+
+    def __init__(self):
+        self.counts = array('L', [0] * (BUCKETS + 1))  # Last slot is +Inf
+        self.count = 0
+        self.sum_us = 0
+        self.max_us = 0
+
+    def record(self, us):
+        i = 0
+        bound = FIRST_BUCKET_US
+        while i < BUCKETS and us > bound:
+            bound <<= 1
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum_us += us
+        if us > self.max_us:
+            self.max_us = us
+
+
+class HeapWatch:
+    """Heap usage plus collections inferred from drops in allocated bytes"""
+
+    def __init__(self):
+        self.last_alloc = 0
+        self.collections = 0
+        self.peak_alloc = 0
+
+    def sample(self):
+        if hasattr(gc, "mem_alloc"):
+            alloc = gc.mem_alloc()
+            if alloc < self.last_alloc:
+                self.collections += 1  # A collection ran since the last sample
+            self.last_alloc = alloc
+            if alloc > self.peak_alloc:
+                self.peak_alloc = alloc
+
+    def values(self):
+        """(free, used, collections), None where the port does not say"""
+        if hasattr(gc, "mem_free"):
+            self.sample()
+            return gc.mem_free(), gc.mem_alloc(), self.collections
+        if hasattr(gc, "get_stats"):
+            return None, None, sum(s["collections"] for s in gc.get_stats())
+        return None, None, None
+
+
+class BootTimes:
+    """Milliseconds from start-up to the first time each boot stage is reached"""
+
+    def __init__(self, time_imports=True):
+        self.start = ticks_ms()
+        self.stages = {}  # Stage name -> ms after start
+        self.order = []  # Stage names in the order they were reached
+        self.time_imports = time_imports  # False records no import steps
+        self.imports = []  # (name, us, heap bytes or None) per import step
+
+    def mark(self, stage):
+        """Record stage the first time it is reached; later calls are free no-ops"""
+        if stage not in self.stages:
+            ms = ticks_diff(ticks_ms(), self.start)
+            self.stages[stage] = ms
+            self.order.append(stage)
+            print(f"Boot: {stage} after {ms} ms")
+
+    def values(self):
+        """[(stage, ms)] in the order reached"""
+        return [(stage, self.stages[stage]) for stage in self.order]
+
+    def begin_import(self):
+        """Snapshot taken before an import step; pass it to imported()"""
+        return ticks_us(), gc.mem_alloc() if hasattr(gc, "mem_alloc") else None
+
+    def imported(self, name, begun):
+        """Record the time and heap an import step took since begin_import()"""
+        if not self.time_imports:
+            return
+        us = ticks_diff(ticks_us(), begun[0])
+        # Includes the compiler's garbage unless a collection ran meanwhile
+        used = gc.mem_alloc() - begun[1] if begun[1] is not None else None
+        self.imports.append((name, us, used))
+        heap = "" if used is None else f", {used} bytes of heap"
+        print(f"Import: {name} in {us / 1000:.1f} ms{heap}")
+
+
+def _family(name, kind, help_text):
+    return "# HELP " + PREFIX + name + " " + help_text + "\n# TYPE " + PREFIX + name + " " + kind + "\n"
+
+
+def _sample(name, value, labels=""):
+    return PREFIX + name + ("{" + labels + "}" if labels else "") + " " + str(value) + "\n"
+
+
+def render_tasks(scheduler):
+    """Yield per-task histogram and counter families"""
+    tasks = scheduler.tasks
+    out = _family("task_duration_seconds", "histogram", "Time spent in one run of a task")
+    for task in tasks:
+        hist = task.hist
+        label = 'task="' + task.name + '"'
+        cumulative = 0
+        for bound, n in zip(LE_LABELS, hist.counts):
+            cumulative += n
+            out += _sample("task_duration_seconds_bucket", cumulative, label + ',le="' + bound + '"')
+        out += _sample("task_duration_seconds_sum", hist.sum_us / 1000000, label)
+        out += _sample("task_duration_seconds_count", hist.count, label)
+        yield out
+        out = ""
+    for name, kind, attr, help_text in (
+            ("task_runs_total", "counter", "runs", "Completed task runs"),
+            ("task_errors_total", "counter", "errors", "Task runs that raised"),
+            ("task_overruns_total", "counter", "overruns", "Runs that missed their period"),
+            ("task_max_lateness_ms", "gauge", "max_lateness_ms", "Worst start delay seen"),
+            ("task_max_duration_us", "gauge", None, "Longest single run")):
+        out = _family(name, kind, help_text)
+        for task in tasks:
+            value = getattr(task, attr) if attr else task.hist.max_us
+            out += _sample(name, value, 'task="' + task.name + '"')
+        yield out
+
+
+def render_heap(heap):
+    free, used, collections = heap.values()
+    out = ""
+    if free is not None:
+        out += _family("heap_free_bytes", "gauge", "Free GC heap") + _sample("heap_free_bytes", free)
+        out += _family("heap_used_bytes", "gauge", "Allocated GC heap") + _sample("heap_used_bytes", used)
+        out += _family("heap_peak_used_bytes", "gauge", "Highest allocated heap sampled")
+        out += _sample("heap_peak_used_bytes", heap.peak_alloc)
+    if collections is not None:
+        out += _family("gc_collections_total", "counter", "Garbage collections")
+        out += _sample("gc_collections_total", collections)
+    return out
+
+
+def render_counters(counters):
+    """Yield one family per (name, kind, help, value or [(labels, value)]) tuple"""
+    for name, kind, help_text, value in counters:
+        out = _family(name, kind, help_text)
+        if isinstance(value, list):
+            for labels, v in value:
+                out += _sample(name, v, labels)
+        else:
+            out += _sample(name, value)
+        yield out
+
+
+def render(scheduler, heap, counters):
+    """Generator of text chunks for the whole /metrics page"""
+    yield from render_tasks(scheduler)
+    yield render_heap(heap)
+    yield from render_counters(counters)
@@ -0,0 +1,337 @@
+# mqtt.py - Non-blocking MQTT 3.1.1 telemetry client
+# One TCP connection to a broker, driven from a scheduler tick: connect,
+# CONNACK, sends and reads all go through a non-blocking socket, so a dead
+# broker costs the alarm loop a poll(0) instead of a stall. Retained
+# states are kept per topic and only the latest value is sent; events
+# queue up to a fixed count. Everything pending is packed into one write
+# a short while after the first message, so a burst of transitions leaves
+# in one TCP segment. Messages on subscribed topics go to on_message.
+# Only QoS 0 is used: states are re-sent in full after every reconnect,
+# and events are best effort (the journal keeps the authoritative record).
+# Reconnects back off with jitter; the broker address is only looked up
+# again after a socket error or once an hour, never after every timeout.
+import socket
+
+try:
+    import select
+except ImportError:
+    import uselect as select
+
+from clock import Deadline, ticks_ms, ticks_diff
+from netutil import Backoff, CachedAddress, in_progress, would_block
+
+MQTT_PORT = 1883
+KEEPALIVE_S = 60  # Broker drops us after 1.5x this without a packet
+BATCH_MS = 100  # Gather messages this long before a write
+BATCH_BYTES = 1024  # Most bytes packed into one write
+MAX_EVENTS = 32  # Queued events; the oldest is dropped beyond this
+MAX_PACKET = 512  # Largest packet accepted from the broker
+CONNECT_TIMEOUT_MS = 10000  # TCP connect plus CONNACK
+RETRY_MIN_MS = 2000  # First reconnect delay, doubling after each failure...
+RETRY_MAX_MS = 300000  # ...up to this
+
+_POLL_ERR = select.POLLHUP | select.POLLERR
+
+DOWN = 0
+CONNECTING = 1  # TCP connect or CONNACK pending
+UP = 2
+STATE_NAMES = ("down", "connecting", "up")
+
+CONNACK_ERRORS = {
+    1: "bad protocol version",
+    2: "client id rejected",
+    3: "server unavailable",
+    4: "bad username or password",
+    5: "not authorised",
+}
+
+
+def _string(value):
+    data = value.encode() if isinstance(value, str) else value
+    return bytes((len(data) >> 8, len(data) & 0xFF)) + data
+
+
+def _packet(kind, body):
+    """Fixed header (type and flags, remaining length) plus body"""
+    head = bytearray((kind,))
+    n = len(body)
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        head.append(byte | 0x80 if n else byte)
+        if not n:
+            return bytes(head) + body
+
+
+def publish_packet(topic, payload, retain=False):
+    return _packet(0x30 | (1 if retain else 0), _string(topic) + payload)
+
+
+class MqttClient:
+    """Keeps one broker connection up and publishes without blocking"""
+
+    def __init__(self, host, client_id, port=MQTT_PORT, user=None, password=None,
+                 keepalive_s=KEEPALIVE_S, will=None, on_message=None, online=None,
+                 retry_min_ms=RETRY_MIN_MS, retry_max_ms=RETRY_MAX_MS):
+        self.broker = CachedAddress(host, port)
+        self.client_id = client_id
+        self.user = user
+        self.password = password
+        self.keepalive_s = keepalive_s
+        self.will = will  # (topic, payload) the broker retains if we vanish
+        self.on_message = on_message  # Called with (topic, payload bytes)
+        self.online = online  # Optional callable; no attempts while it is False
+        self.backoff = Backoff(retry_min_ms, retry_max_ms)
+
+        self.state = DOWN
+        self.sock = None
+        self.poller = select.poll()
+        self.due = Deadline(0)  # Next attempt (DOWN) or its timeout (CONNECTING)
+        self.batch_due = Deadline()
+        self.ping_due = Deadline()
+        self.last_rx = 0  # ticks_ms of the last packet from the broker
+        self.inbuf = b""
+        self.out = b""  # Packed bytes the socket has not taken yet
+
+        self.subscriptions = []
+        self.states = {}  # Retained topic -> latest payload
+        self.dirty = []  # Retained topics changed since they were last sent
+        self.events = []  # Queued (topic, payload) events
+
+        self.connects = 0
+        self.failures = 0
+        self.drops = 0  # Up connections lost
+        self.published = 0
+        self.dropped = 0  # Events lost to a full queue
+        self.received = 0
+        self.last_error = None
+
+    def is_up(self):
+        return self.state == UP
+
+    def subscribe(self, topic):
+        """Subscribe now and after every reconnect"""
+        self.subscriptions.append(topic)
+        if self.state == UP:
+            self._queue_subscribe(topic)
+
+    def set_state(self, topic, payload):
+        """Retained value for topic; only the latest unsent value goes out"""
+        payload = payload.encode() if isinstance(payload, str) else payload
+        if self.states.get(topic) == payload:
+            return
+        self.states[topic] = payload
+        if topic not in self.dirty:
+            self.dirty.append(topic)
+        self._batch()
+
+    def publish(self, topic, payload):
+        """Queue a non-retained event, dropping the oldest if the queue is full"""
+        if len(self.events) >= MAX_EVENTS:
+            self.events.pop(0)
+            self.dropped += 1
+        self.events.append((topic, payload.encode() if isinstance(payload, str) else payload))
+        self._batch()
+
+    def _batch(self):
+        if not self.batch_due.pending() and self.state == UP:
+            self.batch_due.start(BATCH_MS)
+
+    def tick(self):
+        """Advance the connection; returns the new state when it changes, else None"""
+        if self.state == DOWN:
+            if not self.due.expired() or (self.online is not None and not self.online()):
+                return None
+            return self._connect()
+        events = self.poller.poll(0)
+        flags = events[0][1] if events else 0
+        if flags & _POLL_ERR:
+            return self._fail("connection lost" if self.state == UP else "connect failed")
+        if self.state == CONNECTING:
+            if self.due.expired():
+                return self._fail("timeout")
+            if self.out and not flags & select.POLLOUT:
+                return None  # TCP connect still in progress
+        if flags & select.POLLIN:
+            result = self._read()
+            if result is not None:
+                return result
+        if self.state == UP:
+            if ticks_diff(ticks_ms(), self.last_rx) > self.keepalive_s * 1500:
+                return self._fail("keepalive timeout")
+            if self.ping_due.expired():
+                self.ping_due.start(self.keepalive_s * 500)
+                self.out += b"\xc0\x00"  # PINGREQ
+            if not self.out and (self.dirty or self.events) and not self.batch_due.pending():
+                self.out = self._pack()
+        if self.out:
+            return self._write()
+        return None
+
+    def _connect(self):
+        try:
+            addr = self.broker.get()
+            self.sock = socket.socket()
+            self.sock.setblocking(False)
+            if hasattr(socket, "TCP_NODELAY"):
+                # Writes are already batched; Nagle would only hold them back
+                self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            try:
+                self.sock.connect(addr)
+            except OSError as e:
+                if not in_progress(e):
+                    raise
+        except OSError as e:
+            return self._fail(e, True)
+        self.poller.register(self.sock, select.POLLIN | select.POLLOUT)
+        self.out = self._connect_packet()  # Goes out once the socket is writable
+        self.last_rx = ticks_ms()
+        self.due.start(CONNECT_TIMEOUT_MS)
+        self.state = CONNECTING
+        return CONNECTING
+
+    def _connect_packet(self):
+        flags = 0x02  # Clean session
+        payload = _string(self.client_id)
+        if self.will is not None:
+            flags |= 0x24  # Will flag, will retain
+            payload += _string(self.will[0]) + _string(self.will[1])
+        if self.user is not None:
+            flags |= 0x80
+            payload += _string(self.user)
+            if self.password is not None:
+                flags |= 0x40
+                payload += _string(self.password)
+        head = _string("MQTT") + bytes((4, flags, self.keepalive_s >> 8, self.keepalive_s & 0xFF))
+        return _packet(0x10, head + payload)
+
+    def _queue_subscribe(self, topic):
+        self.out += _packet(0x82, b"\x00\x01" + _string(topic) + b"\x00")  # Packet id 1, QoS 0
+
+    def _pack(self):
+        """Pack dirty states, then queued events, into one write of up to BATCH_BYTES"""
+        out = b""
+        while self.dirty and len(out) < BATCH_BYTES:
+            topic = self.dirty.pop(0)
+            out += publish_packet(topic, self.states[topic], True)
+            self.published += 1
+        while self.events and len(out) < BATCH_BYTES:
+            topic, payload = self.events.pop(0)
+            out += publish_packet(topic, payload)
+            self.published += 1
+        if self.dirty or self.events:
+            self.batch_due.start(0)  # More waiting: the next tick packs it
+        return out
+
+    def _write(self):
+        try:
+            sent = self.sock.send(self.out)
+        except OSError as e:
+            if would_block(e) or in_progress(e):
+                return None  # Not writable yet (or still connecting)
+            return self._fail(e, True)
+        self.out = self.out[sent:] if sent < len(self.out) else b""
+        if self.out:
+            self.poller.modify(self.sock, select.POLLIN | select.POLLOUT)
+        else:
+            self.poller.modify(self.sock, select.POLLIN)
+        return None
+
+    def _read(self):
+        try:
+            data = self.sock.recv(MAX_PACKET)
+        except OSError as e:
+            if would_block(e):
+                return None
+            return self._fail(e, True)
+        if not data:
+            return self._fail("closed by broker")
+        self.last_rx = ticks_ms()
+        self.inbuf += data
+        while True:
+            # Remaining length: up to 4 bytes, 7 bits each
+            n = shift = 0
+            i = 1
+            while True:
+                if i >= len(self.inbuf):
+                    return None  # Header not complete yet
+                byte = self.inbuf[i]
+                n |= (byte & 0x7F) << shift
+                shift += 7
+                i += 1
+                if not byte & 0x80:
+                    break
+                if shift > 21:
+                    return self._fail("bad packet")
+            if n > MAX_PACKET:
+                return self._fail("packet too large")
+            if len(self.inbuf) < i + n:
+                return None
+            kind = self.inbuf[0]
+            body = self.inbuf[i:i + n]
+            self.inbuf = self.inbuf[i + n:]
+            result = self._handle(kind, body)
+            if result is not None:
+                return result
+
+    def _handle(self, kind, body):
+        packet_type = kind >> 4
+        if packet_type == 2:  # CONNACK
+            if len(body) < 2 or body[1] != 0:
+                code = body[1] if len(body) > 1 else -1
+                return self._fail("refused: " + CONNACK_ERRORS.get(code, str(code)))
+            return self._up()
+        if packet_type == 3:  # PUBLISH
+            length = (body[0] << 8) | body[1]
+            topic = bytes(body[2:2 + length]).decode()
+            start = 2 + length
+            if kind & 0x06:
+                pid = body[start:start + 2]
+                start += 2
+                if kind & 0x06 == 0x02:
+                    self.out += b"\x40\x02" + pid  # PUBACK for QoS 1
+            self.received += 1
+            if self.on_message is not None:
+                self.on_message(topic, bytes(body[start:]))
+        # SUBACK and PINGRESP only refresh last_rx
+        return None
+
+    def _up(self):
+        self.state = UP
+        self.connects += 1
+        self.backoff.reset()
+        self.last_error = None
+        self.ping_due.start(self.keepalive_s * 500)
+        for topic in self.subscriptions:
+            self._queue_subscribe(topic)
+        # The broker may have restarted or heard our will: re-send every state
+        self.dirty = list(self.states)
+        self.batch_due.start(0)
+        return UP
+
+    def _fail(self, error, resolve=False):
+        """Back off; resolve (socket errors) looks the broker up again, timeouts keep it"""
+        if self.state == UP:
+            self.drops += 1
+            self.backoff.reset()  # A drop retries at the minimum delay
+        else:
+            self.failures += 1
+        if resolve:
+            self.broker.forget()
+        self.last_error = str(error)
+        self.close()
+        self.due.start(self.backoff.fail())
+        return DOWN
+
+    def close(self):
+        """Drop the connection (without DISCONNECT, so the broker publishes the will)"""
+        if self.sock is not None:
+            try:
+                self.poller.unregister(self.sock)
+            except (OSError, KeyError, ValueError):
+                pass
+            self.sock.close()
+            self.sock = None
+        self.out = b""
+        self.inbuf = b""
+        self.state = DOWN
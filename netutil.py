@@ -0,0 +1,87 @@
+# netutil.py - Shared pieces of the non-blocking network clients
+# Socket errno values that only mean "not ready yet" (they differ between
+# MicroPython/Linux and macOS hosts), the reconnect backoff used by the
+# WiFi, NTP and MQTT clients, and a cached DNS lookup. Backoff doubles
+# the delay after each failure up to a cap and jitters every wait, so a
+# house full of devices coming back after a power cut does not retry in
+# lockstep. getaddrinfo() is the one blocking call these clients make, so
+# an address is kept across failures and only looked up again when a
+# socket error suggests the host moved, or after a long interval. While
+# DNS itself is down, failed lookups are spaced RESOLVE_RETRY_MS apart
+# rather than stalling the loop on every reconnect attempt.
+import random
+import socket
+
+from clock import Deadline
+
+EAGAIN = (11, 35)  # EAGAIN on Linux/MicroPython, EWOULDBLOCK on macOS
+EINPROGRESS = (115, 36)  # Linux/MicroPython, macOS
+RESOLVE_MS = 3600000  # Refresh a cached address this often (pool names rotate)
+RESOLVE_RETRY_MS = 60000  # Wait at least this long after a failed lookup
+
+
+def would_block(e):
+    """True if OSError e only means the socket is not ready yet"""
+    return bool(e.args) and e.args[0] in EAGAIN
+
+
+def in_progress(e):
+    """True if OSError e only means a non-blocking connect has not finished"""
+    return bool(e.args) and e.args[0] in EINPROGRESS
+
+
+class Backoff:
+    """Exponential retry delay with equal jitter"""
+
+    def __init__(self, min_ms, max_ms):
+        self.min_ms = min_ms
+        self.max_ms = max_ms
+        self.ms = 0  # Current delay before jitter; 0 until the first failure
+        self.wait_ms = 0  # Jittered delay last handed out
+
+    def reset(self):
+        """Start again from min_ms (after a success, or a drop of a good link)"""
+        self.ms = 0
+
+    def fail(self):
+        """Double the delay (or start at min_ms); returns the jittered wait in ms"""
+        self.ms = min(self.ms * 2, self.max_ms) if self.ms else self.min_ms
+        # Equal jitter: half the delay fixed, half random
+        self.wait_ms = self.ms // 2 + random.randint(0, self.ms // 2)
+        return self.wait_ms
+
+
+class CachedAddress:
+    """A host's resolved address, kept across failures and refreshed now and then"""
+
+    def __init__(self, host, port, refresh_ms=RESOLVE_MS, retry_ms=RESOLVE_RETRY_MS):
+        self.host = host
+        self.port = port
+        self.refresh_ms = refresh_ms
+        self.retry_ms = retry_ms
+        self.addr = None
+        self.refresh_due = Deadline()
+        self.retry_hold = Deadline()  # Pending after a failed lookup
+        self.error = None  # The last failed lookup's error, raised again while held
+
+    def get(self):
+        """The address, looked up if there is none or a refresh is due (blocks on DNS)"""
+        if self.addr is None or self.refresh_due.expired():
+            if self.retry_hold.pending():
+                if self.addr is None:
+                    raise self.error
+                return self.addr
+            self.refresh_due.start(self.refresh_ms)
+            try:
+                self.addr = socket.getaddrinfo(self.host, self.port)[0][-1]
+            except OSError as e:
+                self.error = e
+                self.retry_hold.start(self.retry_ms)
+                if self.addr is None:
+                    raise
+                # Keep the old address until the next refresh
+        return self.addr
+
+    def forget(self):
+        """Look the host up again on the next get()"""
+        self.addr = None
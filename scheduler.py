@@ -0,0 +1,147 @@
+# scheduler.py - Cooperative task scheduler for the Pico W Security System
+# Runs on MicroPython (uasyncio) and on CPython (asyncio) so task timing
+# can be exercised off-device with stub hardware.
+import gc
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+from clock import ticks_ms, ticks_us, ticks_diff, ticks_add, era
+from metrics import Histogram
+
+if hasattr(asyncio, "sleep_ms"):
+    sleep_ms = asyncio.sleep_ms
+else:
+    def sleep_ms(ms):
+        return asyncio.sleep(ms / 1000)
+
+
+class Task:
+    """A named job that the scheduler runs every period_ms milliseconds"""
+
+    def __init__(self, name, period_ms, func):
+        self.name = name
+        self.period_ms = period_ms
+        self.func = func
+        self.runs = 0
+        self.errors = 0
+        self.overruns = 0
+        self.last_duration_ms = 0
+        self.max_duration_ms = 0
+        self.max_lateness_ms = 0
+        self.next_run = ticks_ms()  # When the task is next due
+        self.hist = Histogram()  # Run durations in microseconds
+
+    def __repr__(self):
+        return (f"<Task {self.name} every {self.period_ms}ms runs={self.runs} "
+                f"max={self.max_duration_ms}ms late={self.max_lateness_ms}ms "
+                f"overruns={self.overruns} errors={self.errors}>")
+
+
+class Scheduler:
+    """Runs each registered task as its own coroutine with a fixed period"""
+
+    def __init__(self):
+        self.tasks = []
+        self.running = False
+        self.current = None  # Task being run right now
+
+    def add(self, name, period_ms, func):
+        """Register func to be called every period_ms milliseconds"""
+        task = Task(name, period_ms, func)
+        self.tasks.append(task)
+        return task
+
+    def get(self, name):
+        """Return the task registered under name, or None"""
+        for task in self.tasks:
+            if task.name == name:
+                return task
+        return None
+
+    def idle_ms(self):
+        """Milliseconds until any other task is due, 0 if one is late"""
+        now = ticks_ms()
+        idle = None
+        for task in self.tasks:
+            if task is not self.current:
+                wait = ticks_diff(task.next_run, now)
+                if idle is None or wait < idle:
+                    idle = wait
+        return max(idle, 0) if idle is not None else 0
+
+    async def _run_task(self, task):
+        """Call one task on its period until the scheduler stops"""
+        next_run = ticks_ms()
+        task.next_run = next_run
+        while self.running:
+            start = ticks_ms()
+            start_us = ticks_us()
+            lateness = ticks_diff(start, next_run)
+            if lateness > task.max_lateness_ms:
+                task.max_lateness_ms = lateness
+
+            self.current = task
+            try:
+                result = task.func()
+                # Tasks may be plain functions or coroutines
+                if result is not None and hasattr(result, "send"):
+                    await result
+            except MemoryError:
+                # Free what we can so the next pass (and the alarm) can run
+                task.errors += 1
+                gc.collect()
+                print(f"Task {task.name} out of memory")
+            except Exception as e:
+                task.errors += 1
+                print(f"Task {task.name} error: {e}")
+
+            self.current = None
+            task.hist.record(ticks_diff(ticks_us(), start_us))
+            now = ticks_ms()
+            duration = ticks_diff(now, start)
+            task.runs += 1
+            task.last_duration_ms = duration
+            if duration > task.max_duration_ms:
+                task.max_duration_ms = duration
+
+            # Keep a fixed cadence; if we fell behind, skip missed slots
+            next_run = ticks_add(next_run, task.period_ms)
+            delay = ticks_diff(next_run, now)
+            if delay < 0:
+                task.overruns += 1
+                next_run = now
+                delay = 0
+            task.next_run = next_run
+            await sleep_ms(delay)
+
+    async def run(self, duration_ms=None):
+        """Run all tasks; stop after duration_ms if given, else forever"""
+        self.running = True
+        coros = [asyncio.create_task(self._run_task(task)) for task in self.tasks]
+        try:
+            if duration_ms is None:
+                while self.running:
+                    era()  # Keep unchecked Deadlines able to tell they expired
+                    await sleep_ms(1000)
+            else:
+                await sleep_ms(duration_ms)
+        finally:
+            self.running = False
+            for coro in coros:
+                coro.cancel()
+
+    def run_forever(self):
+        """Blocking entry point used by main()"""
+        asyncio.run(self.run())
+
+    def stop(self):
+        """Ask all tasks to finish after their current pass"""
+        self.running = False
+
+    def report(self):
+        """Print timing statistics for every task"""
+        for task in self.tasks:
+            print(task)
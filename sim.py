@@ -0,0 +1,694 @@
+# sim.py - Simulated Pico W hardware for running the security system on CPython
+# Provides drop-in stand-ins for machine.Pin/PWM/I2C/RTC, the I2C LCD,
+# network.WLAN, a UDP NTP server and an MQTT broker, all driven by one
+# virtual clock. Sleeping and asyncio timers advance the virtual clock
+# instead of waiting, so main() runs many times faster than real time.
+# Scripted events (pin changes, key presses) are scheduled on the clock
+# with at() and fire at their exact virtual time, from inside sleeps just
+# like real interrupts.
+# Not uploaded to the Pico - hal.py only imports this when machine is missing.
+import asyncio
+import selectors
+import socket
+import struct
+import time as _time
+
+import clock
+
+START_EPOCH = 1767225600  # 2026-01-01 00:00:00 UTC, the wall clock at virtual time 0
+
+
+class SimulationEnd(BaseException):
+    """Raised from the clock to stop a simulated run (not caught by task handlers)"""
+
+
+class ResetRequested(BaseException):
+    """Raised by the simulated machine.reset()"""
+
+
+# Virtual clock
+
+class VirtualClock:
+    """Nanosecond clock that only moves when advanced, with timed callbacks"""
+
+    def __init__(self, speed=None):
+        self.now_ns = 0
+        self.speed = speed  # None: as fast as possible, else virtual/real ratio
+        self.timers = []  # Sorted (at_ns, order, callback, args)
+        self.order = 0
+
+    def now(self):
+        return self.now_ns
+
+    def ms(self):
+        return self.now_ns // 1000000
+
+    def at(self, ms, callback, *args):
+        """Run callback(*args) when the clock reaches ms (virtual milliseconds)"""
+        self.order += 1
+        entry = (int(ms * 1000000), self.order, callback, args)
+        self.timers.append(entry)
+        self.timers.sort(key=lambda t: (t[0], t[1]))
+        return entry
+
+    def after(self, ms, callback, *args):
+        """Run callback(*args) ms virtual milliseconds from now"""
+        return self.at(self.now_ns / 1000000 + ms, callback, *args)
+
+    def advance(self, ns):
+        """Move time forward, firing due callbacks at their own timestamps"""
+        target = self.now_ns + max(0, int(ns))
+        while self.timers and self.timers[0][0] <= target:
+            at_ns, _, callback, args = self.timers.pop(0)
+            self._move_to(max(at_ns, self.now_ns))
+            callback(*args)
+        self._move_to(target)
+
+    def _move_to(self, ns):
+        if self.speed and ns > self.now_ns:
+            _time.sleep((ns - self.now_ns) / 1e9 / self.speed)
+        self.now_ns = ns
+
+
+vclock = VirtualClock()
+clock.set_time_source(vclock.now)
+
+
+def at(ms, callback, *args):
+    """Schedule a scripted action at a virtual time in milliseconds"""
+    return vclock.at(ms, callback, *args)
+
+
+def stop():
+    """Scripted action that ends the run"""
+    raise SimulationEnd()
+
+
+# Time functions Main.py uses through hal
+
+def sleep(seconds):
+    vclock.advance(seconds * 1e9)
+
+
+def sleep_ms(ms):
+    vclock.advance(ms * 1e6)
+
+
+def wall_time():
+    """Seconds since the Unix epoch as shown by the simulated RTC"""
+    return START_EPOCH + rtc_offset + vclock.now_ns // 1000000000
+
+
+def reset():
+    raise ResetRequested()
+
+
+# asyncio on virtual time: instead of blocking in select() until the next
+# timer, the selector polls sockets and jumps the clock to that timer.
+
+class VirtualSelector(selectors.DefaultSelector):
+    def select(self, timeout=None):
+        for server in servers:
+            server.serve()
+        events = super().select(0)
+        if events:
+            return events
+        if timeout is None:
+            return super().select(0.01)  # Nothing scheduled: wait for I/O
+        if timeout > 0:
+            vclock.advance(timeout * 1e9 + 1)
+        return events
+
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+    def __init__(self):
+        super().__init__(VirtualSelector())
+
+    def time(self):
+        return vclock.now_ns / 1e9
+
+
+class VirtualTimePolicy(asyncio.DefaultEventLoopPolicy):
+    def new_event_loop(self):
+        return VirtualTimeLoop()
+
+
+asyncio.set_event_loop_policy(VirtualTimePolicy())
+
+
+# GPIO
+
+class Pin:
+    """GPIO pin; one shared instance per pin id, like the hardware"""
+
+    IN = 0
+    OUT = 1
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    pins = {}  # Pin id -> Pin
+    gpio_in = 0  # Levels of every pin as the SIO GPIO_IN register would show them
+
+    def __new__(cls, id, *args, **kwargs):
+        pin = cls.pins.get(id)
+        if pin is None:
+            pin = super().__new__(cls)
+            pin.id = id
+            pin._level = 0
+            pin.mode = cls.IN
+            pin.pull = None
+            pin.reader = None  # Callable that computes an input level (keypad matrix)
+            pin.handler = None
+            pin.trigger = 0
+            pin.changes = 0
+            cls.pins[id] = pin
+        return pin
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        if mode != -1:
+            self.mode = mode
+        if pull != -1:
+            self.pull = pull
+            if self.mode == Pin.IN and not self.changes:
+                self.level = 1 if pull == Pin.PULL_UP else 0  # Idle level
+        if value is not None:
+            self.level = 1 if value else 0
+
+    def __repr__(self):
+        return f"Pin({self.id}, level={self.value()})"
+
+    @property
+    def level(self):
+        return self._level
+
+    @level.setter
+    def level(self, value):
+        self._level = value
+        if value:
+            Pin.gpio_in |= 1 << self.id
+        else:
+            Pin.gpio_in &= ~(1 << self.id)
+
+    def value(self, v=None):
+        if v is None:
+            if self.reader is not None:
+                return self.reader()
+            return self.level
+        self.level = 1 if v else 0
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, hard=False):
+        self.handler = handler
+        self.trigger = trigger
+
+    def drive(self, level):
+        """Change an input's level from outside (a sensor or button), firing its IRQ"""
+        level = 1 if level else 0
+        if level == self.level:
+            return
+        self.level = level
+        self.changes += 1
+        edge = Pin.IRQ_RISING if level else Pin.IRQ_FALLING
+        if self.handler is not None and self.trigger & edge:
+            self.handler(self)
+
+
+def pin(id):
+    """The simulated pin with this id"""
+    return Pin(id)
+
+
+def pulse(id, level, ms, start_ms=None):
+    """Script: drive a pin to level for ms, then back"""
+    start = vclock.ms() if start_ms is None else start_ms
+    idle = Pin(id).level
+    at(start, Pin(id).drive, level)
+    at(start + ms, Pin(id).drive, idle)
+
+
+def bounce(id, level, edges=7, ms=2, start_ms=None):
+    """Script: a contact bouncing for ms (edges transitions) before settling at level"""
+    start = vclock.ms() if start_ms is None else start_ms
+    for i in range(edges):
+        # Odd transition count: the last one lands on level
+        at(start + ms * i / (edges - 1), Pin(id).drive, level if i % 2 == 0 else 1 - level)
+
+
+class Mem32:
+    """machine.mem32 stand-in that only knows the SIO GPIO_IN register"""
+
+    GPIO_IN = 0xD0000004
+
+    def __getitem__(self, addr):
+        if addr != Mem32.GPIO_IN:
+            raise ValueError("Unmapped address %08x" % addr)
+        value = Pin.gpio_in
+        for pin in Pin.pins.values():
+            if pin.reader is not None:
+                # Pins driven by other pins (keypad columns) are computed on read
+                if pin.reader():
+                    value |= 1 << pin.id
+                else:
+                    value &= ~(1 << pin.id)
+        return value
+
+
+mem32 = Mem32()
+
+
+class Keypad:
+    """Matrix keypad wiring: a column reads high while its pressed key's row is driven high"""
+
+    def __init__(self, rows, cols, layout):
+        self.rows = rows
+        self.cols = cols
+        self.layout = layout
+        self.pressed = None  # (row index, col index)
+        for c, col in enumerate(cols):
+            Pin(col).reader = self._reader(c)
+
+    def _reader(self, c):
+        def read():
+            if self.pressed is None or self.pressed[1] != c:
+                return 0
+            return Pin(self.rows[self.pressed[0]]).level
+        return read
+
+    def press(self, key):
+        for r, row in enumerate(self.layout):
+            if key in row:
+                self.pressed = (r, row.index(key))
+                return
+        raise ValueError("No key " + key)
+
+    def release(self):
+        self.pressed = None
+
+    def type(self, keys, start_ms=None, hold_ms=150, gap_ms=350):
+        """Script: press and release each key in turn"""
+        t = vclock.ms() if start_ms is None else start_ms
+        for key in keys:
+            at(t, self.press, key)
+            at(t + hold_ms, self.release)
+            t += hold_ms + gap_ms
+        return t
+
+
+# PWM, I2C and LCD
+
+class PWM:
+    """Records every (ms, freq, duty) change instead of driving a pin"""
+
+    def __init__(self, pin, freq=0, duty_u16=0):
+        self.pin = pin
+        self._freq = freq
+        self._duty = duty_u16
+        self.history = []
+
+    def freq(self, value=None):
+        if value is None:
+            return self._freq
+        if value != self._freq:
+            self._freq = value
+            self.history.append((vclock.ms(), self._freq, self._duty))
+
+    def duty_u16(self, value=None):
+        if value is None:
+            return self._duty
+        if value != self._duty:
+            self._duty = value
+            self.history.append((vclock.ms(), self._freq, self._duty))
+
+    def deinit(self):
+        self.duty_u16(0)
+
+
+class I2C:
+    def __init__(self, id, sda=None, scl=None, freq=400000):
+        self.id = id
+        self.freq = freq
+
+    def scan(self):
+        return [0x27]
+
+
+class TextLcd:
+    """HD44780 character LCD rendered into a text buffer (lcd_api semantics)"""
+
+    def __init__(self, i2c=None, addr=0x27, num_lines=2, num_columns=16):
+        self.num_lines = num_lines
+        self.num_columns = num_columns
+        self.lines = [[" "] * num_columns for _ in range(num_lines)]
+        self.cursor_x = 0
+        self.cursor_y = 0
+        self.writes = 0  # Characters sent
+        self.commands = 0  # clear/move_to calls
+
+    def clear(self):
+        self.commands += 1
+        self.lines = [[" "] * self.num_columns for _ in range(self.num_lines)]
+        self.cursor_x = self.cursor_y = 0
+
+    def move_to(self, cursor_x, cursor_y):
+        self.commands += 1
+        self.cursor_x = cursor_x
+        self.cursor_y = cursor_y
+
+    def putchar(self, char):
+        if char == "\n":
+            self.cursor_x = self.num_columns  # Force a line wrap
+        else:
+            if self.cursor_y < self.num_lines and self.cursor_x < self.num_columns:
+                self.lines[self.cursor_y][self.cursor_x] = char
+            self.writes += 1
+            self.cursor_x += 1
+        if self.cursor_x >= self.num_columns:
+            self.cursor_x = 0
+            self.cursor_y = (self.cursor_y + 1) % self.num_lines
+
+    def putstr(self, string):
+        for char in string:
+            self.putchar(char)
+
+    def backlight_on(self):
+        pass
+
+    def backlight_off(self):
+        pass
+
+    def text(self):
+        return ["".join(line) for line in self.lines]
+
+
+# Network and time services
+
+rtc_offset = 0  # Seconds the RTC is ahead of true time (set_utc() zeroes it)
+
+
+class RTC:
+    """Real-time clock derived from the virtual clock"""
+
+    def datetime(self, value=None):
+        global rtc_offset
+        if value is None:
+            t = _time.gmtime(wall_time())
+            return (t.tm_year, t.tm_mon, t.tm_mday, t.tm_wday,
+                    t.tm_hour, t.tm_min, t.tm_sec, 0)
+        year, month, day, _, hour, minute, second, _ = value
+        import calendar
+        wanted = calendar.timegm((year, month, day, hour, minute, second, 0, 0, 0))
+        rtc_offset = wanted - (START_EPOCH + vclock.now_ns // 1000000000)
+
+
+STA_IF = 0
+STAT_NO_AP_FOUND = -2
+STAT_IDLE = 0
+STAT_CONNECTING = 1
+STAT_GOT_IP = 3
+
+
+class WLAN:
+    """Station interface that associates after a scripted delay"""
+
+    connect_ms = 3000  # Virtual time from connect() to an IP
+    available = True  # Set False to script an access point outage (drops the link)
+    rssi = -55
+    mac = b"\x28\xcd\xc1\x00\x5e\xca"
+    ip = "127.0.0.1"
+
+    def __init__(self, interface=STA_IF):
+        self._active = False
+        self.connected_at = None
+        self.connects = 0
+
+    def active(self, value=None):
+        if value is None:
+            return self._active
+        self._active = bool(value)
+
+    def config(self, name):
+        if name == "mac":
+            return self.mac
+        if name == "ssid":
+            return "simulated"
+        raise ValueError(name)
+
+    def connect(self, ssid=None, password=None):
+        self.connects += 1
+        self.connected_at = vclock.ms() + self.connect_ms
+
+    def disconnect(self):
+        self.connected_at = None
+
+    def isconnected(self):
+        return self.status() == STAT_GOT_IP
+
+    def status(self, name=None):
+        if name == "rssi":
+            return WLAN.rssi
+        if self.connected_at is None:
+            return STAT_IDLE
+        if vclock.ms() < self.connected_at:
+            return STAT_CONNECTING
+        if not WLAN.available:
+            self.connected_at = None  # Association lost; needs a new connect()
+            return STAT_NO_AP_FOUND
+        return STAT_GOT_IP
+
+    def ifconfig(self):
+        if self.isconnected():
+            return (self.ip, "255.255.255.0", "127.0.0.1", "127.0.0.1")
+        return ("0.0.0.0", "0.0.0.0", "0.0.0.0", "0.0.0.0")
+
+
+def set_utc(seconds):
+    """Set the RTC to UTC seconds since the Unix epoch"""
+    global rtc_offset
+    rtc_offset = seconds - (START_EPOCH + vclock.now_ns // 1000000000)
+
+
+servers = []  # Stand-in network servers, answered from every event loop pass
+NTP_DELTA = 2208988800  # 1900 to 1970
+
+
+class NtpServer:
+    """Local UDP stand-in for an NTP server, answering from the virtual clock"""
+
+    def __init__(self, port=0, offset_ms=0, drift_ppm=0):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", port))
+        self.sock.setblocking(False)
+        self.port = self.sock.getsockname()[1]
+        self.offset_ms = offset_ms  # How far true time is ahead of virtual time
+        self.drift_ppm = drift_ppm  # How much faster true time runs
+        self.available = True  # Set False to script an outage (requests go unanswered)
+        self.requests = 0
+        servers.append(self)
+
+    def utc_ms(self):
+        ms = vclock.now_ns / 1e6
+        return START_EPOCH * 1000 + ms * (1 + self.drift_ppm / 1e6) + self.offset_ms
+
+    def serve(self):
+        """Answer every pending request"""
+        while True:
+            try:
+                data, addr = self.sock.recvfrom(512)
+            except BlockingIOError:
+                return
+            self.requests += 1
+            if not self.available or len(data) < 48:
+                continue
+            seconds, ms = divmod(self.utc_ms(), 1000)
+            stamp = struct.pack("!II", int(seconds) + NTP_DELTA, int(ms * 4294967.296))
+            # LI 0, version 4, mode 4 (server), stratum 1, reference "SIM"
+            head = struct.pack("!BBbbII4s", 0x24, 1, 6, -20, 0, 0, b"SIM\0")
+            self.sock.sendto(head + stamp + data[40:48] + stamp + stamp, addr)
+
+    def close(self):
+        servers.remove(self)
+        self.sock.close()
+
+
+class BrokerClient:
+    """One TCP connection to the stand-in broker"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.inbuf = b""
+        self.client_id = None
+        self.will = None  # (topic, payload, retain)
+        self.filters = []
+
+
+def topic_matches(pattern, topic):
+    """MQTT filter match with + and # wildcards"""
+    pattern, topic = pattern.split("/"), topic.split("/")
+    for i, part in enumerate(pattern):
+        if part == "#":
+            return True
+        if i >= len(topic) or (part != "+" and part != topic[i]):
+            return False
+    return len(pattern) == len(topic)
+
+
+class MqttBroker:
+    """Local TCP stand-in for an MQTT 3.1.1 broker (QoS 0, retained messages, wills)"""
+
+    def __init__(self, port=0):
+        self.sock = socket.socket()
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(("127.0.0.1", port))
+        self.sock.listen(4)
+        self.sock.setblocking(False)
+        self.port = self.sock.getsockname()[1]
+        self.available = True  # Set False to script an outage (clients dropped, connects refused)
+        self.clients = []
+        self.retained = {}  # Topic -> payload
+        self.messages = []  # (virtual ms, topic, payload, retain) of every publish received
+        self.connects = 0
+        servers.append(self)
+
+    def serve(self):
+        """Accept, read and answer every pending packet"""
+        while True:
+            try:
+                sock, _ = self.sock.accept()
+            except BlockingIOError:
+                break
+            if not self.available:
+                sock.close()
+                continue
+            sock.setblocking(False)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.clients.append(BrokerClient(sock))
+        for client in list(self.clients):
+            if not self.available:
+                self._drop(client)
+                continue
+            try:
+                data = client.sock.recv(4096)
+            except BlockingIOError:
+                continue
+            except OSError:
+                data = b""
+            if not data:
+                self._drop(client)
+                continue
+            client.inbuf += data
+            self._process(client)
+
+    def _process(self, client):
+        while client in self.clients and len(client.inbuf) >= 2:
+            n = shift = 0
+            i = 1
+            while True:
+                if i >= len(client.inbuf):
+                    return
+                byte = client.inbuf[i]
+                n |= (byte & 0x7F) << shift
+                shift += 7
+                i += 1
+                if not byte & 0x80:
+                    break
+            if len(client.inbuf) < i + n:
+                return
+            kind, body = client.inbuf[0], client.inbuf[i:i + n]
+            client.inbuf = client.inbuf[i + n:]
+            self._handle(client, kind, body)
+
+    def _handle(self, client, kind, body):
+        packet_type = kind >> 4
+        if packet_type == 1:  # CONNECT
+            pos = 2 + struct.unpack_from("!H", body)[0]
+            flags = body[pos + 1]
+            pos += 4
+            client.client_id, pos = self._string(body, pos)
+            if flags & 0x04:
+                topic, pos = self._string(body, pos)
+                payload, pos = self._string(body, pos, raw=True)
+                client.will = (topic, payload, bool(flags & 0x20))
+            self.connects += 1
+            self._send(client, b"\x20\x02\x00\x00")
+        elif packet_type == 3:  # PUBLISH
+            topic, pos = self._string(body, 0)
+            if kind & 0x06:
+                pos += 2
+            self.publish(topic, body[pos:], bool(kind & 1))
+        elif packet_type == 8:  # SUBSCRIBE
+            pid = body[:2]
+            pos = 2
+            codes = b""
+            while pos < len(body):
+                pattern, pos = self._string(body, pos)
+                pos += 1
+                client.filters.append(pattern)
+                codes += b"\x00"
+                for topic, payload in self.retained.items():
+                    if topic_matches(pattern, topic):
+                        self._send(client, self._publish_packet(topic, payload, True))
+            self._send(client, bytes((0x90, 2 + len(codes))) + pid + codes)
+        elif packet_type == 12:  # PINGREQ
+            self._send(client, b"\xd0\x00")
+        elif packet_type == 14:  # DISCONNECT
+            client.will = None
+            self._drop(client)
+
+    def publish(self, topic, payload, retain=False):
+        """Deliver to every matching subscriber (also used to script control messages)"""
+        payload = payload.encode() if isinstance(payload, str) else bytes(payload)
+        self.messages.append((vclock.ms(), topic, payload, retain))
+        if retain:
+            if payload:
+                self.retained[topic] = payload
+            else:
+                self.retained.pop(topic, None)
+        packet = self._publish_packet(topic, payload, False)
+        for client in list(self.clients):
+            if any(topic_matches(pattern, topic) for pattern in client.filters):
+                self._send(client, packet)
+
+    @staticmethod
+    def _string(body, pos, raw=False):
+        length = struct.unpack_from("!H", body, pos)[0]
+        value = bytes(body[pos + 2:pos + 2 + length])
+        return (value if raw else value.decode()), pos + 2 + length
+
+    @staticmethod
+    def _publish_packet(topic, payload, retain):
+        body = struct.pack("!H", len(topic)) + topic.encode() + payload
+        head = bytearray((0x30 | int(retain),))
+        n = len(body)
+        while True:
+            head.append((n & 0x7F) | (0x80 if n > 0x7F else 0))
+            n >>= 7
+            if not n:
+                return bytes(head) + body
+
+    def _send(self, client, data):
+        try:
+            client.sock.sendall(data)
+        except OSError:
+            self._drop(client)
+
+    def _drop(self, client):
+        if client not in self.clients:
+            return
+        self.clients.remove(client)
+        client.sock.close()
+        if client.will is not None:
+            self.publish(*client.will)
+
+    def close(self):
+        servers.remove(self)
+        for client in list(self.clients):
+            client.will = None
+            self._drop(client)
+        self.sock.close()
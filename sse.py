@@ -0,0 +1,122 @@
+# sse.py - Server-Sent Events stream for open dashboards
+# Subscribers keep their HTTP connection open; every sensor, arming and
+# alarm transition is pushed to them as one small event. Sends never block:
+# a client that cannot keep up is dropped instead of stalling the alarm loop.
+from clock import Deadline
+from netutil import would_block
+
+MAX_SUBSCRIBERS = 3  # Concurrent /events connections
+HEARTBEAT_MS = 15000  # Comment line that keeps proxies open and finds dead clients
+MAX_PENDING = 1024  # Bytes a slow subscriber may fall behind before it is dropped
+RETRY_MS = 2000  # Browser reconnect delay after a dropped stream
+
+HEADERS = (b"HTTP/1.1 200 OK\r\n"
+           b"Content-Type: text/event-stream\r\n"
+           b"Cache-Control: no-cache\r\n"
+           b"Connection: keep-alive\r\n\r\n")
+BUSY = (b"HTTP/1.1 503 Service Unavailable\r\n"
+        b"Retry-After: 10\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+PING = b": ping\n\n"
+
+
+class Subscriber:
+    """One open /events connection and the bytes still waiting to go out"""
+
+    def __init__(self, sock, addr):
+        self.sock = sock
+        self.addr = addr
+        self.pending = b""
+
+
+class EventStream:
+    """Fan-out of small text events to a capped set of SSE subscribers"""
+
+    def __init__(self, max_subscribers=MAX_SUBSCRIBERS):
+        self.max_subscribers = max_subscribers
+        self.subscribers = []
+        self.heartbeat = Deadline(HEARTBEAT_MS)
+        self.event_id = 0
+        self.events_sent = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    def subscribe(self, sock, addr=None):
+        """Take over an accepted socket as a subscriber; False if at the cap"""
+        sock.setblocking(False)
+        if len(self.subscribers) >= self.max_subscribers:
+            self.rejected += 1
+            try:
+                sock.send(BUSY)
+            except OSError:
+                pass
+            sock.close()
+            return False
+        sub = Subscriber(sock, addr)
+        self.subscribers.append(sub)
+        self._send(sub, HEADERS + b"retry: " + str(RETRY_MS).encode() + b"\n\n")
+        print(f"SSE subscriber added: {addr} ({len(self.subscribers)}/{self.max_subscribers})")
+        return True
+
+    def publish(self, event, data):
+        """Send one event with a pre-serialised data string to every subscriber"""
+        self.event_id += 1
+        if not self.subscribers:
+            return
+        message = ("id: " + str(self.event_id) + "\nevent: " + event +
+                   "\ndata: " + data + "\n\n").encode()
+        self._broadcast(message)
+        self.events_sent += 1
+
+    def tick(self):
+        """Flush backlogs, send heartbeats and drop closed connections"""
+        if not self.subscribers:
+            self.heartbeat.start(HEARTBEAT_MS)
+            return
+        if self.heartbeat.expired():
+            self.heartbeat.start(HEARTBEAT_MS)
+            self._broadcast(PING)
+        else:
+            for sub in list(self.subscribers):
+                if sub.pending:
+                    self._send(sub, b"")
+        # A readable socket with no data means the browser went away
+        for sub in list(self.subscribers):
+            try:
+                if sub.sock.recv(64) == b"":
+                    self._drop(sub, "closed")
+            except OSError:
+                pass  # Nothing to read - still connected
+
+    def close(self):
+        """Disconnect every subscriber"""
+        for sub in list(self.subscribers):
+            self._drop(sub, "shutdown")
+
+    def _broadcast(self, message):
+        for sub in list(self.subscribers):
+            self._send(sub, message)
+
+    def _send(self, sub, message):
+        """Non-blocking send; whatever does not fit is kept, up to MAX_PENDING"""
+        data = sub.pending + message if sub.pending else message
+        try:
+            sent = sub.sock.send(data)
+        except OSError as e:
+            if would_block(e):
+                sent = 0
+            else:
+                self._drop(sub, "error")
+                return
+        sub.pending = data[sent:] if sent < len(data) else b""
+        if len(sub.pending) > MAX_PENDING:
+            self._drop(sub, "too slow")
+
+    def _drop(self, sub, reason):
+        if sub in self.subscribers:
+            self.subscribers.remove(sub)
+        self.dropped += 1
+        try:
+            sub.sock.close()
+        except OSError:
+            pass
+        print(f"SSE subscriber dropped ({reason}): {sub.addr}")
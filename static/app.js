@@ -0,0 +1,167 @@
+// app.js - Dashboard behaviour for the Pico W Security System
+// Served once from flash and cached. Polls /api/status and patches only the
+// elements whose values changed instead of reloading the whole page.
+// While the /events stream is open, transitions trigger an immediate update
+// and polling slows down unless a countdown is on screen.
+
+const POLL_MS = 1000;
+const IDLE_POLL_MS = 10000;
+const RED = '#ff6b6b';
+const GREEN = '#51cf66';
+
+function byId(id) {
+    return document.getElementById(id);
+}
+
+// Last value written per element property; style getters normalise colours
+// so they cannot be compared with what we set
+const last = {};
+
+function changed(key, value) {
+    if (last[key] === value) {
+        return false;
+    }
+    last[key] = value;
+    return true;
+}
+
+// Only touch the DOM when a value actually changed
+function setText(id, value) {
+    const el = byId(id);
+    const text = String(value);
+    if (el.textContent !== text) {
+        el.textContent = text;
+    }
+}
+
+function setClass(id, className) {
+    const el = byId(id);
+    if (el.className !== className) {
+        el.className = className;
+    }
+}
+
+function setColor(id, color) {
+    if (changed(id + ':color', color)) {
+        byId(id).style.color = color;
+    }
+}
+
+function setHidden(id, hidden) {
+    const el = byId(id);
+    if (el.hidden !== hidden) {
+        el.hidden = hidden;
+    }
+}
+
+// One card per zone, rendered by the server with ids zone-<name>[-part]
+function zone(z) {
+    const id = 'zone-' + z.name;
+    if (!byId(id)) {
+        return;  // Zone added since the page was served
+    }
+    setText(id + '-status', z.status);
+    setColor(id + '-status', z.active ? RED : GREEN);
+    setClass(id, 'sensor-card ' + (z.active ? (z.motion ? 'sensor-warning' : 'sensor-alert') : 'sensor-normal'));
+    setText(id + '-count', z.changes);
+    if (z.motion) {
+        setText(id + '-ago', z.ago === null ? 'N/A' : z.ago);
+    }
+}
+
+function apply(s) {
+    // Overall status
+    setText('secStatus', s.security);
+    setColor('secStatus', s.color);
+    if (changed('secBox:border', s.color)) {
+        byId('secBox').style.borderColor = s.color;
+    }
+
+    // Arming countdown
+    setHidden('armingSection', !s.arming);
+    setText('armingTimer', s.arming_countdown + 's');
+    setText('armingSeconds', s.arming_countdown);
+
+    // Disarm code and keypad entry
+    setHidden('disarmSection', !s.alarm);
+    setText('securityCode', s.code);
+    const info = (s.code_valid ? 'Enter this code on keypad to disarm' : 'Code expired - new motion required') +
+        '<br>Expires in: ' + s.code_expiry + ' seconds<br>Failed attempts: ' +
+        s.failed_attempts + ' / ' + s.max_attempts;
+    const codeInfo = byId('codeInfo');
+    if (codeInfo.innerHTML !== info) {
+        codeInfo.innerHTML = info;
+    }
+    setText('enteredCode', '*'.repeat(s.digits) + '_'.repeat(Math.max(0, 5 - s.digits)));
+    setText('digitsEntered', s.digits);
+
+    // Buzzer, keypad and arm button
+    setClass('buzzerStatus', 'buzzer-status ' + (s.buzzer ? 'buzzer-active' : 'buzzer-inactive'));
+    setText('buzzerStatus', ' Buzzer: ' + (s.buzzer ? 'ACTIVE' : 'INACTIVE'));
+    setText('keypadStatus', s.keypad ? 'ENABLED - Enter code #' : 'DISABLED');
+    setHidden('failedWarn', s.failed_attempts === 0);
+    setText('failedWarn', 'Failed attempts: ' + s.failed_attempts);
+    setText('armInfo', s.armed ? 'ENTER PASSWORD TO DISARM' : 'PRESS BUTTON TO ARM');
+
+    // Sensors
+    s.zones.forEach(zone);
+
+    // Time and system information
+    setText('randomDigits', s.random);
+    setText('currentTime', s.time);
+    setText('currentDate', s.date);
+    setText('currentDay', s.day);
+    setText('edges', s.edges);
+    setText('edgesDropped', s.edges_dropped);
+    setText('lcdBps', s.lcd_bps);
+}
+
+let polling = false;
+let streaming = false;
+let counting = false;
+let timer = null;
+
+function pollDelay() {
+    return (streaming && !counting) ? IDLE_POLL_MS : POLL_MS;
+}
+
+function refresh() {
+    if (polling) {
+        return;
+    }
+    polling = true;
+    clearTimeout(timer);
+    fetch('/api/status', {cache: 'no-store'})
+        .then(response => response.json())
+        .then(s => {
+            // Countdowns need a fresh value every second even with the stream open
+            counting = s.arming || s.alarm;
+            apply(s);
+        })
+        .catch(() => {})
+        .finally(() => {
+            polling = false;
+            setText('pollSeconds', pollDelay() / 1000);
+            timer = setTimeout(refresh, pollDelay());
+        });
+}
+
+if (window.EventSource) {
+    const stream = new EventSource('/events');
+    stream.onopen = () => { streaming = true; };
+    stream.onerror = () => { streaming = false; };
+    ['sensor', 'arming', 'alarm'].forEach(name => stream.addEventListener(name, refresh));
+}
+
+byId('refreshBtn').addEventListener('click', refresh);
+refresh();
+
+// Add urgency effect for alert sensors
+setInterval(() => {
+    document.querySelectorAll('.sensor-alert, .sensor-warning').forEach(sensor => {
+        sensor.style.transform = sensor.style.transform ? '' : 'scale(1.02)';
+    });
+    document.querySelectorAll('.sensor-normal').forEach(sensor => {
+        sensor.style.transform = '';
+    });
+}, 800);
@@ -0,0 +1,79 @@
+# template.py - Precompiled streaming HTML templates
+# A template is split once, at import time, into constant bytes segments
+# and named {{slots}}. Rendering fills only the slots and yields the result
+# as memoryview chunks of one reused buffer straight to the socket, so peak
+# heap per response is bounded by the chunk size and the slot values, not
+# by the page size.
+
+CHUNK_SIZE = 512
+
+
+class Template:
+    """Constant bytes segments interleaved with named {{slots}}"""
+
+    def __init__(self, source):
+        segments = []
+        slots = []
+        pos = 0
+        while True:
+            start = source.find("{{", pos)
+            if start < 0:
+                break
+            end = source.find("}}", start)
+            if end < 0:
+                raise ValueError("Unclosed template slot")
+            segments.append(source[pos:start].encode())
+            slots.append(source[start + 2:end].strip())
+            pos = end + 2
+        segments.append(source[pos:].encode())
+        self.segments = tuple(segments)
+        self.slots = tuple(slots)
+        self.static_length = sum(len(seg) for seg in segments)
+
+    def render(self, values, chunk_size=CHUNK_SIZE):
+        """Return (chunk generator, total length) for the filled template"""
+        filled = []
+        length = self.static_length
+        for name in self.slots:
+            value = values[name]
+            if isinstance(value, tuple):
+                # Pre-rendered pieces (e.g. one per repeated block) are streamed
+                # in turn rather than joined
+                length += sum(len(piece) for piece in value)
+            else:
+                if not isinstance(value, bytes):
+                    value = str(value).encode()
+                length += len(value)
+            filled.append(value)
+        return self._stream(filled, chunk_size), length
+
+    def render_bytes(self, values):
+        """Render the whole template into one bytes object (for tests and tools)"""
+        chunks, _ = self.render(values)
+        return b"".join(bytes(chunk) for chunk in chunks)
+
+    def _stream(self, filled, chunk_size):
+        """Pack segments and slot values into one reused chunk buffer"""
+        buf = bytearray(chunk_size)
+        out = memoryview(buf)
+        used = 0
+        last = len(filled)
+        for i in range(len(self.segments) + last):
+            # Even steps are constant segments, odd steps are slot values
+            value = self.segments[i >> 1] if not i & 1 else filled[i >> 1]
+            for piece in (value if isinstance(value, tuple) else (value,)):
+                src = memoryview(piece)
+                n = len(piece)
+                pos = 0
+                while pos < n:
+                    take = min(chunk_size - used, n - pos)
+                    buf[used:used + take] = src[pos:pos + take]
+                    used += take
+                    pos += take
+                    if used == chunk_size:
+                        # The server sends this before asking for the next chunk,
+                        # so the buffer can be refilled in place
+                        yield out
+                        used = 0
+        if used:
+            yield out[:used]
@@ -0,0 +1,27 @@
+# conftest.py - Make the flat firmware modules importable from tests/
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import clock  # noqa: E402
+
+
+@pytest.fixture
+def vclock():
+    """Install a virtual nanosecond clock; yields advance(ms, step_ms)"""
+    now = [0]
+    saved = clock._time_source
+    clock.set_time_source(lambda: now[0])
+
+    def advance(ms, step_ms=3600000):
+        # Step as the scheduler loop would, calling era() along the way
+        while ms > 0:
+            now[0] += min(ms, step_ms) * 1000000
+            ms -= step_ms
+            clock.era()
+
+    yield advance
+    clock.set_time_source(saved)
@@ -0,0 +1,54 @@
+# test_clock.py - Deadline behaviour across the ticks_ms wrap
+import pytest
+
+import clock
+
+DAY_MS = 24 * 3600 * 1000
+
+
+def test_deadline_expires(vclock):
+    d = clock.Deadline(1000)
+    assert d.pending() and not d.expired()
+    vclock(999, step_ms=1)
+    assert d.pending()
+    vclock(1, step_ms=1)
+    assert d.expired() and not d.pending()
+    assert d.remaining_ms() == 0
+
+
+def test_clear_and_restart(vclock):
+    d = clock.Deadline(1000)
+    d.clear()
+    assert not d.pending() and not d.expired()
+    d.start(500)
+    vclock(500, step_ms=1)
+    assert d.expired()
+    d.start(500)
+    assert d.pending()
+
+
+@pytest.mark.parametrize("idle_ms", [(1 << 29) + 1000, int(6.3 * DAY_MS), 7 * DAY_MS, 12 * DAY_MS])
+def test_unchecked_deadline_stays_expired(vclock, idle_ms):
+    d = clock.Deadline(2000)
+    vclock(2000 + idle_ms)
+    assert not d.pending()
+    assert d.expired()
+    assert d.remaining_ms() == 0
+
+
+def test_checked_deadline_stays_expired(vclock):
+    d = clock.Deadline(2000)
+    vclock(2000)
+    assert d.expired()
+    vclock((1 << 29) + 1000)
+    assert d.expired() and not d.pending()
+
+
+def test_long_deadline_across_wrap(vclock):
+    # An hour-long deadline started just before ticks_ms wraps
+    vclock(clock.TICKS_PERIOD - 1000, step_ms=DAY_MS // 4)
+    d = clock.Deadline(3600000)
+    vclock(3599000, step_ms=60000)
+    assert d.pending()
+    vclock(1000, step_ms=1000)
+    assert d.expired()
@@ -0,0 +1,123 @@
+# test_httpserver.py - HttpServer over a real localhost socket
+import re
+import socket
+import time
+
+import pytest
+
+from httpserver import HttpServer, Response, MAX_HEADER, MAX_BODY
+
+
+def echo(request):
+    body = f"{request.method} {request.path} {request.body.decode()}"
+    return Response(200, body, "text/plain")
+
+
+@pytest.fixture
+def server():
+    srv = HttpServer(echo, port=0, host="127.0.0.1")
+    srv.start()
+    yield srv
+    srv.stop()
+
+
+def exchange(srv, chunks, responses=1, timeout_s=2.0):
+    """Send chunks (polling the server between them); return everything read back"""
+    client = socket.create_connection(("127.0.0.1", srv.port))
+    client.setblocking(False)
+    data = b""
+    quiet_since = None
+    try:
+        for chunk in chunks:
+            client.sendall(chunk)
+            for _ in range(5):
+                srv.poll(0)
+                time.sleep(0.002)
+        end = time.monotonic() + timeout_s
+        while time.monotonic() < end:
+            srv.poll(0)
+            try:
+                got = client.recv(4096)
+            except BlockingIOError:
+                got = None
+            if got == b"":
+                break  # Server closed the connection
+            if got:
+                data += got
+                quiet_since = None
+            elif data.count(b"HTTP/1.1 ") >= responses:
+                # Enough status lines; wait a little for the rest of the body
+                quiet_since = quiet_since or time.monotonic()
+                if time.monotonic() - quiet_since > 0.05:
+                    break
+            time.sleep(0.002)
+    finally:
+        client.close()
+    return data
+
+
+def statuses(data):
+    return [int(code) for code in re.findall(rb"HTTP/1\.1 (\d{3}) ", data)]
+
+
+def test_simple_get(server):
+    data = exchange(server, [b"GET /status HTTP/1.1\r\nHost: x\r\n\r\n"])
+    assert statuses(data) == [200]
+    assert data.endswith(b"GET /status ")
+
+
+def test_pipelined_requests(server):
+    raw = (b"GET /a HTTP/1.1\r\n\r\n"
+           b"POST /b HTTP/1.1\r\nContent-Length: 5\r\n\r\nhello"
+           b"GET /c HTTP/1.1\r\n\r\n")
+    data = exchange(server, [raw], responses=3)
+    assert statuses(data) == [200, 200, 200]
+    assert data.index(b"GET /a ") < data.index(b"POST /b hello") < data.index(b"GET /c ")
+
+
+def test_partial_reads(server):
+    raw = b"POST /form HTTP/1.1\r\nContent-Length: 11\r\n\r\nhello world"
+    # One byte at a time, so the head terminator straddles reads
+    data = exchange(server, [raw[i:i + 1] for i in range(len(raw))])
+    assert statuses(data) == [200]
+    assert data.endswith(b"POST /form hello world")
+
+
+def test_body_split_across_reads(server):
+    data = exchange(server, [b"POST /x HTTP/1.1\r\nContent-Length: 6\r\n\r\nabc", b"def"])
+    assert statuses(data) == [200]
+    assert data.endswith(b"POST /x abcdef")
+
+
+@pytest.mark.parametrize("value", [b"abc", b"-20", b"", b"\xc2\xb2", b"1 2"])
+def test_bad_content_length(server, value):
+    data = exchange(server, [b"POST / HTTP/1.1\r\nContent-Length: " + value + b"\r\n\r\nhello"])
+    assert statuses(data) == [400]  # One error, nothing after it is parsed
+    assert b"Connection: close" in data
+
+
+def test_malformed_request_line(server):
+    assert statuses(exchange(server, [b"NONSENSE\r\n\r\n"])) == [400]
+
+
+def test_body_too_large(server):
+    data = exchange(server, [b"POST / HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % (MAX_BODY + 1)])
+    assert statuses(data) == [413]
+
+
+def test_head_too_large_in_one_read(server):
+    # A complete head over MAX_HEADER, blank line and all
+    head = b"GET / HTTP/1.1\r\nX-Pad: " + b"a" * (MAX_HEADER + 500) + b"\r\n\r\n"
+    assert len(head) < MAX_HEADER + MAX_BODY  # Fits the buffer, so one read may take it whole
+    assert statuses(exchange(server, [head])) == [431]
+
+
+def test_head_too_large_unterminated(server):
+    head = b"GET / HTTP/1.1\r\nX-Pad: " + b"a" * (MAX_HEADER + 100)
+    assert statuses(exchange(server, [head])) == [431]
+
+
+def test_head_at_limit_accepted(server):
+    head = b"GET / HTTP/1.1\r\nX-Pad: "
+    head += b"a" * (MAX_HEADER - len(head)) + b"\r\n\r\n"
+    assert statuses(exchange(server, [head])) == [200]
@@ -0,0 +1,201 @@
+# test_mqtt.py - MQTT client and Main's telemetry against sim.MqttBroker
+# The client tests drive MqttClient directly on sim's virtual clock; the
+# system tests boot Main under sim in a subprocess (Main is one big module
+# of globals) and check the broker's recorded log afterwards.
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import clock
+import mqtt
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def sim():
+    """sim on its virtual clock, restoring the time source afterwards"""
+    saved = clock._time_source
+    import sim
+    clock.set_time_source(sim.vclock.now)
+    yield sim
+    clock.set_time_source(saved)
+
+
+@pytest.fixture
+def broker(sim):
+    broker = sim.MqttBroker()
+    yield broker
+    broker.close()
+
+
+def run(sim, broker, clients, ms, step_ms=10):
+    """Advance virtual time, ticking the clients and serving the broker"""
+    for _ in range(ms // step_ms):
+        sim.vclock.advance(step_ms * 1000000)
+        for client in clients:
+            client.tick()
+        broker.serve()
+        time.sleep(0.0001)  # Let loopback packets land
+
+
+def client(broker, **kwargs):
+    return mqtt.MqttClient("127.0.0.1", "test", broker.port, **kwargs)
+
+
+def published(broker, topic):
+    return [(payload, retain) for _, t, payload, retain in broker.messages if t == topic]
+
+
+def test_states_and_events(sim, broker):
+    c = client(broker)
+    c.set_state("dev/status", "booting")
+    c.set_state("dev/status", "ready")  # Only the latest unsent value goes out
+    c.publish("dev/event", "boot")
+    run(sim, broker, [c], 1000)
+    assert c.is_up()
+    assert published(broker, "dev/status") == [(b"ready", True)]
+    assert published(broker, "dev/event") == [(b"boot", False)]
+    assert broker.retained == {"dev/status": b"ready"}
+
+
+def test_states_resent_after_reconnect(sim, broker):
+    c = client(broker, retry_min_ms=1000, retry_max_ms=1000)
+    c.set_state("dev/status", "ready")
+    run(sim, broker, [c], 1000)
+    broker.available = False
+    run(sim, broker, [c], 500)
+    assert not c.is_up() and c.drops == 1
+    broker.available = True
+    run(sim, broker, [c], 3000)
+    assert c.is_up() and broker.connects == 2
+    assert published(broker, "dev/status") == [(b"ready", True), (b"ready", True)]
+
+
+def test_will_published_when_client_vanishes(sim, broker):
+    c = client(broker, will=("dev/availability", "offline"))
+    c.set_state("dev/availability", "online")
+    run(sim, broker, [c], 1000)
+    assert broker.retained["dev/availability"] == b"online"
+    c.sock.close()  # Power cut: no DISCONNECT
+    run(sim, broker, [], 100)
+    assert published(broker, "dev/availability")[-1] == (b"offline", True)
+    assert broker.retained["dev/availability"] == b"offline"
+
+
+def test_subscribed_messages_delivered(sim, broker):
+    received = []
+    c = client(broker, on_message=lambda topic, payload: received.append((topic, payload)))
+    c.subscribe("dev/control")
+    run(sim, broker, [c], 1000)
+    broker.publish("dev/control", "arm")
+    broker.publish("dev/other", "ignored")
+    run(sim, broker, [c], 500)
+    assert received == [("dev/control", b"arm")]
+
+
+# Boots Main under sim, plays the scripted steps and prints the broker log
+# and state snapshots as JSON. argv: control flag, steps JSON, end ms.
+SYSTEM = r'''
+import json, os, sys
+sys.path.insert(0, sys.argv[1])
+import sim
+control, steps, end_ms = sys.argv[2] == "1", json.loads(sys.argv[3]), int(sys.argv[4])
+ntp = sim.NtpServer()
+broker = sim.MqttBroker()
+import Main
+Main.WEB_PORT = 0
+Main.NTP_HOST, Main.NTP_PORT = "127.0.0.1", ntp.port
+Main.MQTT_BROKER, Main.MQTT_PORT = "127.0.0.1", broker.port
+if control:
+    Main.MQTT_CONTROL = True
+base = Main.MQTT_TOPIC + "/" + Main.pico_mac_address
+for pin_id in (Main.DOOR_SENSOR_PIN, Main.WINDOW_SENSOR_PIN, Main.PIR_SENSOR_PIN):
+    sim.pin(pin_id).drive(0)
+sim.pin(Main.ARM_BUTTON_PIN).drive(1)
+snapshots = {}
+def snapshot(label):
+    snapshots[label] = {"armed": Main.system_armed, "arming": Main.arming_in_progress,
+                        "alarm": Main.alarm_triggered}
+for ms, kind, arg in steps:
+    if kind == "mqtt":
+        sim.at(ms, broker.publish, base + "/control", arg)
+    elif kind == "door":
+        sim.at(ms, sim.pin(Main.DOOR_SENSOR_PIN).drive, arg)
+    else:
+        sim.at(ms, snapshot, arg)
+sim.at(end_ms, sim.stop)
+out, sys.stdout = sys.stdout, open(os.devnull, "w")
+try:
+    Main.main()
+except sim.SimulationEnd:
+    pass
+subscribed = [p for c in broker.clients for p in c.filters]
+Main.telemetry.sock.close()  # Vanish without a DISCONNECT
+broker.serve()
+sys.stdout = out
+strip = len(base) + 1
+print(json.dumps({
+    "messages": [(ms, t[strip:], p.decode(), r) for ms, t, p, r in broker.messages],
+    "retained": {t[strip:]: p.decode() for t, p in broker.retained.items()},
+    "subscribed": [p[strip:] for p in subscribed],
+    "snapshots": snapshots,
+}))
+'''
+
+
+def run_system(tmp_path, steps, end_ms, control=True):
+    result = subprocess.run(
+        [sys.executable, "-c", SYSTEM, ROOT, "1" if control else "0", json.dumps(steps), str(end_ms)],
+        cwd=str(tmp_path), capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def events(log):
+    return [json.loads(payload)["event"] for _, topic, payload, _ in log["messages"] if topic == "event"]
+
+
+def test_system_publishes_and_will(tmp_path):
+    log = run_system(tmp_path, [(20000, "door", 1), (25000, "door", 0)], 30000)
+    assert events(log) == ["sensor", "sensor"]
+    assert [p for _, t, p, _ in log["messages"] if t == "zone/door"] == ["CLOSED", "OPEN", "CLOSED"]
+    assert all(retain for _, topic, _, retain in log["messages"] if topic != "event")
+    status = json.loads(log["retained"]["status"])
+    assert status["armed"] is False and status["alarm"] is False
+    assert log["retained"]["zone/window"] == "CLOSED"
+    # The will replaced "online" once the device vanished
+    assert [p for _, t, p, _ in log["messages"] if t == "availability"] == ["online", "offline"]
+    assert log["retained"]["availability"] == "offline"
+
+
+def test_system_control_arm_and_disarm(tmp_path):
+    steps = [(20000, "mqtt", "arm"), (25000, "snap", "arming"), (55000, "snap", "armed"),
+             (60000, "mqtt", " DISARM\n"), (62000, "snap", "disarmed")]
+    log = run_system(tmp_path, steps, 63000)
+    assert log["subscribed"] == ["control"]
+    snaps = log["snapshots"]
+    assert snaps["arming"]["arming"] and not snaps["arming"]["armed"]
+    assert snaps["armed"]["armed"]
+    assert not snaps["disarmed"]["armed"]
+    assert json.loads(log["retained"]["status"])["armed"] is False
+
+
+def test_system_control_ignored_during_alarm(tmp_path):
+    steps = [(20000, "mqtt", "arm"), (55000, "door", 1), (58000, "mqtt", "disarm"),
+             (60000, "snap", "after")]
+    log = run_system(tmp_path, steps, 61000)
+    after = log["snapshots"]["after"]
+    assert after["alarm"] and after["armed"]
+    assert json.loads(log["retained"]["status"])["alarm"] is True
+
+
+def test_system_control_off_by_default(tmp_path):
+    steps = [(20000, "mqtt", "arm"), (55000, "snap", "after")]
+    log = run_system(tmp_path, steps, 56000, control=False)
+    assert log["subscribed"] == []
+    assert not log["snapshots"]["after"]["armed"] and not log["snapshots"]["after"]["arming"]
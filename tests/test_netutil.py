@@ -0,0 +1,86 @@
+# test_netutil.py - Cached DNS lookups and retry backoff
+import pytest
+
+import netutil
+
+
+@pytest.fixture
+def dns(monkeypatch):
+    """Stand-in getaddrinfo; set dns.up to False to make lookups fail"""
+    class Dns:
+        up = True
+        calls = 0
+
+        def getaddrinfo(self, host, port):
+            self.calls += 1
+            if not self.up:
+                raise OSError(-2)
+            return [(2, 1, 0, "", ("10.0.0.%d" % self.calls, port))]
+
+    fake = Dns()
+    monkeypatch.setattr(netutil.socket, "getaddrinfo", fake.getaddrinfo)
+    return fake
+
+
+def test_address_cached_until_refresh(vclock, dns):
+    addr = netutil.CachedAddress("ntp.example", 123, refresh_ms=10000)
+    assert addr.get() == ("10.0.0.1", 123)
+    vclock(9999)
+    assert addr.get() == ("10.0.0.1", 123)
+    vclock(1)
+    assert addr.get() == ("10.0.0.2", 123)
+    assert dns.calls == 2
+
+
+def test_failed_lookups_rate_limited(vclock, dns):
+    dns.up = False
+    addr = netutil.CachedAddress("ntp.example", 123, retry_ms=60000)
+    for _ in range(50):  # Reconnect attempts while DNS is down
+        with pytest.raises(OSError):
+            addr.get()
+        vclock(1000)
+    assert dns.calls == 1
+    vclock(10000)
+    with pytest.raises(OSError):
+        addr.get()
+    assert dns.calls == 2
+    dns.up = True
+    vclock(60000)
+    assert addr.get() == ("10.0.0.3", 123)
+
+
+def test_failed_refresh_keeps_address(vclock, dns):
+    addr = netutil.CachedAddress("ntp.example", 123, refresh_ms=10000, retry_ms=60000)
+    first = addr.get()
+    dns.up = False
+    vclock(10000)
+    assert addr.get() == first  # Refresh failed; keep the old one
+    vclock(1000)
+    assert addr.get() == first
+    assert dns.calls == 2
+
+
+def test_forget_respects_retry_hold(vclock, dns):
+    addr = netutil.CachedAddress("ntp.example", 123, retry_ms=60000)
+    addr.get()
+    dns.up = False
+    addr.forget()
+    with pytest.raises(OSError):
+        addr.get()
+    addr.forget()
+    with pytest.raises(OSError):
+        addr.get()
+    assert dns.calls == 2
+
+
+def test_backoff_doubles_to_cap():
+    backoff = netutil.Backoff(1000, 8000)
+    delays = []
+    for _ in range(6):
+        wait = backoff.fail()
+        assert backoff.ms // 2 <= wait <= backoff.ms
+        delays.append(backoff.ms)
+    assert delays == [1000, 2000, 4000, 8000, 8000, 8000]
+    backoff.reset()
+    backoff.fail()
+    assert backoff.ms == 1000
@@ -0,0 +1,69 @@
+# test_wifi.py - WiFi supervisor state machine and uptime
+import wifi
+
+DAY_MS = 24 * 3600 * 1000
+
+
+class FakeWlan:
+    """Station interface whose status() the test sets directly"""
+
+    def __init__(self):
+        self.stat = wifi.STAT_IDLE
+        self.connects = 0
+
+    def status(self, param=None):
+        return -60 if param == "rssi" else self.stat
+
+    def connect(self, ssid, password):
+        self.connects += 1
+        self.stat = wifi.STAT_CONNECTING
+
+    def disconnect(self):
+        self.stat = wifi.STAT_IDLE
+
+
+def test_connect_and_drop(vclock):
+    wlan = FakeWlan()
+    link = wifi.WifiSupervisor(wlan, "ssid", "pw")
+    assert link.tick() == wifi.CONNECTING
+    wlan.stat = wifi.STAT_GOT_IP
+    assert link.tick() == wifi.UP
+    assert link.is_up() and link.rssi == -60
+    wlan.stat = -1
+    assert link.tick() == wifi.DOWN
+    assert link.drops == 1 and link.uptime_s() == 0
+
+
+def test_uptime_past_ticks_wrap(vclock):
+    wlan = FakeWlan()
+    link = wifi.WifiSupervisor(wlan, "ssid", "pw")
+    link.tick()
+    wlan.stat = wifi.STAT_GOT_IP
+    link.tick()
+    for _ in range(10 * 24 * 60):  # Ten days, ticked every minute
+        vclock(60000, step_ms=60000)
+        link.tick()
+    vclock(500, step_ms=500)
+    link.tick()
+    assert link.uptime_s() == 10 * DAY_MS // 1000
+
+
+def test_uptime_restarts_after_reconnect(vclock):
+    wlan = FakeWlan()
+    link = wifi.WifiSupervisor(wlan, "ssid", "pw")
+    link.tick()
+    wlan.stat = wifi.STAT_GOT_IP
+    link.tick()
+    vclock(5000, step_ms=5000)
+    link.tick()
+    assert link.uptime_s() == 5
+    wlan.stat = -2
+    link.tick()
+    vclock(wifi.RETRY_MAX_MS, step_ms=1000)
+    link.tick()
+    wlan.stat = wifi.STAT_GOT_IP
+    link.tick()
+    assert link.reconnects == 1 and link.uptime_s() == 0
+    vclock(1999, step_ms=1999)
+    link.tick()
+    assert link.uptime_s() == 1
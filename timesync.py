@@ -0,0 +1,159 @@
+# timesync.py - Background NTP time service
+# Runs one SNTP exchange at a time over a non-blocking UDP socket: a tick
+# sends the request and later ticks poll for the reply, so a slow or dead
+# server costs the alarm loop a recvfrom() that returns at once instead of
+# a multi-second ntptime.settime() stall. Failures back off exponentially
+# (with jitter), and the server address is kept across timeouts.
+# The RTC is kept on UTC (Main adds the timezone when it shows the time), so
+# event stamps stay UTC. Successive syncs give a drift estimate
+# of the local crystal against the server, in parts per million.
+import socket
+import struct
+import time
+
+from clock import Deadline, ticks_ms, ticks_diff
+from netutil import Backoff, CachedAddress, would_block
+
+NTP_PORT = 123
+SYNC_INTERVAL_MS = 3600000  # Resync every hour after a success
+RETRY_MIN_MS = 15000  # First retry after a failure, doubling each time...
+RETRY_MAX_MS = 600000  # ...up to this
+TIMEOUT_MS = 2000  # Give up on a reply after this long
+STEP_MIN_MS = 1000  # Smaller corrections are below the RTC's 1 s resolution
+DRIFT_MAX_GAP_MS = 86400000  # Longest sync gap used for drift (ticks_ms wraps after ~6 days)
+
+# Seconds from the NTP epoch (1900) to this port's time.time() epoch
+NTP_DELTA = 3155673600 if time.gmtime(0)[0] == 2000 else 2208988800
+
+IDLE = 0
+WAITING = 1
+
+
+class TimeService:
+    """Non-blocking SNTP client that keeps the RTC on UTC"""
+
+    def __init__(self, host="pool.ntp.org", port=NTP_PORT, wall_time=time.time,
+                 set_utc=None, online=None, interval_ms=SYNC_INTERVAL_MS,
+                 retry_min_ms=RETRY_MIN_MS, retry_max_ms=RETRY_MAX_MS, timeout_ms=TIMEOUT_MS):
+        self.server = CachedAddress(host, port)
+        self.wall_time = wall_time  # UTC seconds from the RTC
+        self.set_utc = set_utc  # Sets the RTC from UTC seconds
+        self.online = online  # Optional callable; no attempts while it is False
+        self.interval_ms = interval_ms
+        self.backoff = Backoff(retry_min_ms, retry_max_ms)
+        self.timeout_ms = timeout_ms
+
+        self.state = IDLE
+        self.due = Deadline(0)  # First sync as soon as we are online
+        self.reply_due = Deadline()
+        self.sock = None
+        self.request = bytearray(48)
+        self.serial = 0
+        self.sent_at = 0
+        self._ref = None  # (ticks_ms, UTC ms) of the last sync, for drift
+
+        self.synced = False
+        self.syncs = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.last_error = None
+        self.rtt_ms = 0
+        self.last_step_ms = 0  # RTC error corrected by the last sync
+        self.drift_ppm = None  # Positive: the local clock runs slow
+
+    def tick(self):
+        """Advance the exchange; returns True or False when one completes, else None"""
+        if self.state == WAITING:
+            return self._receive()
+        if self._ref is not None and ticks_diff(ticks_ms(), self._ref[0]) > DRIFT_MAX_GAP_MS:
+            self._ref = None
+        if not self.due.expired():
+            return None
+        if self.online is not None and not self.online():
+            return None  # Still due; try again as soon as the network is up
+        return self._send()
+
+    def _send(self):
+        try:
+            addr = self.server.get()
+            if self.sock is None:
+                self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                self.sock.setblocking(False)
+            request = self.request
+            request[0] = 0x1B  # LI 0, version 3, mode 3 (client)
+            # The transmit field is an opaque cookie the server echoes back
+            # as the originate timestamp, so stale or stray replies are ignored
+            self.serial += 1
+            self.sent_at = ticks_ms()
+            struct.pack_into("!II", request, 40, self.serial, self.sent_at)
+            self.sock.sendto(request, addr)
+        except OSError as e:
+            return self._fail(e, True)
+        self.state = WAITING
+        self.reply_due.start(self.timeout_ms)
+        return None
+
+    def _receive(self):
+        try:
+            data = self.sock.recvfrom(64)[0]
+        except OSError as e:
+            if not would_block(e):
+                return self._fail(e, True)  # e.g. ICMP unreachable: the server may have gone
+            if self.reply_due.expired():
+                self.timeouts += 1
+                return self._fail("timeout")
+            return None
+        now = ticks_ms()
+        if (len(data) < 48 or data[0] & 7 != 4
+                or struct.unpack_from("!II", data, 24) != (self.serial, self.sent_at)):
+            return None  # Not the reply to our request; keep waiting
+        if data[1] == 0:
+            return self._fail("kiss-o'-death " + bytes(data[12:16]).decode(), True)
+
+        rx_s, rx_f, tx_s, tx_f = struct.unpack_from("!IIII", data, 32)
+        if tx_s == 0:
+            return self._fail("no transmit time")
+        if tx_s < 0x80000000:
+            tx_s += 0x100000000  # NTP era 1 (after 2036-02-07)
+            rx_s += 0x100000000
+        rtt = ticks_diff(now, self.sent_at)
+        held = (tx_s - rx_s) * 1000 + ((tx_f - rx_f) * 1000 >> 32)  # Time spent on the server
+        utc_ms = (tx_s - NTP_DELTA) * 1000 + (tx_f * 1000 >> 32) + max(0, rtt - held) // 2
+        self._apply(utc_ms, now, rtt)
+        return True
+
+    def _apply(self, utc_ms, now, rtt):
+        step = utc_ms - int(self.wall_time() * 1000)
+        if self.set_utc is not None and (not self.synced or abs(step) >= STEP_MIN_MS):
+            self.set_utc(utc_ms // 1000)
+        if self._ref is not None:
+            elapsed = ticks_diff(now, self._ref[0])
+            if elapsed > 0:
+                ppm = ((utc_ms - self._ref[1]) - elapsed) * 1000000 / elapsed
+                # Smooth out per-exchange network jitter
+                self.drift_ppm = ppm if self.drift_ppm is None else self.drift_ppm + (ppm - self.drift_ppm) / 4
+        self._ref = (now, utc_ms)
+        self.rtt_ms = rtt
+        self.last_step_ms = step
+        self.synced = True
+        self.syncs += 1
+        self.last_error = None
+        self.backoff.reset()
+        self.state = IDLE
+        self.due.start(self.interval_ms)
+
+    def _fail(self, error, resolve=False):
+        """Back off; resolve drops the address (send errors, kiss-o'-death), timeouts keep it"""
+        self.failures += 1
+        self.last_error = str(error)
+        if resolve:
+            self.server.forget()
+        self.state = IDLE
+        self.due.start(self.backoff.fail())
+        return False
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+        self.state = IDLE
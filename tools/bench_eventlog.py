@@ -0,0 +1,75 @@
+# bench_eventlog.py - Host benchmark for the flash event log
+# Run from the project root:  python tools/bench_eventlog.py [records]
+# Measures append and flush throughput, worst-case flush time (the time the
+# log can hold up the scheduler), and recovery scan time over full segments,
+# including one with a torn final record.
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import eventlog  # noqa: E402
+
+
+def bench_write(path, count):
+    log = eventlog.EventLog(path)
+    start = time.perf_counter()
+    for i in range(count):
+        log.append(i % 12, i % 4, 0, 1700000000 + i)
+        log.tick()
+    log.flush()
+    elapsed = time.perf_counter() - start
+    return log, elapsed
+
+
+def bench_recover(path, rounds=5):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        log = eventlog.EventLog(path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return log, best
+
+
+def tear_last_record(path):
+    names = sorted(n for n in os.listdir(path) if n.endswith(".bin"))
+    last = os.path.join(path, names[-1])
+    size = os.path.getsize(last)
+    with open(last, "r+b") as f:
+        f.truncate(size - eventlog.RECORD_SIZE // 2)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    path = tempfile.mkdtemp(prefix="eventlog-")
+    try:
+        log, elapsed = bench_write(path, count)
+        size = sum(os.path.getsize(os.path.join(path, n)) for n in os.listdir(path))
+        print(f"write: {count} records in {elapsed * 1000:.1f} ms "
+              f"({count / elapsed:.0f} records/s, {count * eventlog.RECORD_SIZE / elapsed / 1024:.0f} KB/s)")
+        print(f"  flushes: {log.flushes}, max flush: {log.max_flush_us} us, "
+              f"segments kept: {len(log.segments)} ({size} bytes), dropped: {log.dropped}")
+
+        recovered, best = bench_recover(path)
+        held = size // eventlog.RECORD_SIZE
+        print(f"recover: {held} records in {best * 1000:.2f} ms "
+              f"(next seq {recovered.seq}, skipped {recovered.skipped})")
+        assert recovered.seq == count
+
+        tear_last_record(path)
+        torn, best = bench_recover(path)
+        print(f"recover torn: {best * 1000:.2f} ms (next seq {torn.seq}, skipped {torn.skipped})")
+        assert torn.skipped == 1 and torn.seq == count - 1
+        torn.append(0)
+        torn.flush()
+        assert len(torn.segments) == len(recovered.segments)  # Rotated past the torn segment
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    main()
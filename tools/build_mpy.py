@@ -0,0 +1,86 @@
+# build_mpy.py - Precompile the firmware modules to .mpy bytecode
+# Run on the host from the project root:  python tools/build_mpy.py [--manifest]
+# Needs mpy-cross matching the Pico's MicroPython version (pip install mpy-cross).
+# Writes build/<module>.mpy for every module plus a two-line build/main.py
+# that imports Main.mpy, so the Pico loads bytecode instead of compiling
+# ~4000 lines of source at every boot. Upload the contents of build/ in
+# place of the .py files (static/ and pico_i2c_lcd.py are uploaded as
+# before). --manifest also writes build/manifest.py for freezing the same
+# modules into a custom firmware image instead.
+import os
+import shutil
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+BUILD_DIR = os.path.join(ROOT, "build")
+HOST_ONLY = ("sim.py",)  # Never uploaded to the Pico
+
+STUB = """# main.py - generated by tools/build_mpy.py; runs the precompiled Main.mpy
+import Main
+Main.run()
+"""
+
+MANIFEST_HEAD = """# manifest.py - generated by tools/build_mpy.py
+# Build firmware with:  make -C ports/rp2 BOARD=RPI_PICO_W FROZEN_MANIFEST=<this file>
+include("$(PORT_DIR)/boards/$(BOARD)/manifest.py")
+"""
+
+
+def modules():
+    return sorted(name for name in os.listdir(ROOT)
+                  if name.endswith(".py") and name not in HOST_ONLY)
+
+
+def find_compiler():
+    """mpy-cross command line, or None if it is not installed"""
+    path = shutil.which("mpy-cross")
+    if path:
+        return [path]
+    try:
+        import mpy_cross  # noqa: F401 - the pip package bundles the binary
+        return [sys.executable, "-m", "mpy_cross"]
+    except ImportError:
+        return None
+
+
+def compile_module(compiler, name):
+    """Compile one module into build/; returns (source bytes, .mpy bytes)"""
+    source = os.path.join(ROOT, name)
+    target = os.path.join(BUILD_DIR, name[:-3] + ".mpy")
+    subprocess.run(compiler + ["-o", target, source], check=True)
+    return os.path.getsize(source), os.path.getsize(target)
+
+
+def write_manifest(names):
+    path = os.path.join(BUILD_DIR, "manifest.py")
+    with open(path, "w") as f:
+        f.write(MANIFEST_HEAD)
+        for name in names:
+            f.write(f"module({name!r}, base_path={os.path.abspath(ROOT)!r})\n")
+    print("Wrote build/manifest.py")
+
+
+def main():
+    compiler = find_compiler()
+    if compiler is None:
+        print("mpy-cross not found: pip install mpy-cross (same version as the firmware)")
+        return 1
+    os.makedirs(BUILD_DIR, exist_ok=True)
+    names = modules()
+    total_in = total_out = 0
+    for name in names:
+        size_in, size_out = compile_module(compiler, name)
+        total_in += size_in
+        total_out += size_out
+        print(f"{name}: {size_in} -> {size_out} bytes")
+    with open(os.path.join(BUILD_DIR, "main.py"), "w") as f:
+        f.write(STUB)
+    print(f"Total: {total_in} -> {total_out} bytes in {len(names)} modules")
+    if "--manifest" in sys.argv[1:]:
+        write_manifest(names)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,36 @@
+# build_static.py - Precompress the dashboard CSS/JS before uploading to the Pico
+# Run on the host from the project root:  python tools/build_static.py
+# Writes static/<name>.gz next to each source file; upload both to the Pico.
+import gzip
+import os
+import sys
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "static")
+EXTENSIONS = (".css", ".js", ".html")
+
+
+def compress(path):
+    """Write path.gz with a fixed mtime so rebuilds are byte-identical"""
+    with open(path, "rb") as f:
+        data = f.read()
+    packed = gzip.compress(data, compresslevel=9, mtime=0)
+    with open(path + ".gz", "wb") as f:
+        f.write(packed)
+    return len(data), len(packed)
+
+
+def main():
+    total_in = total_out = 0
+    for name in sorted(os.listdir(STATIC_DIR)):
+        if not name.endswith(EXTENSIONS):
+            continue
+        size_in, size_out = compress(os.path.join(STATIC_DIR, name))
+        total_in += size_in
+        total_out += size_out
+        print(f"{name}: {size_in} -> {size_out} bytes")
+    print(f"Total: {total_in} -> {total_out} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
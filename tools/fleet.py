@@ -0,0 +1,356 @@
+# fleet.py - Collect many SecKeja units into one dashboard and API (CPython)
+# Run on a server:  python tools/fleet.py units.txt [--port 8000]
+# units.txt lists one unit per line, "name http://192.168.1.20" or just the
+# URL (the name defaults to the host). Each unit gets one TCP connection:
+# GET /api/status and GET /events are pipelined on the same keep-alive
+# socket, so the snapshot and the live feed arrive in order with nothing
+# lost between them, and the unit never renders its HTML page for us.
+# Events update an in-memory store; /, /api/fleet and /api/units/<name>
+# are served from it without touching the units. One asyncio loop on one
+# core follows thousands of units (see tools/fleet_load.py).
+import argparse
+import asyncio
+import html
+import json
+import random
+import sys
+import time
+from urllib.parse import parse_qs, urlsplit
+
+RETRY_MIN_S = 1  # First reconnect delay, doubling (with jitter) after each failure...
+RETRY_MAX_S = 60  # ...up to this
+CONNECT_TIMEOUT_S = 10
+MAX_STATUS_BYTES = 65536  # Largest /api/status body accepted from a unit
+STALE_S = 45  # Units ping /events every 15 s; this much silence means a dead link
+SWEEP_S = 5  # How often to look for stale links
+PAGE_ROWS = 500  # Units listed on the HTML page, most urgent first
+STATES = ("alarm", "offline", "arming", "armed", "disarmed")  # Most urgent first
+
+
+class Unit:
+    """Normalised state of one unit, kept current from its event feed"""
+
+    def __init__(self, name, url):
+        parts = urlsplit(url if "//" in url else "http://" + url)
+        self.name = name
+        self.url = url
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip("/")  # For units behind a path-routing proxy
+        self.online = False
+        self.armed = False
+        self.arming = False
+        self.alarm = False
+        self.zones = {}  # Zone name -> status text
+        self.events = 0
+        self.last_event = None  # (wall time, event, data)
+        self.changed = time.time()  # Wall time of the last online/offline change
+        self.seen = 0.0  # Monotonic time anything last arrived
+        self.connects = 0
+        self.error = None
+        self.writer = None  # Open connection, closed by the stale-link sweep
+
+    def state(self):
+        if not self.online:
+            return "offline"
+        if self.alarm:
+            return "alarm"
+        if self.armed:
+            return "armed"
+        if self.arming:
+            return "arming"
+        return "disarmed"
+
+    def apply_status(self, status):
+        """Replace the state with an /api/status snapshot"""
+        self.armed = status["armed"]
+        self.arming = status["arming"]
+        self.alarm = status["alarm"]
+        self.zones = {zone["name"]: zone["status"] for zone in status["zones"]}
+
+    def apply_event(self, event, data):
+        """Apply one /events transition (sensor, arming or alarm)"""
+        if event == "sensor":
+            self.zones[data["zone"]] = data["status"]
+        elif event == "arming":
+            self.arming = data["state"] == "started"
+            if data["state"] == "armed":
+                self.armed = True
+        elif event == "alarm":
+            if data["state"] == "triggered":
+                self.alarm = True
+            else:
+                self.alarm = self.armed = False  # Disarmed
+        self.events += 1
+        self.last_event = (time.time(), event, data)
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "url": self.url,
+            "state": self.state(),
+            "zones": self.zones,
+            "events": self.events,
+            "last_event": self.last_event,
+            "since": self.changed,
+            "connects": self.connects,
+            "error": self.error,
+        }
+
+
+class Fleet:
+    """Every unit's state plus one follower task per unit"""
+
+    def __init__(self, units, on_event=None):
+        self.units = {unit.name: unit for unit in units}
+        self.on_event = on_event  # Optional hook (unit, event, data), e.g. for load tests
+        self.events = 0
+        self.started = time.time()
+        self.tasks = []  # Held here: the event loop only keeps weak references to tasks
+
+    def summary(self):
+        counts = dict.fromkeys(STATES, 0)
+        for unit in self.units.values():
+            counts[unit.state()] += 1
+        return {"units": len(self.units), "states": counts, "events": self.events,
+                "uptime": int(time.time() - self.started)}
+
+    def start(self):
+        """Start following every unit; returns the tasks (also kept in self.tasks)"""
+        self.tasks = [asyncio.ensure_future(self.follow(unit)) for unit in self.units.values()]
+        self.tasks.append(asyncio.ensure_future(self.sweep()))
+        return self.tasks
+
+    async def follow(self, unit):
+        """Keep one connection to a unit open, reconnecting with backoff"""
+        delay = RETRY_MIN_S
+        await asyncio.sleep(random.uniform(0, RETRY_MIN_S))  # Spread the first connects
+        while True:
+            try:
+                await self.session(unit)
+                unit.error = "closed by unit"
+            except (OSError, EOFError, ValueError, KeyError, TypeError,
+                    asyncio.LimitOverrunError, asyncio.TimeoutError) as e:
+                unit.error = str(e) or type(e).__name__
+            if unit.online:
+                delay = RETRY_MIN_S  # It was up: retry soon
+                self._set_online(unit, False)
+            # Equal jitter: half the delay fixed, half random
+            await asyncio.sleep(delay / 2 + random.uniform(0, delay / 2))
+            delay = min(delay * 2, RETRY_MAX_S)
+
+    async def session(self, unit):
+        """One connection: status snapshot, then the event stream until it ends"""
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(unit.host, unit.port), CONNECT_TIMEOUT_S)
+        unit.writer = writer
+        unit.seen = time.monotonic()
+        try:
+            host = unit.host.encode()
+            writer.write(b"GET " + unit.prefix.encode() + b"/api/status HTTP/1.1\r\nHost: " + host +
+                         b"\r\n\r\nGET " + unit.prefix.encode() + b"/events HTTP/1.1\r\nHost: " + host +
+                         b"\r\n\r\n")
+            code, headers = await read_head(reader)
+            length = content_length(headers)
+            if length > MAX_STATUS_BYTES:
+                raise ValueError("/api/status: " + str(length) + " bytes")
+            body = await reader.readexactly(length)
+            if code != 200:
+                raise ValueError("/api/status: HTTP " + str(code))
+            code, headers = await read_head(reader)
+            if code != 200:
+                raise ValueError("/events: HTTP " + str(code))  # e.g. 503: unit's stream slots full
+            unit.apply_status(json.loads(body))
+            unit.connects += 1
+            unit.error = None
+            self._set_online(unit, True)
+
+            event = "message"
+            data = None
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                unit.seen = time.monotonic()
+                line = line.rstrip(b"\r\n")
+                if not line:
+                    # A blank line ends one event
+                    if data is not None:
+                        self._apply(unit, event, json.loads(data))
+                    event = "message"
+                    data = None
+                elif line.startswith(b"event:"):
+                    event = line[6:].strip().decode()
+                elif line.startswith(b"data:"):
+                    data = line[5:].strip()
+                # id:, retry: and ": ping" comments need nothing
+        finally:
+            unit.writer = None
+            writer.close()
+
+    def _apply(self, unit, event, data):
+        unit.apply_event(event, data)
+        self.events += 1
+        if self.on_event is not None:
+            self.on_event(unit, event, data)
+
+    def _set_online(self, unit, online):
+        unit.online = online
+        unit.changed = time.time()
+
+    async def sweep(self):
+        """Close links that went quiet; their followers reconnect"""
+        while True:
+            await asyncio.sleep(SWEEP_S)
+            cutoff = time.monotonic() - STALE_S
+            for unit in self.units.values():
+                if unit.writer is not None and unit.seen < cutoff:
+                    unit.error = "stale"
+                    unit.writer.close()
+
+
+async def read_head(reader):
+    """Status code and lower-cased headers of one HTTP response"""
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    parts = lines[0].split(" ", 2)
+    if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+        raise ValueError("bad status line")
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name:
+            headers[name.strip().lower()] = value.strip()
+    return int(parts[1]), headers
+
+
+def content_length(headers):
+    """Content-Length as an int (0 if absent); ValueError unless it is plain digits"""
+    value = headers.get("content-length", "0")
+    if not (value.isascii() and value.isdigit()):
+        raise ValueError("bad Content-Length: " + value[:20])
+    return int(value)
+
+
+# Collector web server: everything comes from the store
+
+def render_page(fleet):
+    summary = fleet.summary()
+    units = sorted(fleet.units.values(), key=lambda unit: (STATES.index(unit.state()), unit.name))
+    cards = "".join(f"<div class='card {state}'><b>{n}</b> {state}</div>"
+                    for state, n in summary["states"].items())
+    rows = []
+    for unit in units[:PAGE_ROWS]:
+        zones = ", ".join(f"{name}: {status}" for name, status in unit.zones.items())
+        rows.append(f"<tr class='{unit.state()}'><td>{html.escape(unit.name)}</td><td>{unit.state()}</td>"
+                    f"<td>{html.escape(zones)}</td><td>{unit.events}</td>"
+                    f"<td>{html.escape(unit.error or '')}</td></tr>")
+    more = len(units) - PAGE_ROWS
+    note = f"<p>{more} more units in <a href='/api/fleet'>/api/fleet</a></p>" if more > 0 else ""
+    return PAGE.format(units=summary["units"], events=summary["events"], cards=cards,
+                       rows="".join(rows), note=note)
+
+
+PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><meta http-equiv="refresh" content="5">
+<title>SecKeja fleet</title><style>
+body{{font-family:sans-serif;margin:1em}} table{{border-collapse:collapse}}
+td,th{{padding:2px 8px;border-bottom:1px solid #ddd;text-align:left}}
+.card{{display:inline-block;padding:6px 12px;margin:2px;border-radius:4px;background:#eee}}
+.alarm{{background:#ffb3b3}} .offline{{background:#ddd;color:#666}} .arming{{background:#cfe0fc}}
+.armed{{background:#ffe0b3}}
+</style></head><body>
+<h1>SecKeja fleet: {units} units, {events} events</h1>
+<div>{cards}</div>
+<table><tr><th>Unit</th><th>State</th><th>Zones</th><th>Events</th><th>Error</th></tr>{rows}</table>
+{note}</body></html>
+"""
+
+
+def route(fleet, path, query):
+    """(status, content type, body) for one request"""
+    if path == "/":
+        return 200, "text/html; charset=utf-8", render_page(fleet)
+    if path == "/api/fleet":
+        wanted = query.get("state", [None])[0]
+        units = [unit.as_dict() for unit in fleet.units.values()
+                 if wanted is None or unit.state() == wanted]
+        return 200, "application/json", json.dumps({"summary": fleet.summary(), "units": units})
+    if path.startswith("/api/units/"):
+        unit = fleet.units.get(path[len("/api/units/"):])
+        if unit is not None:
+            return 200, "application/json", json.dumps(unit.as_dict())
+    return 404, "text/plain", "Not Found"
+
+
+def make_handler(fleet):
+    async def handle(reader, writer):
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), CONNECT_TIMEOUT_S)
+            target = head.split(b" ", 2)[1].decode()
+            parts = urlsplit(target)
+            code, kind, body = route(fleet, parts.path, parse_qs(parts.query))
+            data = body.encode()
+            writer.write(f"HTTP/1.1 {code} {'OK' if code == 200 else 'Not Found'}\r\n"
+                         f"Content-Type: {kind}\r\nContent-Length: {len(data)}\r\n"
+                         f"Cache-Control: no-store\r\nConnection: close\r\n\r\n".encode() + data)
+            await writer.drain()
+        except (OSError, ValueError, IndexError, asyncio.IncompleteReadError,
+                asyncio.LimitOverrunError, asyncio.TimeoutError):
+            pass
+        finally:
+            writer.close()
+    return handle
+
+
+def read_units(path):
+    """Units from a file of "name url" or "url" lines (# starts a comment)"""
+    units = []
+    with open(path) as f:
+        for line in f:
+            fields = line.split("#", 1)[0].split()
+            if not fields:
+                continue
+            url = fields[-1]
+            name = fields[0] if len(fields) > 1 else urlsplit(url if "//" in url else "http://" + url).netloc
+            units.append(Unit(name, url))
+    return units
+
+
+def raise_fd_limit():
+    """One socket per unit: lift the soft open-file limit to the hard one"""
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+async def serve(fleet, host, port):
+    fleet.start()
+    server = await asyncio.start_server(make_handler(fleet), host, port)
+    print(f"Following {len(fleet.units)} units, dashboard on http://{host}:{port}/")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate many SecKeja units into one dashboard")
+    parser.add_argument("units", help="file with one unit per line: [name] url")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    raise_fd_limit()
+    fleet = Fleet(read_units(args.units))
+    try:
+        asyncio.run(serve(fleet, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+# fleet_load.py - Load test for tools/fleet.py with thousands of simulated units
+# Run from the project root:  python tools/fleet_load.py [--units N] [--seconds S] [--rate R]
+# A child process serves N simulated units on one port (unit i under
+# /u/<i>), each answering /api/status and streaming /events in the same
+# format as the Pico. This process runs the collector on one asyncio loop,
+# waits until every unit is followed, then has the farm fire R events per
+# unit per second. It reports connect time, event lag, collector CPU use,
+# /api/fleet latency and whether the store ended up matching every unit.
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fleet  # noqa: E402
+
+TICK_S = 0.05  # Farm event generation step
+PING_S = 15  # Same heartbeat as sse.HEARTBEAT_MS
+ZONES = (("door", "OPEN", "CLOSED"), ("window", "OPEN", "CLOSED"), ("motion", "MOTION", "NO MOTION"))
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+# Farm: the simulated units (child process)
+
+class FakeUnit:
+    """Just enough of a unit for the collector: status, zones and an event stream"""
+
+    def __init__(self):
+        self.armed = False
+        self.arming = False
+        self.alarm = False
+        self.zones = {name: closed for name, _, closed in ZONES}
+        self.event_id = 0
+        self.subscribers = []
+
+    def status(self):
+        return {"armed": self.armed, "arming": self.arming, "alarm": self.alarm,
+                "zones": [{"name": name, "status": status} for name, status in self.zones.items()]}
+
+    def state(self):
+        return "alarm" if self.alarm else "armed" if self.armed else "arming" if self.arming else "disarmed"
+
+    def step(self):
+        """One random transition, in the same event shapes as Main.notify()"""
+        if self.alarm:
+            self.alarm = self.armed = False
+            return "alarm", {"state": "disarmed", "by": "keypad"}
+        if random.random() < 0.7:
+            name, active, idle = random.choice(ZONES)
+            self.zones[name] = idle if self.zones[name] == active else active
+            return "sensor", {"zone": name, "status": self.zones[name], "count": self.event_id}
+        if self.arming:
+            self.arming, self.armed = False, True
+            return "arming", {"state": "armed"}
+        if self.armed:
+            self.alarm = True
+            return "alarm", {"state": "triggered", "zone": "door"}
+        self.arming = True
+        return "arming", {"state": "started", "countdown": 30}
+
+    def send(self, message):
+        for writer in list(self.subscribers):
+            if writer.is_closing():
+                self.subscribers.remove(writer)
+            else:
+                writer.write(message)
+
+
+async def farm(units, port, rate, seconds):
+    fakes = [FakeUnit() for _ in range(units)]
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                path = head.split(b" ", 2)[1].decode()
+                _, _, index, endpoint = path.split("/", 3)
+                unit = fakes[int(index)]
+                if endpoint == "api/status":
+                    body = json.dumps(unit.status()).encode()
+                    writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                                 b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body)
+                elif endpoint == "events":
+                    writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n\r\nretry: 2000\n\n")
+                    unit.subscribers.append(writer)
+                    return  # The stream owns the connection now
+        except (OSError, ValueError, IndexError, asyncio.IncompleteReadError):
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", port, backlog=1024)
+    print("ready", flush=True)
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, sys.stdin.readline)  # Wait for "go"
+
+    sent = 0
+    per_tick = rate * units * TICK_S
+    started = next_ping = time.monotonic()
+    while time.monotonic() - started < seconds:
+        count = int(per_tick) + (random.random() < per_tick % 1)
+        for _ in range(count):
+            unit = random.choice(fakes)
+            event, data = unit.step()
+            data["t"] = time.time()  # For the lag measurement; the collector ignores it
+            unit.event_id += 1
+            unit.send(("id: " + str(unit.event_id) + "\nevent: " + event +
+                       "\ndata: " + json.dumps(data) + "\n\n").encode())
+            sent += 1
+        if time.monotonic() >= next_ping:
+            next_ping += PING_S
+            for unit in fakes:
+                unit.send(b": ping\n\n")
+        await asyncio.sleep(TICK_S)
+    await asyncio.sleep(1)  # Let the last events drain
+    print(json.dumps({"sent": sent, "states": [unit.state() for unit in fakes],
+                      "zones": [unit.zones for unit in fakes]}), flush=True)
+    await loop.run_in_executor(None, sys.stdin.readline)  # Stay up until the collector has compared
+    server.close()
+
+
+# Collector side (this process)
+
+async def load_test(args):
+    child = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.abspath(__file__), "--farm", "--units", str(args.units),
+        "--port", str(args.port), "--rate", str(args.rate), "--seconds", str(args.seconds),
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, limit=1 << 26)
+    if (await child.stdout.readline()).strip() != b"ready":
+        raise SystemExit("farm failed to start")
+
+    lags = []
+
+    def on_event(unit, event, data):
+        lags.append(time.time() - data["t"])
+
+    units = [fleet.Unit("unit" + str(i), "http://127.0.0.1:" + str(args.port) + "/u/" + str(i))
+             for i in range(args.units)]
+    collector = fleet.Fleet(units, on_event)
+    server = await asyncio.start_server(fleet.make_handler(collector), "127.0.0.1", 0)
+    api_port = server.sockets[0].getsockname()[1]
+
+    started = time.monotonic()
+    tasks = collector.start()
+    while sum(unit.online for unit in units) < args.units:
+        if time.monotonic() - started > 120:
+            raise SystemExit("units did not all come online")
+        await asyncio.sleep(0.05)
+    connect_s = time.monotonic() - started
+
+    async def api_call(path):
+        t = time.perf_counter()
+        reader, writer = await asyncio.open_connection("127.0.0.1", api_port)
+        writer.write(b"GET " + path + b" HTTP/1.0\r\n\r\n")
+        body = await reader.read()
+        writer.close()
+        return time.perf_counter() - t, len(body)
+
+    child.stdin.write(b"go\n")
+    await child.stdin.drain()
+    cpu = time.process_time()
+    wall = time.monotonic()
+    api_ms = []
+    api_bytes = 0
+    report_line = asyncio.ensure_future(child.stdout.readline())
+    while not report_line.done():
+        await asyncio.sleep(1)
+        seconds, api_bytes = await api_call(b"/api/fleet?state=alarm")
+        api_ms.append(seconds * 1000)
+        await api_call(b"/")
+    cpu = time.process_time() - cpu
+    wall = time.monotonic() - wall
+    farm_report = json.loads(await report_line)
+    # Compare before the farm exits and every unit drops offline
+    mismatched = sum(1 for unit, state, zones in zip(units, farm_report["states"], farm_report["zones"])
+                     if unit.state() != state or unit.zones != zones)
+    child.stdin.write(b"exit\n")
+    await child.wait()
+    for task in tasks:
+        task.cancel()
+    server.close()
+    lags.sort()
+    api_ms.sort()
+    return {
+        "units": args.units,
+        "connect_all_s": round(connect_s, 2),
+        "events_sent": farm_report["sent"],
+        "events_applied": collector.events,
+        "events_per_s": round(collector.events / wall, 1),
+        "lag_ms": {"p50": round(percentile(lags, 50) * 1000, 1), "p99": round(percentile(lags, 99) * 1000, 1),
+                   "max": round(lags[-1] * 1000, 1) if lags else 0},
+        "collector_cpu": round(cpu / wall, 3),  # Share of one core, excluding the farm process
+        "api_fleet_ms": {"p50": round(percentile(api_ms, 50), 1), "p99": round(percentile(api_ms, 99), 1)},
+        "api_fleet_alarm_bytes": api_bytes,
+        "collector_max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "mismatched_units": mismatched,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the fleet collector with simulated units")
+    parser.add_argument("--units", type=int, default=2000)
+    parser.add_argument("--seconds", type=float, default=20, help="length of the event load")
+    parser.add_argument("--rate", type=float, default=0.05, help="events per unit per second")
+    parser.add_argument("--port", type=int, default=18600, help="farm port")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--farm", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    fleet.raise_fd_limit()
+    if args.farm:
+        asyncio.run(farm(args.units, args.port, args.rate, args.seconds))
+        return 0
+    report = asyncio.run(load_test(args))
+    text = json.dumps(report)
+    print(text)
+    if args.json:
+        with open(args.json, "w") as f:
+            f.write(text)
+    return 0 if report["mismatched_units"] == 0 and report["events_applied"] == report["events_sent"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
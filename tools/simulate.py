@@ -0,0 +1,123 @@
+# simulate.py - Run the full security system on CPython with simulated hardware
+# Run from the project root:  python tools/simulate.py [--seconds N] [--speed X]
+# Boots Main.main() against sim.py (virtual clock, scripted pins, text LCD,
+# fake WLAN/RTC, a local UDP NTP server and MQTT broker) and plays a
+# scenario: arm, door intrusion, disarm by keypad, motion while disarmed,
+# then arm and disarm over MQTT. By default virtual time runs as fast as
+# the CPU allows; --speed 1 runs in real time so the dashboard can be
+# watched on --port.
+import argparse
+import os
+import shutil
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # Main serves static/ and writes log/ relative to the project
+
+import sim  # noqa: E402
+
+
+def scenario(main, keypad, broker):
+    """Schedule the scripted inputs; returns the times of interest"""
+    door, window, pir, button = (main.DOOR_SENSOR_PIN, main.WINDOW_SENSOR_PIN,
+                                 main.PIR_SENSOR_PIN, main.ARM_BUTTON_PIN)
+    marks = {}
+    # Everything closed and still at power-on; the button idles high (pull-up)
+    for pin_id in (door, window, pir):
+        sim.pin(pin_id).drive(0)
+    sim.pin(button).drive(1)
+
+    sim.pulse(button, 0, 200, 20000)  # Arm - 30 s exit delay
+
+    def intrude():
+        marks["door_open"] = sim.vclock.now_ns // 1000
+        sim.bounce(door, 1)  # The reed contact chatters for 2 ms
+    sim.at(60000, intrude)
+    sim.bounce(door, 0, start_ms=62000)
+
+    def enter_code():
+        marks["code"] = main.security_code
+        keypad.type(main.security_code + "#")
+    sim.at(70000, enter_code)
+
+    sim.pulse(pir, 1, 3000, 90000)  # Motion while disarmed: no alarm
+
+    control = main.MQTT_TOPIC + "/" + main.pico_mac_address + "/control"
+    sim.at(95000, broker.publish, control, "arm")
+    sim.at(110000, broker.publish, control, "disarm")  # Cancels the exit delay
+    return marks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the security system on simulated hardware")
+    parser.add_argument("--seconds", type=float, default=120, help="virtual run time")
+    parser.add_argument("--speed", type=float, default=None,
+                        help="virtual seconds per real second (default: unthrottled)")
+    parser.add_argument("--port", type=int, default=0, help="web port (0: any free port)")
+    parser.add_argument("--fresh", action="store_true", help="delete log/ before booting")
+    parser.add_argument("--drift", type=float, default=50,
+                        help="ppm the NTP server's clock runs ahead of the simulated crystal")
+    parser.add_argument("--quiet", action="store_true", help="hide the system's own prints")
+    args = parser.parse_args()
+
+    if args.fresh:
+        shutil.rmtree(os.path.join(ROOT, "log"), ignore_errors=True)
+    sim.vclock.speed = args.speed
+    out = sys.stdout
+    if args.quiet:
+        sys.stdout = open(os.devnull, "w")
+
+    # Power-on RTC reads 2021-01-01 like a fresh Pico until NTP corrects it
+    sim.rtc_offset = 1609459200 - sim.START_EPOCH
+    ntp = sim.NtpServer(drift_ppm=args.drift)
+    broker = sim.MqttBroker()
+
+    import Main
+    Main.WEB_PORT = args.port
+    Main.NTP_HOST, Main.NTP_PORT = "127.0.0.1", ntp.port
+    Main.NTP_SYNC_INTERVAL = 30  # Resync often enough to see the drift estimate
+    Main.MQTT_BROKER, Main.MQTT_PORT = "127.0.0.1", broker.port
+    Main.MQTT_CONTROL = True  # The local broker is the only publisher
+    keypad = sim.Keypad(Main.ROWS, Main.COLS, Main.KEYPAD_MAP)
+    marks = scenario(Main, keypad, broker)
+    sim.at(args.seconds * 1000, sim.stop)
+
+    started = time.perf_counter()
+    try:
+        Main.main()
+    except sim.SimulationEnd:
+        pass
+    real = time.perf_counter() - started
+    if Main.event_log is not None:
+        Main.event_log.flush()
+    sys.stdout = out
+
+    virtual = sim.vclock.now_ns / 1e9
+    print(f"\nSimulated {virtual:.1f} s in {real:.2f} s ({virtual / real:.0f}x real time)")
+    Main.scheduler.report()
+    print("Boot:", ", ".join(f"{stage} {ms} ms" for stage, ms in Main.boot_times.values()))
+    print("LCD:", "|".join(Main.lcd.text()))
+    print(f"LCD writes: {Main.lcd.writes} chars, {Main.lcd.commands} commands")
+    print(f"Buzzer changes: {len(Main.buzzer.history)}")
+    ts = Main.time_service
+    print(f"NTP: {ts.syncs} syncs, {ts.failures} failures, {ntp.requests} requests served, "
+          f"drift estimate {ts.drift_ppm or 0:.1f} ppm (server runs {args.drift} ppm fast)")
+    published = [m for m in broker.messages if not m[1].endswith("/control")]
+    print(f"MQTT: {len(published)} messages published, retained: "
+          + ", ".join(f"{topic.split('/', 2)[2]}={payload.decode()[:20]}"
+                      for topic, payload in sorted(broker.retained.items())))
+    print(f"State: armed={Main.system_armed} alarm={Main.alarm_triggered} "
+          f"failed={Main.failed_attempts} code={marks.get('code')}")
+    if "door_open" in marks and Main.alarm_start_time:
+        latency_us = Main.alarm_start_time * 1000 - marks["door_open"]
+        print(f"Door edge to alarm: {latency_us / 1000:.0f} ms")
+    print("Events:")
+    for seq, stamp, event, zone, flags in Main.journal.since(0, Main.journal.size):
+        print(f"  {seq:3d} {time.strftime('%H:%M:%S', time.gmtime(stamp))} "
+              f"{Main.jr.EVENT_NAMES[event]:<12} {Main.zone_table.name(zone):<6} flags={flags}")
+
+
+if __name__ == "__main__":
+    main()
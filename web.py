@@ -0,0 +1,129 @@
+# web.py - Dashboard page, JSON API, /metrics and the /events stream
+# Everything the web interface needs (HTTP server, page template, static
+# files, event stream) is imported from here. Main only imports this
+# module once the WiFi link first comes up, so a boot without network
+# never compiles or allocates any of it. The alarm state stays in Main,
+# which hands its status, journal and counter getters to WebService.
+import json
+
+import dashboard
+import memory
+import metrics
+import webstatic
+from httpserver import HttpServer, Response
+from sse import EventStream
+
+NO_STORE = [("Cache-Control", "no-store")]  # Dynamic responses are never cached
+HEAVY_PATHS = ("/", "/metrics", "/events")  # Refused first when memory runs low
+LOW_MEMORY_HEADERS = [("Retry-After", "10")] + NO_STORE
+EVENTS_PAGE_LIMIT = 100  # Most entries one /api/events response returns
+EVENTS_PAGE_LIMIT_LOW = 10  # ...while memory is low
+
+
+class WebService:
+    """HTTP routes over Main's status getters, plus the live event stream"""
+
+    def __init__(self, port, buffers, memory_manager, scheduler, heap,
+                 status, events_page, counters, page_info):
+        self.port = port
+        self.memory_manager = memory_manager
+        self.scheduler = scheduler
+        self.heap = heap
+        self.status = status  # Returns the /api/status dict
+        self.events_page = events_page  # (since, limit) -> /api/events dict
+        self.counters = counters  # Returns the system's /metrics counter tuples
+        self.page_info = page_info  # Returns the page's wiring and network slots
+        self.events = EventStream()
+        self.server = HttpServer(self.handle, port, buffers=buffers)
+
+    def start(self):
+        self.server.start()
+
+    def poll(self):
+        """Service all ready web sockets without waiting"""
+        try:
+            self.server.poll(0)
+        except Exception as e:
+            print(f"Error handling web request: {e}")
+
+    def notify(self, event, data):
+        """Push a transition to every open /events dashboard"""
+        self.events.publish(event, json.dumps(data))
+
+    def close_streams(self):
+        self.events.close()
+
+    def handle(self, request):
+        """Route one parsed HTTP request to its response"""
+        path = request.path
+        print(f"Request: {request.method} {path} from {request.addr}")
+
+        # Short of heap: drop the big pages first, then refuse everything
+        if not self.memory_manager.admit(path in HEAVY_PATHS):
+            return Response(503, "Low memory", "text/plain", LOW_MEMORY_HEADERS)
+
+        # CSS/JS come from flash with caching headers; the page itself is dynamic
+        if path.startswith('/static/'):
+            return webstatic.response(path, request.headers) or Response(404, "Not Found", "text/plain")
+        elif path == '/':
+            chunks, length = self.render_page()
+            return Response(200, chunks, "text/html", NO_STORE, length)
+        elif path == '/api/status':
+            return Response(200, json.dumps(self.status()), "application/json", NO_STORE)
+        elif path == '/metrics':
+            body = metrics.render(self.scheduler, self.heap, self.metric_counters() + self.counters())
+            return Response(200, body, metrics.CONTENT_TYPE, NO_STORE)
+        elif path == '/api/events':
+            try:
+                since = int(request.arg('since', '0'))
+                limit = min(int(request.arg('limit', str(EVENTS_PAGE_LIMIT))), EVENTS_PAGE_LIMIT)
+                if self.memory_manager.level != memory.NORMAL:
+                    limit = min(limit, EVENTS_PAGE_LIMIT_LOW)  # Smaller pages; clients follow `next`
+            except ValueError:
+                return Response(400, "Bad Request", "text/plain")
+            return Response(200, json.dumps(self.events_page(since, limit)), "application/json", NO_STORE)
+        elif path == '/events':
+            # The event stream takes ownership of the socket
+            self.events.subscribe(request.detach(), request.addr)
+            return None
+        return Response(404, "Not Found", "text/plain")
+
+    def render_page(self):
+        """Render the dashboard page; returns (chunk generator, content length)"""
+        s = self.status()
+        digits = s["digits"]
+
+        # Start from the status values, then add the presentation-only slots
+        # (app.js recomputes these on each update)
+        values = s.copy()
+        values.update(self.page_info())
+        values.update({
+            "css_url": webstatic.url("/static/app.css"),
+            "js_url": webstatic.url("/static/app.js"),
+            "arming_hidden": "" if s["arming"] else " hidden",
+            "alarm_hidden": "" if s["alarm"] else " hidden",
+            "failed_hidden": "" if s["failed_attempts"] else " hidden",
+            "code_info": "Enter this code on keypad to disarm" if s["code_valid"] else "Code expired - new motion required",
+            "entered_code": '*' * digits + '_' * (5 - digits),
+            "buzzer_class": 'buzzer-active' if s["buzzer"] else 'buzzer-inactive',
+            "buzzer_text": 'ACTIVE' if s["buzzer"] else 'INACTIVE',
+            "keypad_text": 'ENABLED - Enter code #' if s["keypad"] else 'DISABLED',
+            "arm_info": "ENTER PASSWORD TO DISARM" if s["armed"] else "PRESS BUTTON TO ARM",
+            "zone_cards": dashboard.zone_cards(s["zones"]),
+            "zone_pins": " | ".join(z["label"] + ": GP" + str(z["pin"]) for z in s["zones"]),
+        })
+        return dashboard.PAGE.render(values)
+
+    def metric_counters(self):
+        """The web server's own /metrics values"""
+        server = self.server
+        events = self.events
+        return (
+            ("http_requests_total", "counter", "Parsed HTTP requests", server.requests),
+            ("http_responses_total", "counter", "HTTP responses by status",
+             [('code="' + str(code) + '"', n) for code, n in server.responses.items()]),
+            ("http_rejected_total", "counter", "Connections refused at the client cap", server.rejected),
+            ("sse_subscribers", "gauge", "Open /events streams", len(events.subscribers)),
+            ("sse_events_total", "counter", "Events pushed to /events", events.events_sent),
+            ("sse_dropped_total", "counter", "Dropped /events streams", events.dropped),
+        )
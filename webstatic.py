@@ -0,0 +1,107 @@
+# webstatic.py - Cacheable static dashboard files served from flash
+# The CSS and JS live in static/ (gzipped at build time by
+# tools/build_static.py) and are streamed in small chunks with ETag and
+# Cache-Control headers; conditional requests get 304 Not Modified.
+import os
+
+from httpserver import Response
+
+try:
+    import ubinascii as binascii
+except ImportError:
+    import binascii
+
+STATIC_DIR = "static"
+
+# URL path -> content type
+STATIC_FILES = {
+    "/static/app.css": "text/css",
+    "/static/app.js": "application/javascript",
+}
+
+# Files are versioned in the page URL (?v=etag), so browsers may keep them
+CACHE_CONTROL = "public, max-age=86400"
+
+CHUNK_SIZE = 512
+_chunk = bytearray(CHUNK_SIZE)  # Scratch buffer for ETag hashing only
+_etags = {}  # Filesystem path -> quoted ETag
+
+
+def _exists(fs_path):
+    """Check if a file exists on the filesystem"""
+    try:
+        os.stat(fs_path)
+        return True
+    except OSError:
+        return False
+
+
+def _fs_path(path):
+    """Map a /static/... URL path to its file on flash"""
+    return STATIC_DIR + path[len("/static"):]
+
+
+def file_etag(fs_path):
+    """Strong ETag for a file: CRC32 of its contents, computed once"""
+    tag = _etags.get(fs_path)
+    if tag is None:
+        crc = 0
+        size = 0
+        mv = memoryview(_chunk)
+        with open(fs_path, "rb") as f:
+            while True:
+                n = f.readinto(_chunk)
+                if not n:
+                    break
+                crc = binascii.crc32(mv[:n], crc)
+                size += n
+        tag = '"%08x-%x"' % (crc & 0xFFFFFFFF, size)
+        _etags[fs_path] = tag
+    return tag
+
+
+def url(path):
+    """URL for a static file with a version tag that changes with its contents"""
+    try:
+        return path + "?v=" + file_etag(_fs_path(path)).strip('"')
+    except OSError:
+        return path
+
+
+def _stream(fs_path):
+    """Yield a file from flash in chunks so it never has to fit in the heap"""
+    buf = bytearray(CHUNK_SIZE)
+    mv = memoryview(buf)
+    with open(fs_path, "rb") as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            yield mv[:n]
+
+
+def response(path, headers):
+    """Response for a static file if path names one; None otherwise"""
+    content_type = STATIC_FILES.get(path)
+    if content_type is None:
+        return None
+
+    fs_path = _fs_path(path)
+    gzipped = False
+    if "gzip" in headers.get("accept-encoding", "") and _exists(fs_path + ".gz"):
+        fs_path += ".gz"
+        gzipped = True
+
+    try:
+        etag = file_etag(fs_path)
+    except OSError:
+        return Response(404, "Not Found", "text/plain")
+
+    extra = [("ETag", etag), ("Cache-Control", CACHE_CONTROL), ("Vary", "Accept-Encoding")]
+
+    if etag in headers.get("if-none-match", ""):
+        return Response(304, b"", content_type, extra)
+
+    if gzipped:
+        extra.append(("Content-Encoding", "gzip"))
+    return Response(200, _stream(fs_path), content_type, extra, length=os.stat(fs_path)[6])
@@ -0,0 +1,126 @@
+# wifi.py - WiFi link supervisor
+# tick() reads wlan.status() once and advances a small state machine:
+# DOWN waits out a retry delay, CONNECTING waits for an IP or a failure
+# status, UP watches for the link dropping. Nothing here sleeps, so the
+# alarm loop never waits on the radio. Retry delays double after each
+# failed attempt and are jittered (netutil.Backoff) so a house full of
+# devices does not hammer the access point in lockstep after a power cut.
+from clock import Deadline, ticks_ms, ticks_diff, ticks_add
+from netutil import Backoff
+
+# network.STAT_* values (CYW43 on the Pico W)
+STAT_IDLE = 0
+STAT_CONNECTING = 1
+STAT_GOT_IP = 3
+STAT_NAMES = {
+    -3: "wrong password",
+    -2: "no AP found",
+    -1: "connect failed",
+    0: "idle",
+    1: "connecting",
+    2: "no IP",
+    3: "got IP",
+}
+
+CONNECT_TIMEOUT_MS = 20000  # Give up on an attempt after this long
+RETRY_MIN_MS = 2000  # First retry delay, doubling after each failure...
+RETRY_MAX_MS = 120000  # ...up to this
+RSSI_INTERVAL_MS = 5000  # How often to sample signal strength while up
+
+DOWN = 0
+CONNECTING = 1
+UP = 2
+STATE_NAMES = ("down", "connecting", "up")
+
+
+class WifiSupervisor:
+    """Keeps a station interface connected without blocking"""
+
+    def __init__(self, wlan, ssid, password, connect_timeout_ms=CONNECT_TIMEOUT_MS,
+                 retry_min_ms=RETRY_MIN_MS, retry_max_ms=RETRY_MAX_MS):
+        self.wlan = wlan
+        self.ssid = ssid
+        self.password = password
+        self.connect_timeout_ms = connect_timeout_ms
+        self.backoff = Backoff(retry_min_ms, retry_max_ms)
+
+        self.state = DOWN
+        self.due = Deadline(0)  # Next connect attempt (DOWN) or its timeout (CONNECTING)
+        self.rssi_due = Deadline()
+        self.status = STAT_IDLE
+        self.last_error = None
+        # Uptime is counted up in whole seconds as tick() sees the link up:
+        # one ticks_diff across days would wrap after ~6.2
+        self.up_s = 0
+        self.up_mark = 0  # ticks_ms up to which up_s has been counted
+
+        self.attempts = 0
+        self.failures = 0
+        self.drops = 0  # Times an up link was lost
+        self.reconnects = 0  # Times the link came back after a drop
+        self.ever_up = False
+        self.rssi = None  # dBm, sampled while up
+
+    def is_up(self):
+        return self.state == UP
+
+    def uptime_s(self):
+        """Seconds since the link last came up, 0 while down"""
+        return self.up_s if self.state == UP else 0
+
+    def tick(self):
+        """Check the link once; returns the new state when it changes, else None"""
+        status = self.wlan.status()
+        self.status = status
+        state = self.state
+
+        if status == STAT_GOT_IP:
+            if state != UP:
+                return self._up()
+            seconds = ticks_diff(ticks_ms(), self.up_mark) // 1000
+            if seconds > 0:
+                self.up_s += seconds
+                self.up_mark = ticks_add(self.up_mark, seconds * 1000)
+            if self.rssi_due.expired():
+                self.rssi = self.wlan.status("rssi")
+                self.rssi_due.start(RSSI_INTERVAL_MS)
+            return None
+
+        if state == UP:
+            self.drops += 1
+            self.last_error = "link lost (" + STAT_NAMES.get(status, str(status)) + ")"
+            self.backoff.reset()  # A drop retries at the minimum delay
+            return self._down()
+        if state == CONNECTING:
+            if status < 0 or self.due.expired():
+                self.failures += 1
+                self.last_error = STAT_NAMES.get(status, str(status)) if status < 0 else "timeout"
+                self.wlan.disconnect()  # Reset the driver before the next attempt
+                return self._down()
+            return None
+        if self.due.expired():
+            self.attempts += 1
+            self.wlan.connect(self.ssid, self.password)
+            self.due.start(self.connect_timeout_ms)
+            self.state = CONNECTING
+            return CONNECTING
+        return None
+
+    def _up(self):
+        if self.ever_up:
+            self.reconnects += 1
+        self.ever_up = True
+        self.state = UP
+        self.up_s = 0
+        self.up_mark = ticks_ms()
+        self.backoff.reset()
+        self.last_error = None
+        self.rssi = self.wlan.status("rssi")
+        self.rssi_due.start(RSSI_INTERVAL_MS)
+        return UP
+
+    def _down(self):
+        self.due.start(self.backoff.fail())
+        self.state = DOWN
+        self.rssi = None
+        return DOWN
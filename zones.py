@@ -0,0 +1,157 @@
+# zones.py - Data-driven security zone table
+# Every sensor is one Zone row (pin, kind, active level, name, counters).
+# The live state of all zones is packed into one integer bitmask, so
+# readiness to arm, "any entry open" and similar checks are single mask
+# comparisons instead of string tests per zone, and adding a zone needs
+# no new code. Up to 30 zones fit a MicroPython small int.
+# Raw levels (captured edges, live reads) only reach the state once they
+# have held for the zone's settle time, so contact bounce and glitches
+# never show up as changes.
+from clock import ticks_diff
+
+ENTRY = 0  # Door/window contact: alarm when it opens while armed
+MOTION = 1  # PIR: alarm on motion while armed with every entry zone closed
+
+STATUS_TEXT = (
+    ("CLOSED", "OPEN"),  # ENTRY: inactive, active
+    ("NO MOTION", "MOTION DETECTED"),  # MOTION
+)
+
+MAX_ZONES = 30
+SETTLE_MS = 20  # Default settle time, well past reed switch bounce
+
+
+class Zone:
+    """One sensor input and its counters"""
+
+    __slots__ = ("id", "bit", "name", "label", "pin", "pin_id", "kind",
+                 "active_level", "settle_ms", "changes", "last_active_ms",
+                 "seen", "seen_us", "burst_us", "pending")
+
+    def __init__(self, id, name, label, pin, pin_id, kind, active_level, settle_ms=SETTLE_MS):
+        self.id = id  # 1-based; 0 means "no zone" in the event journal
+        self.bit = 1 << (id - 1)
+        self.name = name
+        self.label = label
+        self.pin = pin
+        self.pin_id = pin_id
+        self.kind = kind
+        self.active_level = active_level
+        self.settle_ms = settle_ms  # A raw level must hold this long to count
+        self.changes = 0  # Entry: every change; motion: detections
+        self.last_active_ms = None  # ticks_ms when it last became active
+        self.seen = None  # Last raw level observed
+        self.seen_us = 0  # ticks_us it was observed
+        self.burst_us = 0  # ticks_us of the first edge since the last commit
+        self.pending = False  # seen not yet committed
+
+    def __repr__(self):
+        return f"<Zone {self.id} {self.name} GP{self.pin_id}>"
+
+
+class ZoneTable:
+    """All zones, their state bitmask and per-kind masks"""
+
+    def __init__(self):
+        self.zones = []
+        self.by_pin = {}  # Pin id -> Zone, for captured edges
+        self.state = 0  # Bit set while a zone is active (open / motion)
+        self.known = 0  # Bit set once a zone has been read
+        self.all_mask = 0
+        self.entry_mask = 0
+        self.motion_mask = 0
+
+    def add(self, name, label, pin, pin_id, kind, active_level=1, settle_ms=SETTLE_MS):
+        """Register a zone; returns it"""
+        if len(self.zones) >= MAX_ZONES:
+            raise ValueError("Too many zones")
+        zone = Zone(len(self.zones) + 1, name, label, pin, pin_id, kind, active_level, settle_ms)
+        self.zones.append(zone)
+        self.by_pin[pin_id] = zone
+        self.all_mask |= zone.bit
+        if kind == ENTRY:
+            self.entry_mask |= zone.bit
+            self.state |= zone.bit  # Unread entry zones count as open
+        else:
+            self.motion_mask |= zone.bit
+        return zone
+
+    def __iter__(self):
+        return iter(self.zones)
+
+    def __len__(self):
+        return len(self.zones)
+
+    def get(self, name):
+        for zone in self.zones:
+            if zone.name == name:
+                return zone
+        return None
+
+    def name(self, zone_id):
+        """Zone name for a journal zone id"""
+        if 0 < zone_id <= len(self.zones):
+            return self.zones[zone_id - 1].name
+        return "none"
+
+    def is_active(self, zone):
+        return bool(self.state & zone.bit)
+
+    def status(self, zone):
+        return STATUS_TEXT[zone.kind][1 if self.state & zone.bit else 0]
+
+    def observe(self, zone, level, stamp_us):
+        """Note a raw level (an edge, or a live read that differs); restarts the settle time"""
+        if not zone.pending:
+            zone.pending = True
+            zone.burst_us = stamp_us
+        zone.seen = level
+        zone.seen_us = stamp_us
+
+    def settled(self, zone, now_us):
+        """The observed level once it has held for the settle time (at once on the first read), else None"""
+        if not zone.pending:
+            return None
+        if self.known & zone.bit and ticks_diff(now_us, zone.seen_us) < zone.settle_ms * 1000:
+            return None
+        zone.pending = False
+        return zone.seen
+
+    def update(self, zone, level, now_ms):
+        """Apply a pin level; returns True if the zone changed state (or was first read)"""
+        active = level == zone.active_level
+        bit = zone.bit
+        if self.known & bit and bool(self.state & bit) == active:
+            return False
+        self.known |= bit
+        if active:
+            self.state |= bit
+            zone.last_active_ms = now_ms
+        else:
+            self.state &= ~bit
+        if zone.kind == ENTRY or active:
+            zone.changes += 1
+        return True
+
+    # Whole-system checks, each a single mask test
+
+    def ready(self):
+        """Every zone read and inactive - safe to arm"""
+        return self.known == self.all_mask and not self.state
+
+    def entries_closed(self):
+        return not self.state & self.entry_mask
+
+    def entry_open(self):
+        return bool(self.state & self.entry_mask)
+
+    def motion(self):
+        return bool(self.state & self.motion_mask)
+
+    def first_active(self):
+        """The lowest-numbered active (or unread) zone, for messages"""
+        pending = self.state | (self.all_mask & ~self.known)
+        for zone in self.zones:
+            if pending & zone.bit:
+                return zone
+        return None